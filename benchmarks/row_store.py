@@ -0,0 +1,77 @@
+# virtualListCtrl用RowStoreのメモリ使用量と処理速度の比較
+# 使い方: python benchmarks/row_store.py [行数 ...]
+# wxPythonなしで実行できるよう、row_storeモジュールをファイルから直接読み込む
+
+import gc
+import importlib.util
+import os
+import sys
+import time
+import tracemalloc
+
+ROW_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "viewkit", "creator", "objects", "row_store.py")
+DEFAULT_SIZES = [100000, 1000000]
+COLUMNS = 5
+
+
+def loadRowStore():
+    spec = importlib.util.spec_from_file_location("row_store", ROW_STORE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def makeRow(i):
+    # id, サイズ, 比率, 名前, 種別 の5列
+    return [i, i * 7, i / 3, "item%d" % i, ("file", "dir", "link")[i % 3]]
+
+
+def storeFactories(row_store):
+    return {
+        "list": lambda: row_store.ListRowStore(),
+        "columnar": lambda: row_store.ColumnarRowStore(["q", "q", "d", None, None]),
+        "record": lambda: row_store.RecordRowStore(["id", "size", "ratio", "name", "kind"]),
+    }
+
+
+def measure(name, factory, size):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    store = factory()
+    for i in range(size):
+        store.append(makeRow(i))
+    appendTime = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for i in range(size):
+        for col in range(COLUMNS):
+            str(store.getCell(i, col))
+    getCellTime = time.perf_counter() - start
+
+    start = time.perf_counter()
+    del store[size // 4:size // 2]
+    deleteTime = time.perf_counter() - start
+    return {
+        "store": name,
+        "rows": size,
+        "memory_mb": memory / 2**20,
+        "append_s": appendTime,
+        "get_cell_s": getCellTime,
+        "delete_slice_s": deleteTime,
+    }
+
+
+def main(sizes):
+    row_store = loadRowStore()
+    print("%-10s %10s %12s %10s %12s %14s" % ("store", "rows", "memory(MB)", "append(s)", "getCell(s)", "delete 1/4(s)"))
+    for size in sizes:
+        for name, factory in storeFactories(row_store).items():
+            r = measure(name, factory, size)
+            print("%-10s %10d %12.1f %10.3f %12.3f %14.4f" % (r["store"], r["rows"], r["memory_mb"], r["append_s"], r["get_cell_s"], r["delete_slice_s"]))
+
+
+if __name__ == "__main__":
+    main([int(i) for i in sys.argv[1:]] or DEFAULT_SIZES)
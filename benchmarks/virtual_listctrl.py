@@ -0,0 +1,378 @@
+# virtualListCtrlの行数に対する処理時間とメモリ使用量の計測
+# 使い方: python benchmarks/virtual_listctrl.py [行数 ...] [--backend auto|stub|wx] [--output 結果.json] [--compare 比較元.json]
+# --backend stub(wxPythonがない場合の既定)では、テストと同じtests/wx_stub.pyをwxとして読み込み、ディスプレイなしで実行する
+# スタブのCallAfterで登録された処理は、計測する処理の直後に実行し、計測時間に含める
+# --backend wxでは本物のwxPythonを使う。Linuxでディスプレイがない場合は xvfb-run などの仮想ディスプレイ上で実行する
+# viewkitパッケージ全体は読み込まず、viewkit/creator/objectsだけをパッケージとして読み込む
+
+import argparse
+import datetime
+import gc
+import importlib
+import importlib.util
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+import types
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+OBJECTS_DIR = os.path.join(ROOT, "viewkit", "creator", "objects")
+STUB_PATH = os.path.join(ROOT, "tests", "wx_stub.py")
+PACKAGE_NAME = "viewkit_objects"
+DEFAULT_SIZES = [10000, 100000, 1000000]
+COLUMNS = 3
+
+# 1行ずつの操作を行う回数
+INSERT_OPS = 1000
+DELETE_OPS = 1000
+REMOVE_OPS = 20
+# カラムの挿入と削除を行う回数
+COLUMN_OPS = 20
+# まとめて削除する行数の最小値。これ未満では1行ずつの削除と変わらないため
+BULK_DELETE_MIN = 500
+# 表示中の1ページを描画し直す回数
+PAGE_SWEEPS = 100
+
+
+def loadWx(backend):
+    if backend == "auto":
+        try:
+            import wx
+            return wx, "wx"
+        except ImportError:
+            backend = "stub"
+    if backend == "stub":
+        spec = importlib.util.spec_from_file_location("wx", STUB_PATH)
+        wx = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(wx)
+        sys.modules["wx"] = wx
+        return wx, "stub"
+    import wx
+    return wx, "wx"
+
+
+def loadVirtualListCtrl():
+    # objectsディレクトリを単独のパッケージとして登録し、相対importを解決させる
+    package = types.ModuleType(PACKAGE_NAME)
+    package.__path__ = [OBJECTS_DIR]
+    sys.modules[PACKAGE_NAME] = package
+    return importlib.import_module(PACKAGE_NAME + ".virtual_listctrl")
+
+
+def makeRow(i):
+    # id, 名前, 種別 の3列
+    return [i, "item%d" % i, ("file", "dir", "link")[i % 3]]
+
+
+def makeRows(size, start=0):
+    return [makeRow(i) for i in range(start, start + size)]
+
+
+class Environment:
+    """コントロールの作成に必要なwx.Appと親ウィンドウを保持する"""
+
+    def __init__(self, wx, backend):
+        self.wx = wx
+        self.backend = backend
+        self.module = loadVirtualListCtrl()
+        self.app = None
+        self.frame = None
+        if backend == "wx":
+            self.app = wx.App()
+            self.frame = wx.Frame(None)
+
+    def processPending(self):
+        """スタブでは、CallAfterで登録された処理をここで実行する。本物のwxではイベントループが実行する"""
+        if self.backend == "stub":
+            self.wx.processPendingCalls()
+
+    def create(self, size=0, **kArg):
+        ctrl = self.module.virtualListCtrl(self.frame, **kArg)
+        for i in ("id", "name", "kind"):
+            ctrl.AppendColumn(i)
+        if size:
+            ctrl.extend(makeRows(size))
+        return ctrl
+
+    def close(self):
+        if self.frame is not None:
+            self.frame.Destroy()
+
+
+#
+# 計測する処理
+# 各関数は、準備を行った上で計測対象の処理を行う関数と、その処理での操作回数を返す
+#
+
+def caseAppend(env, size):
+    ctrl = env.create()
+    rows = makeRows(size)
+
+    def run():
+        for row in rows:
+            ctrl.append(row)
+    return run, size
+
+
+def caseExtend(env, size):
+    ctrl = env.create()
+    rows = makeRows(size)
+
+    def run():
+        ctrl.extend(rows)
+    return run, 1
+
+
+def caseInsert(env, size):
+    ctrl = env.create(size)
+    rows = makeRows(INSERT_OPS, size)
+
+    def run():
+        for row in rows:
+            ctrl.insert(len(ctrl) // 2, row)
+    return run, INSERT_OPS
+
+
+def caseDeleteInt(env, size):
+    ctrl = env.create(size)
+    count = min(DELETE_OPS, size // 2)
+
+    def run():
+        for _ in range(count):
+            del ctrl[len(ctrl) // 2]
+    return run, count
+
+
+def caseDeleteSlice(env, size):
+    ctrl = env.create(size)
+
+    def run():
+        del ctrl[size // 4:size // 2]
+    return run, 1
+
+
+def caseDeleteBulk(env, size):
+    ctrl = env.create(size)
+    count = max(BULK_DELETE_MIN, size // 100)
+    step = size // count
+    indexes = list(range(0, step * count, step))
+
+    def run():
+        del ctrl[indexes]
+    return run, 1
+
+
+def caseRemove(env, size):
+    ctrl = env.create(size)
+    # 末尾付近の行を値で探して削除する
+    rows = [ctrl[i] for i in range(size - REMOVE_OPS, size)]
+
+    def run():
+        for row in rows:
+            ctrl.remove(row)
+    return run, REMOVE_OPS
+
+
+def caseSetList(env, size):
+    ctrl = env.create(size)
+    rows = makeRows(size, size)
+
+    def run():
+        ctrl.setList(rows)
+    return run, 1
+
+
+def caseSetListKeyed(env, size):
+    ctrl = env.create(size)
+    # 1%の行の値を変更したリストを、キーで突き合わせて反映する
+    rows = makeRows(size)
+    for i in range(0, size, 100):
+        rows[i] = [i, "changed%d" % i, "file"]
+
+    def run():
+        ctrl.setList(rows, key=lambda row: row[0])
+    return run, 1
+
+
+def caseSelectedAll(env, size):
+    ctrl = env.create(size)
+    ctrl.selectAll()
+
+    def run():
+        ctrl.GetSelectedItems()
+    return run, 1
+
+
+def caseSelectedSparse(env, size):
+    ctrl = env.create(size)
+    for i in range(0, size, max(1, size // 1000)):
+        ctrl.Select(i)
+
+    def run():
+        ctrl.GetSelectedItems()
+    return run, 1
+
+
+def caseInsertDeleteColumn(env, size, **kArg):
+    ctrl = env.create(size, **kArg)
+
+    def run():
+        for _ in range(COLUMN_OPS):
+            ctrl.DeleteColumn(ctrl.InsertColumn(1, "new"))
+    return run, COLUMN_OPS * 2
+
+
+def caseInsertDeleteColumnMapped(env, size):
+    return caseInsertDeleteColumn(env, size, field_mapping=True)
+
+
+def caseTextSweep(env, size):
+    ctrl = env.create(size)
+
+    def run():
+        for item in range(size):
+            for col in range(COLUMNS):
+                ctrl.OnGetItemText(item, col)
+    return run, size * COLUMNS
+
+
+def caseTextPage(env, size):
+    ctrl = env.create(size)
+    first = size // 2
+    last = min(size, first + ctrl.GetCountPerPage())
+
+    def run():
+        for _ in range(PAGE_SWEEPS):
+            for item in range(first, last):
+                for col in range(COLUMNS):
+                    ctrl.OnGetItemText(item, col)
+    return run, PAGE_SWEEPS * (last - first) * COLUMNS
+
+
+CASES = {
+    "append": caseAppend,
+    "extend": caseExtend,
+    "insert": caseInsert,
+    "delitem_int": caseDeleteInt,
+    "delitem_slice": caseDeleteSlice,
+    "delitem_bulk": caseDeleteBulk,
+    "remove": caseRemove,
+    "setList": caseSetList,
+    "setList_keyed": caseSetListKeyed,
+    "InsertDeleteColumn": caseInsertDeleteColumn,
+    "InsertDeleteColumn_mapped": caseInsertDeleteColumnMapped,
+    "GetSelectedItems_all": caseSelectedAll,
+    "GetSelectedItems_sparse": caseSelectedSparse,
+    "OnGetItemText_sweep": caseTextSweep,
+    "OnGetItemText_page": caseTextPage,
+}
+
+
+def measure(env, name, size, withMemory=True):
+    gc.collect()
+    run, ops = CASES[name](env, size)
+    start = time.perf_counter()
+    run()
+    env.processPending()
+    seconds = time.perf_counter() - start
+    result = {
+        "case": name,
+        "rows": size,
+        "ops": ops,
+        "seconds": seconds,
+        "us_per_op": seconds / ops * 1e6,
+    }
+    if withMemory:
+        # トレース中は遅くなるため、時間とは別に準備からやり直して計測する
+        gc.collect()
+        run, ops = CASES[name](env, size)
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        run()
+        env.processPending()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["retained_kib"] = (current - base) / 1024
+        result["peak_kib"] = (peak - base) / 1024
+    return result
+
+
+def getVersion():
+    try:
+        with open(os.path.join(ROOT, "pyproject.toml"), encoding="utf-8") as f:
+            m = re.search(r'^version\s*=\s*"([^"]+)"', f.read(), re.MULTILINE)
+        return m.group(1) if m else None
+    except OSError:
+        return None
+
+
+def getCommit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, path):
+    """以前の結果ファイルと、同じ処理・行数の時間を比較して表示する"""
+    with open(path, encoding="utf-8") as f:
+        old = json.load(f)
+    oldResults = {(r["case"], r["rows"]): r for r in old["results"]}
+    print()
+    print("比較元: %s (version %s, commit %s)" % (path, old.get("version"), old.get("commit")))
+    print("%-24s %10s %12s %12s %8s" % ("case", "rows", "old(s)", "new(s)", "ratio"))
+    for r in results:
+        o = oldResults.get((r["case"], r["rows"]))
+        if o is None:
+            continue
+        ratio = r["seconds"] / o["seconds"] if o["seconds"] > 0 else float("inf")
+        print("%-24s %10d %12.4f %12.4f %8.2f" % (r["case"], r["rows"], o["seconds"], r["seconds"], ratio))
+
+
+def main(sizes, backend="auto", cases=None, output=None, comparePath=None, withMemory=True):
+    wx, backend = loadWx(backend)
+    env = Environment(wx, backend)
+    results = []
+    print("backend: %s" % backend)
+    print("%-24s %10s %10s %12s %12s %12s" % ("case", "rows", "ops", "time(s)", "us/op", "peak(KiB)"))
+    try:
+        for size in sizes:
+            for name in cases or CASES:
+                r = measure(env, name, size, withMemory)
+                results.append(r)
+                print("%-24s %10d %10d %12.4f %12.2f %12s" % (r["case"], r["rows"], r["ops"], r["seconds"], r["us_per_op"], "%.1f" % r["peak_kib"] if withMemory else "-"))
+    finally:
+        env.close()
+    if output:
+        data = {
+            "benchmark": "virtual_listctrl",
+            "version": getVersion(),
+            "commit": getCommit(),
+            "backend": backend,
+            "python": sys.version,
+            "platform": platform.platform(),
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "results": results,
+        }
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    if comparePath:
+        compare(results, comparePath)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sizes", nargs="*", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--backend", choices=["auto", "stub", "wx"], default="auto")
+    parser.add_argument("--case", action="append", choices=list(CASES), help="計測する処理。複数指定可能。省略時はすべて")
+    parser.add_argument("--output", help="結果を書き出すJSONファイル")
+    parser.add_argument("--compare", help="比較元の結果JSONファイル")
+    parser.add_argument("--no-memory", action="store_true", help="メモリ使用量を計測しない")
+    args = parser.parse_args()
+    main(args.sizes, args.backend, args.case, args.output, args.compare, not args.no_memory)
@@ -0,0 +1,82 @@
+import unittest
+from viewkit.creator.objects.data_source import DataSource, PagedRowStore
+
+
+class CountingSource(DataSource):
+    def __init__(self, n):
+        self.n = n
+        self.requests = []
+
+    def count(self):
+        return self.n
+
+    def rows(self, start, stop):
+        self.requests.append((start, stop))
+        return [["row%d" % i, i] for i in range(start, stop)]
+
+
+class TestPagedRowStore(unittest.TestCase):
+    """PagedRowStoreクラスのテスト"""
+
+    def setUp(self):
+        self.source = CountingSource(1000)
+        self.store = PagedRowStore(self.source, pageSize=10, maxPages=3)
+
+    def test_reads_only_needed_page(self):
+        """参照した行を含むページだけが読み込まれることを確認"""
+        self.assertEqual(len(self.store), 1000)
+        self.assertEqual(self.source.requests, [])
+        self.assertEqual(self.store[25], ["row25", 25])
+        self.assertEqual(self.store.getCell(29, 1), 29)
+        self.assertEqual(self.store.getCell(29, 5), "")
+        self.assertEqual(self.source.requests, [(20, 30)])
+
+    def test_last_page(self):
+        """最後のページが行数を超えて要求されないことを確認"""
+        source = CountingSource(15)
+        store = PagedRowStore(source, pageSize=10)
+        self.assertEqual(store[-1], ["row14", 14])
+        self.assertEqual(source.requests, [(10, 15)])
+        with self.assertRaises(IndexError):
+            store[15]
+
+    def test_page_limit(self):
+        """保持するページ数が上限を超えないことを確認"""
+        for i in range(0, 100, 10):
+            self.store[i]
+        self.assertEqual(len(self.store._pages), 3)
+        self.source.requests = []
+        self.store[95]
+        self.assertEqual(self.source.requests, [])
+        self.store[0]
+        self.assertEqual(self.source.requests, [(0, 10)])
+
+    def test_prefetch(self):
+        """先読みした範囲は追加の読み込みなしで参照できることを確認"""
+        self.store.prefetch(5, 25)
+        self.assertEqual(self.source.requests, [(0, 10), (10, 20), (20, 30)])
+        self.store.prefetch(500, 900)
+        self.assertEqual(len(self.store._pages), 3)
+        self.assertEqual(self.source.requests[-1], (520, 530))
+
+    def test_iterate_without_cache(self):
+        """全体の走査でページのキャッシュが使われないことを確認"""
+        self.store[0]
+        rows = list(self.store)
+        self.assertEqual(len(rows), 1000)
+        self.assertEqual(list(self.store._pages), [0])
+
+    def test_reload(self):
+        """再読み込みで行数が取得し直されることを確認"""
+        self.store[0]
+        self.source.n = 5
+        self.store.reload()
+        self.assertEqual(len(self.store), 5)
+        self.assertEqual(len(self.store._pages), 0)
+
+    def test_read_only(self):
+        """変更操作はできないことを確認"""
+        with self.assertRaises(NotImplementedError):
+            self.store.append(["x", 0])
+        with self.assertRaises(NotImplementedError):
+            self.store.setCell(0, 0, "x")
@@ -0,0 +1,43 @@
+import unittest
+from viewkit.creator.objects.dirty_ranges import DirtyRanges
+
+
+class TestDirtyRanges(unittest.TestCase):
+    """DirtyRangesクラスのテスト"""
+
+    def test_adjacent_ranges_are_merged(self):
+        """連続して追加した隣接範囲が1つにまとまることを確認"""
+        ranges = DirtyRanges()
+        for i in range(1000):
+            ranges.add(i, i)
+        self.assertEqual(ranges.pop(1000), [(0, 999)])
+        self.assertFalse(ranges)
+
+    def test_disjoint_ranges(self):
+        """離れた範囲は別々に返されることを確認"""
+        ranges = DirtyRanges()
+        ranges.add(50, 60)
+        ranges.add(0, 5)
+        ranges.add(3, 10)
+        self.assertEqual(ranges.pop(100), [(0, 10), (50, 60)])
+
+    def test_clamp_to_count(self):
+        """行数を超える部分が切り捨てられることを確認"""
+        ranges = DirtyRanges()
+        ranges.add(5, 20)
+        ranges.add(30, 40)
+        self.assertEqual(ranges.pop(10), [(5, 9)])
+
+    def test_empty_range_is_ignored(self):
+        """空の範囲は無視されることを確認"""
+        ranges = DirtyRanges()
+        ranges.add(5, 4)
+        self.assertFalse(ranges)
+        self.assertEqual(ranges.pop(10), [])
+
+    def test_too_many_ranges(self):
+        """範囲が多すぎる場合は1つにまとめられることを確認"""
+        ranges = DirtyRanges()
+        for i in range(0, 100, 2):
+            ranges.add(i, i)
+        self.assertEqual(ranges.pop(100, maxRanges=4), [(0, 98)])
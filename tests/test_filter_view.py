@@ -0,0 +1,64 @@
+import unittest
+from viewkit.creator.objects.filter_view import FilterView
+from viewkit.creator.objects.row_store import normalizeIndexes
+
+
+class TestFilterView(unittest.TestCase):
+    """FilterViewクラスのテスト"""
+
+    def setUp(self):
+        self.rows = [[i] for i in range(10)]
+        self.view = FilterView(lambda row: row[0] % 2 == 0)
+        self.view.build(self.rows)
+
+    def test_build(self):
+        """条件に合う行の位置が保持されることを確認"""
+        self.assertEqual(list(self.view.indexes), [0, 2, 4, 6, 8])
+        self.assertEqual(self.view[1], 2)
+        self.assertEqual(self.view.find(4), 2)
+        self.assertEqual(self.view.find(5), -1)
+        self.assertEqual(self.view.lowerBound(5), 3)
+
+    def test_narrow(self):
+        """現在表示している行だけが絞り込まれることを確認"""
+        self.view.narrow(self.rows, lambda row: row[0] % 4 == 0 or row[0] == 1)
+        self.assertEqual(list(self.view.indexes), [0, 4, 8])
+
+    def test_appended(self):
+        """追加した行のうち条件に合うものが反映されることを確認"""
+        self.rows.extend([[10], [11], [12]])
+        self.view.appended(self.rows, 10)
+        self.assertEqual(list(self.view.indexes), [0, 2, 4, 6, 8, 10, 12])
+
+    def test_inserted(self):
+        """挿入で後ろの行の位置がずれることを確認"""
+        self.rows.insert(3, [100])
+        self.view.inserted(self.rows, 3)
+        self.assertEqual(list(self.view.indexes), [0, 2, 3, 5, 7, 9])
+        self.rows.insert(0, [1])
+        self.view.inserted(self.rows, 0)
+        self.assertEqual(list(self.view.indexes), [1, 3, 4, 6, 8, 10])
+
+    def test_removed(self):
+        """削除した行が外れ、後ろの行の位置が詰められることを確認"""
+        deleted = normalizeIndexes([1, 2, 7], 10)
+        self.view.removed(deleted)
+        self.assertEqual(list(self.view.indexes), [0, 2, 4, 5])
+        self.view.removed(normalizeIndexes(slice(0, 3), 7))
+        self.assertEqual(list(self.view.indexes), [1, 2])
+
+    def test_changed(self):
+        """内容の変更で表示・非表示が切り替わることを確認"""
+        self.rows[3] = [30]
+        self.view.changed(self.rows, 3)
+        self.assertEqual(list(self.view.indexes), [0, 2, 3, 4, 6, 8])
+        self.rows[0] = [1]
+        self.view.changed(self.rows, 0)
+        self.assertEqual(list(self.view.indexes), [2, 3, 4, 6, 8])
+
+    def test_reordered(self):
+        """並べ替え後も同じ行が表示されることを確認"""
+        order = list(range(9, -1, -1))
+        self.rows = [self.rows[i] for i in order]
+        self.view.reordered(order)
+        self.assertEqual([self.rows[i][0] for i in self.view.indexes], [8, 6, 4, 2, 0])
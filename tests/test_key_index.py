@@ -0,0 +1,82 @@
+import unittest
+from viewkit.creator.objects.key_index import KeyIndex, matchKeys
+
+
+class TestKeyIndex(unittest.TestCase):
+    """KeyIndexクラスのテスト"""
+
+    def setUp(self):
+        self.rows = [[i, "row%d" % i] for i in range(10)]
+        self.index = KeyIndex(lambda row: row[0])
+
+    def test_find(self):
+        """キーから位置が求められることを確認"""
+        self.assertEqual(self.index.find(self.rows, 3), 3)
+        self.assertEqual(self.index.find(self.rows, 99), -1)
+
+    def test_appended(self):
+        """追加した行が索引に反映されることを確認"""
+        self.index.find(self.rows, 0)
+        self.rows.append([10, "row10"])
+        self.index.appended(self.rows, 10)
+        self.assertEqual(self.index.find(self.rows, 10), 10)
+
+    def test_insert_shifts_positions(self):
+        """挿入で位置がずれた行が正しく引けることを確認"""
+        self.index.find(self.rows, 0)
+        self.rows.insert(2, [100, "new"])
+        self.index.invalidateFrom(2)
+        self.assertEqual(self.index.find(self.rows, 1), 1)
+        self.assertEqual(self.index.find(self.rows, 100), 2)
+        self.assertEqual(self.index.find(self.rows, 9), 10)
+
+    def test_removed_key_is_not_found(self):
+        """削除した行のキーが見つからなくなることを確認"""
+        self.index.find(self.rows, 0)
+        self.index.discard(self.rows[4])
+        del self.rows[4]
+        self.index.invalidateFrom(4)
+        self.assertEqual(self.index.find(self.rows, 4), -1)
+        self.assertEqual(self.index.find(self.rows, 5), 4)
+
+    def test_replaced(self):
+        """行のキーが変わった場合のテスト"""
+        self.index.find(self.rows, 0)
+        self.rows[3] = [30, "changed"]
+        self.index.replaced(3, 3, self.rows[3])
+        self.assertEqual(self.index.find(self.rows, 3), -1)
+        self.assertEqual(self.index.find(self.rows, 30), 3)
+
+    def test_clear(self):
+        """索引を破棄しても次の検索で作り直されることを確認"""
+        self.index.find(self.rows, 0)
+        self.rows.reverse()
+        self.index.clear()
+        self.assertEqual(self.index.find(self.rows, 0), 9)
+
+
+class TestMatchKeys(unittest.TestCase):
+    """matchKeys関数のテスト"""
+
+    def test_insert_and_remove(self):
+        """挿入・削除された行以外が、位置を保ったまま対応付けられることを確認"""
+        mapping, kept = matchKeys([1, 2, 3, 4], [0, 1, 3, 4, 5])
+        self.assertEqual(mapping, [1, -1, 2, 3])
+        self.assertEqual(kept, [0, 2, 3])
+
+    def test_moved(self):
+        """移動した行だけがkeptから外れることを確認"""
+        mapping, kept = matchKeys([1, 2, 3, 4, 5], [1, 3, 4, 5, 2])
+        self.assertEqual(mapping, [0, 4, 1, 2, 3])
+        self.assertEqual(kept, [0, 2, 3, 4])
+
+    def test_duplicate_keys(self):
+        """同じキーの行は出現順に対応付けられることを確認"""
+        mapping, kept = matchKeys(["a", "b", "a"], ["a", "a"])
+        self.assertEqual(mapping, [0, -1, 1])
+        self.assertEqual(kept, [0, 2])
+
+    def test_empty(self):
+        """空の列を扱えることを確認"""
+        self.assertEqual(matchKeys([], [1]), ([], []))
+        self.assertEqual(matchKeys([1], []), ([-1], []))
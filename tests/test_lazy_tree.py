@@ -0,0 +1,72 @@
+import unittest
+from viewkit.creator.objects.lazy_tree import LazyNode, NodeBudget
+
+
+class TestLazyNode(unittest.TestCase):
+    """LazyNodeクラスのテスト"""
+
+    def test_set_children(self):
+        """子が作成され、子孫をたどれることを確認"""
+        root = LazyNode("root")
+        self.assertFalse(root.loaded)
+        a, b = root.setChildren(["a", "b"])
+        a.setChildren(["a1", "a2"])
+        self.assertTrue(root.loaded)
+        self.assertIs(a.parent, root)
+        self.assertEqual(sorted(i.value for i in root.iterDescendants()), ["a", "a1", "a2", "b"])
+
+    def test_empty_children(self):
+        """子がない場合も読み込み済みになることを確認"""
+        node = LazyNode(1)
+        node.setChildren([])
+        self.assertTrue(node.loaded)
+        self.assertEqual(list(node.iterDescendants()), [])
+
+
+class TestNodeBudget(unittest.TestCase):
+    """NodeBudgetクラスのテスト"""
+
+    def setUp(self):
+        self.budget = NodeBudget(4)
+        self.root = LazyNode("root")
+        self.a, self.b = self.root.setChildren(["a", "b"])
+        self.budget.added(2)
+
+    def load(self, node, count):
+        children = node.setChildren(range(count))
+        self.budget.added(count)
+        return children
+
+    def test_prune_oldest_collapsed(self):
+        """上限を超えると、先に閉じられた項目の子から破棄されることを確認"""
+        self.load(self.a, 2)
+        self.load(self.b, 2)
+        self.budget.collapsed(self.a)
+        self.budget.collapsed(self.b)
+        self.assertTrue(self.budget.isOver())
+        self.assertEqual(self.budget.prune(), [self.a])
+        self.assertFalse(self.a.loaded)
+        self.assertTrue(self.b.loaded)
+        self.assertEqual(self.budget.count, 4)
+
+    def test_expanded_not_pruned(self):
+        """再び開かれた項目は破棄されないことを確認"""
+        self.load(self.a, 5)
+        self.budget.collapsed(self.a)
+        self.budget.expanded(self.a)
+        self.assertEqual(self.budget.prune(), [])
+        self.assertTrue(self.a.loaded)
+
+    def test_prune_removes_descendants(self):
+        """破棄した項目の子孫は、閉じられた項目として残らないことを確認"""
+        child = self.load(self.a, 1)[0]
+        self.load(child, 3)
+        self.budget.collapsed(child)
+        self.budget.collapsed(self.a)
+        self.budget.maxNodes = 3
+        self.assertEqual(self.budget.prune(), [child])
+        self.assertEqual(self.budget.count, 3)
+        self.budget.maxNodes = 0
+        self.assertEqual(self.budget.prune(), [self.a])
+        self.assertEqual(self.budget.count, 2)
+        self.assertEqual(self.budget.prune(), [])
@@ -0,0 +1,132 @@
+import os
+import queue
+import tempfile
+import unittest
+from viewkit.creator.objects.list_export import Exporter, FileTarget, iterChunks
+
+
+class MemoryTarget:
+    def __init__(self):
+        self.chunks = []
+        self.closed = None
+
+    def write(self, text):
+        self.chunks.append(text)
+
+    def close(self, ok):
+        self.closed = ok
+
+
+class TestIterChunks(unittest.TestCase):
+    """iterChunks関数のテスト"""
+
+    def test_chunks(self):
+        """指定行数ごとに文字列になることを確認"""
+        rows = (["a%d" % i, "b"] for i in range(5))
+        self.assertEqual(list(iterChunks(rows, "csv", 2, "\n")), [(2, "a0,b\na1,b\n"), (2, "a2,b\na3,b\n"), (1, "a4,b\n")])
+
+    def test_quote(self):
+        """区切り文字や引用符を含む値が引用されることを確認"""
+        self.assertEqual(list(iterChunks([['a,b', 'say "hi"']], "csv")), [(1, '"a,b","say ""hi"""\r\n')])
+        self.assertEqual(list(iterChunks([["a,b", "c"]], "tsv", lineterminator="\n")), [(1, "a,b\tc\n")])
+
+
+class TestExporter(unittest.TestCase):
+    """Exporterクラスのテスト"""
+
+    def setUp(self):
+        self.queue = queue.Queue()
+        self.target = MemoryTarget()
+        self.progress = []
+        self.finished = []
+
+    def post(self, func, *args):
+        self.queue.put((func, args))
+
+    def createExporter(self, rows, **kw):
+        return Exporter(rows, self.target, onProgress=lambda written, total: self.progress.append((written, total)),
+                        onFinished=self.finished.append, chunkRows=2, lineterminator="\n", post=self.post, **kw)
+
+    def pump(self):
+        """UIスレッドの代わりに、送られた処理を完了まで実行する"""
+        while not self.finished:
+            func, args = self.queue.get(timeout=5)
+            func(*args)
+
+    def test_run(self):
+        """見出し行を含めて書き出され、進捗は見出しを除いた行数になることを確認"""
+        exporter = self.createExporter(iter([["1"], ["2"], ["3"]]), total=3, header=["h"]).run()
+        self.assertEqual("".join(self.target.chunks), "h\n1\n2\n3\n")
+        self.assertEqual(self.progress, [(1, 3), (3, 3)])
+        self.assertTrue(self.target.closed)
+        self.assertEqual(self.finished, [exporter])
+
+    def test_thread(self):
+        """ワーカースレッドで書き出せることを確認"""
+        exporter = self.createExporter(([str(i)] for i in range(5)), format="tsv").start()
+        self.pump()
+        exporter.join(5)
+        self.assertEqual("".join(self.target.chunks), "0\n1\n2\n3\n4\n")
+        self.assertEqual(exporter.written, 5)
+
+    def test_stepwise(self):
+        """1塊ずつ書き出されることを確認"""
+        self.createExporter(iter([["1"], ["2"], ["3"]])).startStepwise()
+        func, args = self.queue.get_nowait()
+        func(*args)
+        self.assertEqual(self.target.chunks, ["1\n2\n"])
+        self.pump()
+        self.assertEqual(self.target.chunks, ["1\n2\n", "3\n"])
+
+    def test_error(self):
+        """読み出し中の例外がerrorに格納され、失敗として閉じられることを確認"""
+        def gen():
+            yield ["1"]
+            raise ValueError("broken")
+        exporter = self.createExporter(gen()).run()
+        self.assertIsInstance(exporter.error, ValueError)
+        self.assertFalse(self.target.closed)
+
+    def test_cancel(self):
+        """中止すると失敗として閉じられることを確認"""
+        exporter = self.createExporter(iter([["1"], ["2"], ["3"]])).startStepwise()
+        exporter.cancel()
+        self.pump()
+        self.assertEqual(self.target.chunks, [])
+        self.assertFalse(self.target.closed)
+
+    def test_unknown_format(self):
+        """未対応の形式はValueErrorになることを確認"""
+        with self.assertRaises(ValueError):
+            self.createExporter([], format="xlsx")
+
+
+class TestFileTarget(unittest.TestCase):
+    """FileTargetクラスのテスト"""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "out.csv")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("old")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_replace(self):
+        """成功した場合のみ置き換えられることを確認"""
+        target = FileTarget(self.path, "utf-8")
+        target.write("new")
+        target.close(True)
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "new")
+        self.assertEqual(os.listdir(self.dir.name), ["out.csv"])
+
+    def test_failure_keeps_original(self):
+        """失敗した場合は元のファイルが残り、一時ファイルが削除されることを確認"""
+        target = FileTarget(self.path, "utf-8")
+        target.write("new")
+        target.close(False)
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "old")
+        self.assertEqual(os.listdir(self.dir.name), ["out.csv"])
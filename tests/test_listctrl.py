@@ -0,0 +1,61 @@
+import unittest
+import wx_stub
+
+listctrl = wx_stub.importObjects("listctrl")
+
+
+class TestListCtrlSelection(unittest.TestCase):
+    """listCtrlの選択状態の写しと、選択関係のイベントのテスト"""
+
+    def setUp(self):
+        self.ctrl = listctrl.listCtrl(None)
+        self.ctrl.SetItemCount(100)
+        self.events = []
+
+    def onSelected(self, event):
+        self.events.append((event.GetIndex(), self.ctrl.IsFrozen()))
+        event.Skip()
+
+    def test_bind_and_unbind(self):
+        """Bindした選択のイベントの関数を、Unbindで外せることを確認"""
+        self.ctrl.Bind(wx_stub.EVT_LIST_ITEM_SELECTED, self.onSelected)
+        self.ctrl.Select(1)
+        self.assertTrue(self.ctrl.Unbind(wx_stub.EVT_LIST_ITEM_SELECTED, handler=self.onSelected))
+        self.ctrl.Select(2)
+        self.assertEqual(self.events, [(1, False)])
+        self.assertFalse(self.ctrl.Unbind(wx_stub.EVT_LIST_ITEM_SELECTED, handler=self.onSelected))
+        # 写しは引き続き更新される
+        self.assertEqual(self.ctrl.getItemSelections(), [1, 2])
+
+    def test_unbind_without_handler(self):
+        """関数を指定しない場合は、最後にBindした関数が外れることを確認"""
+        first = []
+        self.ctrl.Bind(wx_stub.EVT_LIST_ITEM_SELECTED, lambda event: first.append(event.GetIndex()))
+        self.ctrl.Bind(wx_stub.EVT_LIST_ITEM_SELECTED, self.onSelected)
+        self.assertTrue(self.ctrl.Unbind(wx_stub.EVT_LIST_ITEM_SELECTED))
+        self.ctrl.Select(3)
+        self.assertEqual(first, [3])
+        self.assertEqual(self.events, [])
+
+    def test_select_range(self):
+        """selectRangeは描画を止めて選択し、Bindした関数には1項目ずつ通知することを確認"""
+        self.ctrl.Bind(wx_stub.EVT_LIST_ITEM_SELECTED, self.onSelected)
+        self.ctrl.selectRange(10, 14)
+        self.assertEqual(self.events, [(i, True) for i in range(10, 15)])
+        self.assertFalse(self.ctrl.IsFrozen())
+        self.assertEqual(self.ctrl.getItemSelections(), list(range(10, 15)))
+        self.assertEqual(self.ctrl._selection.ranges(), [(10, 15)])
+        self.assertEqual(self.ctrl.GetSelectedItemCount(), 5)
+
+    def test_select_range_resumes_sync(self):
+        """selectRangeの途中で例外が起きても、写しの更新と描画が再開されることを確認"""
+        def fail(event):
+            raise ValueError()
+        self.ctrl.Bind(wx_stub.EVT_LIST_ITEM_SELECTED, fail)
+        self.assertRaises(ValueError, self.ctrl.selectRange, 0, 3)
+        self.assertFalse(self.ctrl.IsFrozen())
+        self.assertFalse(self.ctrl._selectionSyncSuspended)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+from viewkit.creator.objects.prefix_index import PrefixIndex
+from viewkit.creator.objects.row_store import normalizeIndexes
+
+
+class TestPrefixIndex(unittest.TestCase):
+    """PrefixIndexクラスのテスト"""
+
+    def setUp(self):
+        self.index = PrefixIndex()
+        self.index.build(["apple", "Banana", "apricot", "cherry", "avocado"])
+
+    def test_find(self):
+        """前方一致する行が、指定位置以降から順に見つかることを確認"""
+        self.assertEqual(self.index.find("a"), 0)
+        self.assertEqual(self.index.find("a", 1), 2)
+        self.assertEqual(self.index.find("a", 3), 4)
+        self.assertEqual(self.index.find("APR"), 2)
+        self.assertEqual(self.index.find("b"), 1)
+        self.assertEqual(self.index.find("z"), -1)
+
+    def test_wrap_around(self):
+        """末尾まで見つからない場合は先頭から探すことを確認"""
+        self.assertEqual(self.index.find("ban", 3), 1)
+
+    def test_visible(self):
+        """対象外の行が飛ばされることを確認"""
+        self.assertEqual(self.index.find("a", 0, lambda i: i != 0), 2)
+        self.assertEqual(self.index.find("b", 0, lambda i: i != 1), -1)
+
+    def test_appended(self):
+        """追加した行が検索できることを確認"""
+        self.index.appended(5, ["apex", "berry"])
+        self.assertEqual(self.index.find("ape"), 5)
+        self.assertEqual(self.index.find("b", 2), 6)
+        self.index.appended(7, ["x%d" % i for i in range(100)])
+        self.assertEqual(self.index.find("x5"), 12)
+        self.assertEqual(len(self.index), 107)
+
+    def test_inserted(self):
+        """挿入で後ろの行の位置がずれることを確認"""
+        self.index.inserted(1, "aardvark")
+        self.assertEqual(self.index.find("aa"), 1)
+        self.assertEqual(self.index.find("ban"), 2)
+        self.assertEqual(self.index.find("avo"), 5)
+
+    def test_removed(self):
+        """削除した行が見つからなくなり、後ろの行の位置が詰められることを確認"""
+        self.index.removed(normalizeIndexes([0], 5))
+        self.assertEqual(self.index.find("app"), -1)
+        self.assertEqual(self.index.find("apr"), 1)
+        self.index.removed(normalizeIndexes([0, 2], 4))
+        self.assertEqual(self.index.find("a"), 0)
+        self.assertEqual(self.index.find("av"), 1)
+        self.assertEqual(len(self.index), 2)
+
+    def test_changed(self):
+        """表示文字列の変更が反映されることを確認"""
+        self.index.changed(3, "apple pie")
+        self.assertEqual(self.index.find("c"), -1)
+        self.assertEqual(self.index.find("apple", 1), 3)
+
+    def test_changes_before_find(self):
+        """挿入・削除・変更が続いた後の検索で、すべての変更が反映されることを確認"""
+        self.index.inserted(0, "zebra")
+        self.index.changed(1, "blueberry")
+        self.index.removed(normalizeIndexes([3], 6))
+        self.index.appended(5, ["apron"])
+        self.assertEqual(self.index.find("z"), 0)
+        self.assertEqual(self.index.find("bl"), 1)
+        self.assertEqual(self.index.find("ap"), 5)
+        self.assertEqual(self.index.find("a", 2), 4)
+        self.assertEqual(len(self.index), 6)
+
+    def test_first_match_across_strings(self):
+        """異なる文字列が前方一致する場合も、start行目以降で最初の行が返されることを確認"""
+        self.index.build(["ab", "aa", "ab", "aa", "ac"])
+        self.assertEqual(self.index.find("a", 1), 1)
+        self.assertEqual(self.index.find("a", 2), 2)
+        self.assertEqual(self.index.find("a", 4), 4)
+        self.assertEqual(self.index.find("a", 3, lambda i: i != 3), 4)
+        self.assertEqual(self.index.find("ab", 3, lambda i: i != 0), 2)
+
+    def test_not_updated_until_built(self):
+        """作成前や破棄後は更新されないことを確認"""
+        self.index.clear()
+        self.index.appended(0, ["a"])
+        self.assertFalse(self.index.valid)
+        self.assertEqual(len(self.index), 0)
@@ -0,0 +1,83 @@
+import unittest
+from viewkit.creator.objects.range_set import RangeSet, subtractRanges
+
+
+class TestRangeSet(unittest.TestCase):
+    """RangeSetクラスのテスト"""
+
+    def setUp(self):
+        self.set = RangeSet()
+
+    def test_add_merges_adjacent(self):
+        """隣接・重複する範囲がまとめられることを確認"""
+        for i in (3, 4, 1, 2, 10):
+            self.set.add(i)
+        self.assertEqual(self.set.ranges(), [(1, 5), (10, 11)])
+        self.set.add(4, 12)
+        self.assertEqual(self.set.ranges(), [(1, 12)])
+        self.assertEqual(len(self.set), 11)
+
+    def test_discard_splits(self):
+        """範囲の途中を取り除くと2つに分かれることを確認"""
+        self.set.setRange(0, 10)
+        self.set.discard(3, 5)
+        self.assertEqual(self.set.ranges(), [(0, 3), (5, 10)])
+        self.assertEqual(len(self.set), 8)
+        self.set.discard(20)
+        self.assertEqual(len(self.set), 8)
+
+    def test_contains_and_iterate(self):
+        """要素の確認と走査のテスト"""
+        self.set.add(2, 4)
+        self.set.add(7)
+        self.assertIn(3, self.set)
+        self.assertNotIn(4, self.set)
+        self.assertEqual(list(self.set), [2, 3, 7])
+        self.assertEqual(self.set.first(), 2)
+        self.assertEqual(self.set.next(3), 7)
+        self.assertEqual(self.set.next(7), -1)
+
+    def test_select_all_is_constant(self):
+        """全体の設定が1つの範囲で表されることを確認"""
+        self.set.add(5)
+        self.set.setRange(0, 1000000)
+        self.assertEqual(len(self.set), 1000000)
+        self.assertEqual(len(self.set.ranges()), 1)
+
+    def test_truncate(self):
+        """指定数以上の値が取り除かれることを確認"""
+        self.set.add(0, 5)
+        self.set.add(8, 12)
+        self.set.truncate(3)
+        self.assertEqual(self.set.ranges(), [(0, 3)])
+
+    def test_delete_shift(self):
+        """削除で後ろの値が詰められ、範囲が結合されることを確認"""
+        self.set.add(0, 3)
+        self.set.add(4, 6)
+        self.set.deleteShift(3)
+        self.assertEqual(self.set.ranges(), [(0, 5)])
+        self.set.deleteShift(0)
+        self.assertEqual(self.set.ranges(), [(0, 4)])
+
+    def test_insert_shift(self):
+        """挿入で後ろの値がずれ、範囲が分かれることを確認"""
+        self.set.add(2, 5)
+        self.set.add(8)
+        self.set.insertShift(3)
+        self.assertEqual(self.set.ranges(), [(2, 3), (4, 6), (9, 10)])
+        self.set.insertShift(4)
+        self.assertEqual(self.set.ranges(), [(2, 3), (5, 7), (10, 11)])
+        self.assertEqual(len(self.set), 4)
+
+
+class TestSubtractRanges(unittest.TestCase):
+    """subtractRanges関数のテスト"""
+
+    def test_subtract(self):
+        """重なる部分だけが取り除かれることを確認"""
+        self.assertEqual(subtractRanges([(0, 10)], [(2, 4), (6, 7)]), [(0, 2), (4, 6), (7, 10)])
+        self.assertEqual(subtractRanges([(0, 3), (5, 8)], [(2, 6)]), [(0, 2), (6, 8)])
+        self.assertEqual(subtractRanges([(0, 3)], [(0, 3)]), [])
+        self.assertEqual(subtractRanges([(4, 6)], [(0, 1), (8, 9)]), [(4, 6)])
+        self.assertEqual(subtractRanges([], [(0, 1)]), [])
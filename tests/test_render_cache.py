@@ -0,0 +1,55 @@
+import unittest
+from viewkit.creator.objects.render_cache import RenderCache
+
+
+class TestRenderCache(unittest.TestCase):
+    """RenderCacheクラスのテスト"""
+
+    def test_row_is_kept(self):
+        """同じ行の辞書が返されることを確認"""
+        cache = RenderCache(10)
+        cache.row(0)[1] = "text"
+        self.assertEqual(cache.row(0), {1: "text"})
+
+    def test_lru_eviction(self):
+        """上限を超えると最も古い行が破棄されることを確認"""
+        cache = RenderCache(2)
+        cache.row(0)[0] = "a"
+        cache.row(1)[0] = "b"
+        cache.row(0)  # 0行目を最近参照したことにする
+        cache.row(2)[0] = "c"
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.row(0), {0: "a"})
+        self.assertEqual(cache.row(1), {})
+
+    def test_disabled(self):
+        """0を指定するとキャッシュされないことを確認"""
+        cache = RenderCache(0)
+        cache.row(0)[0] = "a"
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.row(0), {})
+
+    def test_invalidate(self):
+        """行単位・範囲・位置以降の破棄のテスト"""
+        cache = RenderCache(100)
+        for i in range(10):
+            cache.row(i)[0] = str(i)
+        cache.invalidateRow(0)
+        self.assertEqual(len(cache), 9)
+        cache.invalidateRange(2, 3)
+        self.assertEqual(len(cache), 7)
+        cache.invalidateRange(0, 1000)
+        self.assertEqual(len(cache), 0)
+        for i in range(10):
+            cache.row(i)[0] = str(i)
+        cache.invalidateFrom(5)
+        self.assertEqual(len(cache), 5)
+
+    def test_set_max_rows(self):
+        """上限を小さくすると古い行が破棄されることを確認"""
+        cache = RenderCache(10)
+        for i in range(10):
+            cache.row(i)[0] = str(i)
+        cache.setMaxRows(3)
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.row(9), {0: "9"})
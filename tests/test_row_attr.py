@@ -0,0 +1,39 @@
+import unittest
+from viewkit.creator.objects.row_attr import ItemAttrCache
+
+
+class TestItemAttrCache(unittest.TestCase):
+    """ItemAttrCacheクラスのテスト"""
+
+    def setUp(self):
+        self.cache = ItemAttrCache()
+
+    def test_shared_attr(self):
+        """同じスタイル名には同じオブジェクトが返されることを確認"""
+        attr = self.cache.get("error")
+        self.assertIsNotNone(attr)
+        self.assertIs(self.cache.get("error"), attr)
+
+    def test_unknown_style(self):
+        """未定義のスタイルとNoneは装飾なしになることを確認"""
+        self.assertIsNone(self.cache.get(None))
+        self.assertIsNone(self.cache.get("unknown"))
+
+    def test_theme(self):
+        """テーマごとに別のオブジェクトが作成されることを確認"""
+        white = self.cache.get("error")
+        self.cache.setDark(True)
+        dark = self.cache.get("error")
+        self.assertIsNot(white, dark)
+        self.assertIs(self.cache.get("error"), dark)
+        self.cache.setDark(False)
+        self.assertIs(self.cache.get("error"), white)
+
+    def test_define_style(self):
+        """スタイルの再定義で作り直されることを確認"""
+        old = self.cache.get("error")
+        self.cache.defineStyle("error", ("#ff0000", None))
+        self.assertIsNot(self.cache.get("error"), old)
+        self.cache.defineStyle("mine", (None, "#00ff00"))
+        self.cache.setDark(True)
+        self.assertIsNotNone(self.cache.get("mine"))
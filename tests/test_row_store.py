@@ -0,0 +1,219 @@
+import unittest
+from viewkit.creator.objects.row_store import ListRowStore, ColumnarRowStore, RecordRowStore, createRowStore, normalizeIndexes, remapIndex
+
+
+class TestListRowStore(unittest.TestCase):
+    """ListRowStoreクラスのテスト"""
+
+    def test_keeps_given_list(self):
+        """渡したリストをコピーせずに保持することを確認"""
+        lst = [["a", "b"]]
+        store = ListRowStore(lst)
+        store.append(["c", "d"])
+        self.assertEqual(len(lst), 2)
+        self.assertIs(store.asList(), lst)
+
+    def test_get_cell_missing_column(self):
+        """存在しない列はデフォルト値を返すことを確認"""
+        store = ListRowStore([["a"]])
+        self.assertEqual(store.getCell(0, 0), "a")
+        self.assertEqual(store.getCell(0, 3), "")
+
+    def test_set_cell_extends_row(self):
+        """短い行に値を設定すると空文字列で埋められることを確認"""
+        store = ListRowStore([["a"]])
+        store.setCell(0, 2, "c")
+        self.assertEqual(store[0], ["a", "", "c"])
+
+    def test_permute_keeps_given_list(self):
+        """並べ替え後も渡したリストを保持していることを確認"""
+        lst = [["a"], ["b"], ["c"]]
+        store = ListRowStore(lst)
+        store.permute([1, 2, 0])
+        self.assertEqual(lst, [["b"], ["c"], ["a"]])
+        self.assertEqual(store.getColumnValues(1, None), [None, None, None])
+
+    def test_insert_and_delete_column(self):
+        """列の挿入と削除のテスト"""
+        store = ListRowStore([["a", "b"], ["c", "d"]])
+        store.insertColumn(1, "x")
+        self.assertEqual(store.copy(), [["a", "x", "b"], ["c", "x", "d"]])
+        store.deleteColumn(0)
+        self.assertEqual(store.copy(), [["x", "b"], ["x", "d"]])
+
+
+class TestColumnarRowStore(unittest.TestCase):
+    """ColumnarRowStoreクラスのテスト"""
+
+    def setUp(self):
+        self.store = ColumnarRowStore(["q", None], [[1, "a"], [2, "b"], [3, "c"]])
+
+    def test_rows_are_lists(self):
+        """行がリストとして取り出せることを確認"""
+        self.assertEqual(self.store[0], [1, "a"])
+        self.assertEqual(self.store[-1], [3, "c"])
+        self.assertEqual(self.store[0:2], [[1, "a"], [2, "b"]])
+        self.assertEqual(self.store.copy(), [[1, "a"], [2, "b"], [3, "c"]])
+
+    def test_short_row_is_padded(self):
+        """列数の足りない行はデフォルト値で埋められることを確認"""
+        self.store.append([4])
+        self.assertEqual(self.store[3], [4, ""])
+
+    def test_too_long_row(self):
+        """列数を超える行はエラーになることを確認"""
+        with self.assertRaises(ValueError):
+            self.store.append([1, "a", "extra"])
+
+    def test_insert_and_delete(self):
+        """行の挿入と削除のテスト"""
+        self.store.insert(1, [9, "z"])
+        self.assertEqual(len(self.store), 4)
+        self.assertEqual(self.store[1], [9, "z"])
+        del self.store[0:2]
+        self.assertEqual(self.store.copy(), [[2, "b"], [3, "c"]])
+        self.assertEqual(self.store.pop(0), [2, "b"])
+        self.assertEqual(len(self.store), 1)
+
+    def test_index_and_contains(self):
+        """行の検索のテスト"""
+        self.assertEqual(self.store.index([2, "b"]), 1)
+        self.assertIn([3, "c"], self.store)
+        self.assertNotIn([3, "x"], self.store)
+
+    def test_set_cell(self):
+        """セルの変更のテスト"""
+        self.store.setCell(1, 1, "changed")
+        self.assertEqual(self.store.getCell(1, 1), "changed")
+        self.assertEqual(self.store.getCell(1, 5), "")
+
+    def test_set_cell_converts_text(self):
+        """数値の列に文字列を設定すると列の型に変換され、変換できなければValueErrorになることを確認"""
+        store = ColumnarRowStore(["q", "d", None], [[1, 1.5, "a"]])
+        store.setCell(0, 0, " 42 ")
+        store.setCell(0, 1, "2.25")
+        store.setCell(0, 2, "b")
+        self.assertEqual(store[0], [42, 2.25, "b"])
+        self.assertRaises(ValueError, store.setCell, 0, 0, "abc")
+        self.assertRaises(ValueError, store.setCell, 0, 0, "1.5")
+        self.assertRaises(ValueError, store.setCell, 0, 0, str(2 ** 70))
+        self.assertEqual(store[0], [42, 2.25, "b"])
+
+    def test_sort_and_reverse(self):
+        """並べ替えのテスト"""
+        self.store.reverse()
+        self.assertEqual(self.store.getCell(0, 0), 3)
+        self.store.sort()
+        self.assertEqual(self.store.copy(), [[1, "a"], [2, "b"], [3, "c"]])
+        self.store.sort(key=lambda row: row[1], reverse=True)
+        self.assertEqual(self.store.getCell(0, 1), "c")
+
+    def test_insert_and_delete_column(self):
+        """列の挿入と削除のテスト"""
+        self.store.insertColumn(1, "x")
+        self.assertEqual(self.store[0], [1, "x", "a"])
+        self.store.deleteColumn(0)
+        self.assertEqual(self.store[2], ["x", "c"])
+
+    def test_permute(self):
+        """指定した順序への並べ替えのテスト"""
+        self.store.permute([2, 0, 1])
+        self.assertEqual(self.store.copy(), [[3, "c"], [1, "a"], [2, "b"]])
+        self.assertEqual(self.store.getColumnValues(0), [3, 1, 2])
+        self.assertEqual(self.store.getColumnValues(5), ["", "", ""])
+
+    def test_create_empty(self):
+        """同じ設定の空のストアが作成されることを確認"""
+        empty = self.store.createEmpty()
+        self.assertEqual(len(empty), 0)
+        self.assertEqual(empty.typecodes, ["q", None])
+
+    def test_equality_with_list(self):
+        """リストとの比較のテスト"""
+        self.assertEqual(self.store, [[1, "a"], [2, "b"], [3, "c"]])
+
+
+class TestRecordRowStore(unittest.TestCase):
+    """RecordRowStoreクラスのテスト"""
+
+    def test_rows_are_records(self):
+        """追加した行がレコードに変換されることを確認"""
+        store = RecordRowStore(["name", "size"], [["a", 1]])
+        row = store[0]
+        self.assertIsInstance(row, store.recordClass)
+        self.assertEqual(row.name, "a")
+        self.assertEqual(row[1], 1)
+        self.assertEqual(row, ["a", 1])
+        self.assertFalse(hasattr(row, "__dict__"))
+
+    def test_index_with_list(self):
+        """リストでレコードを検索できることを確認"""
+        store = RecordRowStore(["name", "size"], [["a", 1], ["b", 2]])
+        self.assertEqual(store.index(["b", 2]), 1)
+
+    def test_insert_column(self):
+        """列の挿入でレコードが作り直されることを確認"""
+        store = RecordRowStore(["name", "size"], [["a", 1]])
+        store.insertColumn(1, "x")
+        self.assertEqual(list(store[0]), ["a", "x", 1])
+        self.assertEqual(store[0].name, "a")
+        store.deleteColumn(0)
+        self.assertEqual(list(store[0]), ["x", 1])
+
+
+class TestCreateRowStore(unittest.TestCase):
+    """createRowStore関数のテスト"""
+
+    def test_wrap_list(self):
+        """リストはListRowStoreで包まれることを確認"""
+        lst = []
+        store = createRowStore(lst)
+        self.assertIsInstance(store, ListRowStore)
+        self.assertIs(store.asList(), lst)
+
+    def test_store_as_is(self):
+        """RowStoreはそのまま返されることを確認"""
+        store = ColumnarRowStore(["l"])
+        self.assertIs(createRowStore(store), store)
+
+    def test_none(self):
+        """Noneの場合は空のストアが作られることを確認"""
+        self.assertEqual(len(createRowStore(None)), 0)
+
+
+class TestDeleteIndexes(unittest.TestCase):
+    """行の一括削除のテスト"""
+
+    def test_normalize_indexes(self):
+        """行の指定が正規化されることを確認"""
+        self.assertEqual(normalizeIndexes(slice(2, 5), 10), range(2, 5))
+        self.assertEqual(normalizeIndexes(slice(None, None, -1), 3), range(0, 3))
+        self.assertEqual(normalizeIndexes(slice(0, 6, 2), 10), [0, 2, 4])
+        self.assertEqual(normalizeIndexes([5, -1, 5, 0], 10), [0, 5, 9])
+        self.assertEqual(normalizeIndexes(3, 10), [3])
+        self.assertEqual(len(normalizeIndexes(slice(5, 5), 10)), 0)
+        with self.assertRaises(IndexError):
+            normalizeIndexes([10], 10)
+
+    def test_remap_index(self):
+        """削除後の位置の計算のテスト"""
+        self.assertEqual(remapIndex(1, range(3, 6)), (1, False))
+        self.assertEqual(remapIndex(4, range(3, 6)), (3, True))
+        self.assertEqual(remapIndex(8, range(3, 6)), (5, False))
+        self.assertEqual(remapIndex(4, [1, 3, 5]), (2, False))
+        self.assertEqual(remapIndex(5, [1, 3, 5]), (3, True))
+
+    def test_delete_keeps_equal_rows(self):
+        """同じ内容の行があっても指定した位置の行が削除されることを確認"""
+        lst = [["a"], ["a"], ["b"], ["a"]]
+        store = ListRowStore(lst)
+        store.deleteIndexes(normalizeIndexes([1, 3], 4))
+        self.assertEqual(lst, [["a"], ["b"]])
+
+    def test_delete_columnar(self):
+        """列指向ストアの一括削除のテスト"""
+        store = ColumnarRowStore(["q", None], [[i, str(i)] for i in range(10)])
+        store.deleteIndexes(normalizeIndexes([0, 4, 5, 9], 10))
+        self.assertEqual([r[0] for r in store], [1, 2, 3, 6, 7, 8])
+        store.deleteIndexes(normalizeIndexes(slice(1, 3), len(store)))
+        self.assertEqual(store.copy(), [[1, "1"], [6, "6"], [7, "7"], [8, "8"]])
@@ -1,8 +1,11 @@
 import unittest
 import os
 import json
+import sqlite3
 import tempfile
-from viewkit.settings import SettingsManager
+import threading
+import time
+from viewkit.settings import CustomSettingField, SettingsManager, SqliteStorage
 
 
 class TestSettingsManager(unittest.TestCase):
@@ -278,5 +281,691 @@ class TestSettingsManager(unittest.TestCase):
             self.settings.changeSetting('test_str.nested', 'value')
 
 
+class TestSettingsManagerValidation(unittest.TestCase):
+    """SettingsManagerの、変更されたパスのみを検証する処理のテスト"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.settings = SettingsManager(os.path.join(self.temp_dir.name, "settings.json"))
+        self.settings.registerCustomField(CustomSettingField("feature", {"enabled": {"type": "boolean", "default": True}}))
+        self.settings.registerCustomField(CustomSettingField("free", {}))
+        self.settings.loadOrCreateDefault()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_default_custom_fields(self):
+        """カスタムフィールドのデフォルト値が作成され、スキーマが変更されないことを確認"""
+        self.assertEqual(self.settings.getSetting("custom"), {"feature": {"enabled": True}, "free": {}})
+        self.assertNotIn("schema", self.settings.schema["custom"])
+
+    def test_change_leaf(self):
+        """葉の値を変更でき、他の値は変わらないことを確認"""
+        self.settings.changeSetting("main_window.x", 10)
+        self.settings.changeSetting("view.is_dark", True)
+        self.assertEqual(self.settings.getSetting("main_window.x"), 10)
+        self.assertEqual(self.settings.getSetting("main_window.size_x"), -1)
+        self.assertTrue(self.settings.getSetting("view.is_dark"))
+
+    def test_invalid_value_keeps_data(self):
+        """検証に失敗した場合、値が変更されないことを確認"""
+        with self.assertRaises(ValueError):
+            self.settings.changeSetting("main_window.x", -1)
+        with self.assertRaises(ValueError):
+            self.settings.changeSetting("view.is_dark", "yes")
+        self.assertEqual(self.settings.getSetting("main_window.x"), 0)
+        self.assertFalse(self.settings.getSetting("view.is_dark"))
+
+    def test_unknown_field(self):
+        """スキーマにないキーはエラーになることを確認"""
+        with self.assertRaises(ValueError):
+            self.settings.changeSetting("unknown", 1)
+        with self.assertRaises(ValueError):
+            self.settings.changeSetting("view.unknown", 1)
+        self.assertNotIn("unknown", self.settings.getSetting("view"))
+
+    def test_replace_subtree_normalized(self):
+        """辞書全体を置き換えると、その部分にデフォルト値が補われることを確認"""
+        self.settings.changeSetting("main_window", {"x": 5})
+        self.assertEqual(self.settings.getSetting("main_window.x"), 5)
+        self.assertEqual(self.settings.getSetting("main_window.maximized"), 0)
+
+    def test_free_dict(self):
+        """スキーマのない辞書の中を変更できることを確認"""
+        self.settings.changeSetting("shortcuts.main.open", "Ctrl+O")
+        self.assertEqual(self.settings.getSetting("shortcuts"), {"main": {"open": "Ctrl+O"}})
+        with self.assertRaises(ValueError):
+            self.settings.changeSetting("shortcuts.main.open.key", "O")
+
+    def test_custom_setting(self):
+        """カスタムフィールドの中の値が、フィールドのスキーマで検証されることを確認"""
+        self.settings.changeSetting("custom.feature.enabled", False)
+        self.assertFalse(self.settings.getSetting("custom.feature.enabled"))
+        with self.assertRaises(ValueError):
+            self.settings.changeSetting("custom.feature.enabled", "no")
+        with self.assertRaises(ValueError):
+            self.settings.setCustomSetting("feature", {"enabled": 1})
+        self.settings.setCustomSetting("free", [1, 2])
+        self.assertEqual(self.settings.getSetting("custom.free"), [1, 2])
+        with self.assertRaises(ValueError):
+            self.settings.changeSetting("custom.missing", 1)
+        with self.assertRaises(ValueError):
+            self.settings.changeSetting("custom", {})
+
+    def test_load_validates_custom_field(self):
+        """読み込み時にカスタムフィールドが検証され、不正な場合はデフォルトに戻ることを確認"""
+        with open(self.settings.filename, "w", encoding="utf-8") as f:
+            json.dump({"custom": {"feature": {"enabled": "no"}}}, f)
+        self.settings.loadOrCreateDefault()
+        self.assertTrue(self.settings.getSetting("custom.feature.enabled"))
+
+
+class TestSettingsManagerSaveLater(unittest.TestCase):
+    """SettingsManagerの遅延書き込みのテスト"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.settings = SettingsManager(os.path.join(self.temp_dir.name, "settings.json"))
+        self.settings.loadOrCreateDefault()
+        self.writes = []
+        write_file = self.settings._writeFile
+
+        def countingWriteFile(text):
+            self.writes.append(text)
+            write_file(text)
+        self.settings._writeFile = countingWriteFile
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def readFile(self):
+        with open(self.settings.filename, encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_coalesce(self):
+        """連続した変更が1回の書き込みにまとめられることを確認"""
+        for i in range(50):
+            self.settings.changeSetting("main_window.x", i)
+            self.settings.saveLater(0.1)
+        self.assertTrue(self.settings.isDirty())
+        deadline = time.monotonic() + 5
+        while self.settings.isDirty() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.1)
+        self.assertEqual(len(self.writes), 1)
+        self.assertEqual(self.readFile()["main_window"]["x"], 49)
+
+    def test_flush(self):
+        """flushで待たずに書き込まれ、その後の遅延書き込みは行われないことを確認"""
+        self.settings.changeSetting("view.is_dark", True)
+        self.settings.saveLater(0.2)
+        self.settings.flush()
+        self.assertTrue(self.readFile()["view"]["is_dark"])
+        self.assertFalse(self.settings.isDirty())
+        time.sleep(0.3)
+        self.assertEqual(len(self.writes), 1)
+        self.settings.flush()
+        self.assertEqual(len(self.writes), 1)
+
+    def test_no_temp_file_left(self):
+        """書き込み後に一時ファイルが残らないことを確認"""
+        self.settings.save()
+        self.assertEqual([i for i in os.listdir(self.temp_dir.name) if i.endswith(".tmp")], [])
+
+    def test_failed_write_keeps_dirty(self):
+        """書き込みに失敗した場合、元のファイルが残り、変更が未保存のままになることを確認"""
+        def failingWriteFile(text):
+            raise OSError("disk full")
+        self.settings._writeFile = failingWriteFile
+        self.settings.changeSetting("main_window.x", 3)
+        with self.assertRaises(OSError):
+            self.settings.save()
+        self.assertTrue(self.settings.isDirty())
+        self.assertEqual(self.readFile()["main_window"]["x"], 0)
+
+    def test_writer_survives_unexpected_error(self):
+        """OSError以外の例外で書き込みに失敗しても、遅延書き込みのスレッドが再試行することを確認"""
+        write_file = self.settings._writeFile
+        failures = []
+
+        def failingOnceWriteFile(text):
+            if not failures:
+                failures.append(text)
+                raise RuntimeError("unexpected")
+            write_file(text)
+        self.settings._writeFile = failingOnceWriteFile
+        self.settings.DEFAULT_SAVE_DELAY = 0.05
+        self.settings.changeSetting("main_window.x", 8)
+        with self.assertLogs(self.settings.logger, "ERROR"):
+            self.settings.saveLater(0.01)
+            # 失敗した書き込みが記録され、再試行で書き込まれるまで待つ
+            deadline = time.monotonic() + 5
+            while not self.writes and time.monotonic() < deadline:
+                time.sleep(0.02)
+        self.assertEqual(len(failures), 1)
+        self.assertFalse(self.settings.isDirty())
+        self.assertEqual(self.readFile()["main_window"]["x"], 8)
+        self.assertTrue(self.settings._writer.is_alive())
+
+
+class TestSettingsManagerJournal(unittest.TestCase):
+    """SettingsManagerのジャーナルのテスト"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.temp_dir.name, "settings.json")
+        self.settings = self.createManager()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def createManager(self, **kw):
+        settings = SettingsManager(self.filename, journal=True, **kw)
+        settings.registerCustomField(CustomSettingField("history", {}))
+        settings.loadOrCreateDefault()
+        return settings
+
+    def readBase(self):
+        with open(self.filename, encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_append_and_replay(self):
+        """変更がジャーナルに追記され、読み込み時に適用されることを確認"""
+        self.settings.changeSetting("main_window.x", 10)
+        self.settings.changeSetting("custom.history", ["a", "b"])
+        self.settings.save()
+        self.assertEqual(self.readBase()["main_window"]["x"], 0)
+        with open(self.settings.journal_filename, encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 3)
+        settings = self.createManager()
+        self.assertEqual(settings.getSetting("main_window.x"), 10)
+        self.assertEqual(settings.getSetting("custom.history"), ["a", "b"])
+
+    def test_compact(self):
+        """統合するとジャーナルが削除され、設定ファイルに反映されることを確認"""
+        self.settings.changeSetting("view.is_dark", True)
+        self.settings.save()
+        self.settings.compact()
+        self.assertFalse(os.path.exists(self.settings.journal_filename))
+        self.assertTrue(self.readBase()["view"]["is_dark"])
+        self.assertTrue(self.createManager().getSetting("view.is_dark"))
+
+    def test_background_compaction(self):
+        """ジャーナルが上限を超えると、バックグラウンドで統合されることを確認"""
+        settings = self.createManager(journal_threshold=100)
+        for i in range(10):
+            settings.changeSetting("custom.history", list(range(i)))
+            settings.save()
+        settings._compactor.join(5)
+        self.assertNotEqual(self.readBase()["custom"]["history"], [])
+        self.assertEqual(self.createManager().getSetting("custom.history"), list(range(9)))
+
+    def test_skip_compacted_records(self):
+        """統合済みの変更は、ジャーナルが残っていても適用されないことを確認"""
+        self.settings.changeSetting("main_window.x", 1)
+        self.settings.save()
+        with open(self.settings.journal_filename, encoding="utf-8") as f:
+            journal = f.read()
+        self.settings.changeSetting("main_window.x", 2)
+        self.settings.compact()
+        # ジャーナルを削除する前に中断した場合を再現する
+        with open(self.settings.journal_filename, "w", encoding="utf-8") as f:
+            f.write(journal)
+        self.assertEqual(self.createManager().getSetting("main_window.x"), 2)
+
+    def test_broken_record(self):
+        """書きかけの行があっても、それまでの変更が適用されることを確認"""
+        self.settings.changeSetting("main_window.y", 7)
+        self.settings.save()
+        with open(self.settings.journal_filename, "a", encoding="utf-8") as f:
+            f.write('{"seq": 99, "pa')
+        settings = self.createManager()
+        self.assertEqual(settings.getSetting("main_window.y"), 7)
+        self.assertFalse(os.path.exists(settings.journal_filename))
+        self.assertEqual(self.readBase()["main_window"]["y"], 7)
+
+    def test_custom_record_path(self):
+        """カスタムフィールド内の変更は、フィールド全体ではなく変更した位置だけが記録されることを確認"""
+        def create():
+            settings = SettingsManager(os.path.join(self.temp_dir.name, "state.json"), journal=True)
+            settings.registerCustomField(CustomSettingField("state", {"count": {"type": "integer", "default": 0}}))
+            settings.loadOrCreateDefault()
+            return settings
+        settings = create()
+        settings.changeSetting("custom.state.7", 70)
+        settings.changeSetting("custom.state.tree.a", 1)
+        settings.save()
+        with open(settings.journal_filename, encoding="utf-8") as f:
+            records = [(i["path"], i["value"]) for i in map(json.loads, f)]
+        self.assertIn((["custom", "state", "7"], 70), records)
+        self.assertIn((["custom", "state", "tree"], {"a": 1}), records)
+        self.assertEqual(create().getSetting("custom.state"), {"count": 0, "7": 70, "tree": {"a": 1}})
+
+    def test_replay_validated_without_stamp(self):
+        """設定ファイルが未検証の場合は、記録を検証して適用し、設定ファイルに統合することを確認"""
+        self.settings.changeSetting("main_window.x", 5)
+        self.settings.save()
+        os.remove(self.settings.stamp_filename)
+        settings = self.createManager()
+        self.assertEqual(settings.getSetting("main_window.x"), 5)
+        self.assertFalse(os.path.exists(settings.journal_filename))
+        self.assertEqual(self.readBase()["main_window"]["x"], 5)
+
+    def test_load_without_journal(self):
+        """ジャーナルを使わない場合も、ジャーナルを使っていた設定ファイルを読めることを確認"""
+        self.settings.changeSetting("main_window.x", 4)
+        self.settings.compact()
+        settings = SettingsManager(self.filename)
+        settings.loadOrCreateDefault()
+        self.assertEqual(settings.getSetting("main_window.x"), 4)
+        self.assertIsNone(settings.getSetting("journal_seq"))
+
+
+class TestSettingsManagerValidatedStamp(unittest.TestCase):
+    """SettingsManagerの、検証済みの設定ファイルの検証を省略する処理のテスト"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.temp_dir.name, "settings.json")
+        settings = self.createManager()
+        settings.loadOrCreateDefault()
+        settings.changeSetting("main_window.x", 12)
+        settings.save()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def createManager(self, fields=()):
+        settings = SettingsManager(self.filename)
+        settings.registerCustomField(CustomSettingField("feature", {"enabled": {"type": "boolean", "default": True}}))
+        for field in fields:
+            settings.registerCustomField(field)
+        return settings
+
+    def load(self, settings):
+        """検証した回数を数えながら読み込む"""
+        validated = []
+        validate = settings._validateLoadedData
+
+        def countingValidate(data):
+            validated.append(data)
+            validate(data)
+        settings._validateLoadedData = countingValidate
+        settings.loadOrCreateDefault()
+        return len(validated)
+
+    def test_skip_unchanged(self):
+        """保存したファイルを読み込む場合は検証されないことを確認"""
+        settings = self.createManager()
+        self.assertEqual(self.load(settings), 0)
+        self.assertEqual(settings.getSetting("main_window.x"), 12)
+        self.assertTrue(settings.getSetting("custom.feature.enabled"))
+
+    def test_file_changed(self):
+        """ファイルが変更された場合は検証されることを確認"""
+        with open(self.filename, encoding="utf-8") as f:
+            data = json.load(f)
+        data["main_window"]["x"] = 3
+        with open(self.filename, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        settings = self.createManager()
+        self.assertEqual(self.load(settings), 1)
+        self.assertEqual(settings.getSetting("main_window.x"), 3)
+        # 正規化で変わらなかったので、次回は検証されない
+        self.assertEqual(self.load(self.createManager()), 0)
+
+    def test_schema_changed(self):
+        """カスタムフィールドが変わった場合は検証されることを確認"""
+        settings = self.createManager([CustomSettingField("other", {})])
+        self.assertEqual(self.load(settings), 1)
+
+    def test_normalized_file_not_stamped(self):
+        """正規化で値が補われたファイルは、次回も検証されることを確認"""
+        with open(self.filename, "w", encoding="utf-8") as f:
+            json.dump({"view": {"is_dark": True}}, f)
+        settings = self.createManager()
+        self.assertEqual(self.load(settings), 1)
+        self.assertEqual(settings.getSetting("main_window.x"), 0)
+        self.assertEqual(self.load(self.createManager()), 1)
+
+
+class TestSettingsManagerSubscribe(unittest.TestCase):
+    """SettingsManagerの変更通知のテスト"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.settings = SettingsManager(os.path.join(self.temp_dir.name, "settings.json"))
+        self.settings.registerCustomField(CustomSettingField("feature", {"enabled": {"type": "boolean", "default": True}}))
+        self.settings.loadOrCreateDefault()
+        self.calls = []
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def subscribe(self, path):
+        self.settings.subscribe(path, lambda value: self.calls.append((path, value)))
+
+    def test_changed_subtree_only(self):
+        """変更された部分とその親の購読者だけに通知されることを確認"""
+        for path in ("view", "view.is_dark", "view.font", "main_window", ""):
+            self.subscribe(path)
+        self.settings.changeSetting("view.is_dark", True)
+        self.assertEqual(sorted(i[0] for i in self.calls), ["", "view", "view.is_dark"])
+        self.assertIn(("view.is_dark", True), self.calls)
+
+    def test_same_value_not_notified(self):
+        """値が変わらない場合は通知されないことを確認"""
+        self.subscribe("main_window.x")
+        self.settings.changeSetting("main_window.x", 0)
+        self.assertEqual(self.calls, [])
+
+    def test_replace_parent(self):
+        """親の辞書を置き換えた場合、値が変わった子の購読者だけに通知されることを確認"""
+        self.subscribe("main_window.x")
+        self.subscribe("main_window.y")
+        self.settings.changeSetting("main_window", {"x": 0, "y": 5})
+        self.assertEqual(self.calls, [("main_window.y", 5)])
+
+    def test_custom_setting(self):
+        """カスタム設定の変更も通知されることを確認"""
+        self.subscribe("custom.feature.enabled")
+        self.settings.setCustomSetting("feature", {"enabled": False})
+        self.assertEqual(self.calls, [("custom.feature.enabled", False)])
+
+    def test_batch(self):
+        """バッチ中の変更が、購読者ごとに1回の通知にまとめられることを確認"""
+        self.subscribe("main_window")
+        with self.settings.batch():
+            for i in range(10):
+                self.settings.changeSetting("main_window.x", i + 1)
+            self.assertEqual(self.calls, [])
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(self.calls[0][1]["x"], 10)
+
+    def test_notifier(self):
+        """setNotifierで通知を遅らせた場合、まとめて1回通知されることを確認"""
+        posted = []
+        self.settings.setNotifier(posted.append)
+        self.subscribe("view")
+        self.settings.changeSetting("view.is_dark", True)
+        self.settings.changeSetting("view.is_word_wrap", True)
+        self.assertEqual(len(posted), 1)
+        posted[0]()
+        self.assertEqual(len(self.calls), 1)
+
+    def test_reload(self):
+        """ファイルを読み込み直した場合、変わった部分だけが通知されることを確認"""
+        self.subscribe("view.is_dark")
+        self.subscribe("main_window.x")
+        with open(self.settings.filename, encoding="utf-8") as f:
+            data = json.load(f)
+        data["view"]["is_dark"] = True
+        with open(self.settings.filename, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        self.settings.loadOrCreateDefault()
+        self.assertEqual(self.calls, [("view.is_dark", True)])
+
+    def test_unsubscribe(self):
+        """購読を解除すると通知されないことを確認"""
+        callback = self.calls.append
+        self.settings.subscribe("view.is_dark", callback)
+        self.assertTrue(self.settings.unsubscribe("view.is_dark", callback))
+        self.assertFalse(self.settings.unsubscribe("view.is_dark", callback))
+        self.settings.changeSetting("view.is_dark", True)
+        self.assertEqual(self.calls, [])
+
+
+class TestSettingsManagerAccessor(unittest.TestCase):
+    """SettingsManagerのアクセサと属性ビューのテスト"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.settings = SettingsManager(os.path.join(self.temp_dir.name, "settings.json"))
+        self.settings.registerCustomField(CustomSettingField("feature", {"enabled": {"type": "boolean", "default": True}}))
+        self.settings.registerCustomField(CustomSettingField("free", {}))
+        self.settings.loadOrCreateDefault()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_cached_accessor(self):
+        """同じパスには同じアクセサが返され、値を読み書きできることを確認"""
+        accessor = self.settings.accessor("view.is_dark")
+        self.assertIs(self.settings.accessor("view.is_dark"), accessor)
+        self.assertFalse(accessor.get())
+        accessor.set(True)
+        self.assertTrue(accessor.get())
+        self.assertTrue(self.settings.getSetting("view.is_dark"))
+        with self.assertRaises(ValueError):
+            accessor.set("yes")
+
+    def test_get_setting_without_accessor(self):
+        """getSettingはアクセサを作成せずに値を返すことを確認"""
+        for i in range(10):
+            self.assertEqual(self.settings.getSetting("custom.free.key%d" % i, i), i)
+        self.assertFalse(self.settings.getSetting("view.is_dark"))
+        self.assertEqual(self.settings._accessors, {})
+        self.settings.changeSetting("view.is_dark", True)
+        self.assertTrue(self.settings.getSetting("view.is_dark"))
+
+    def test_parent_replaced(self):
+        """親の辞書が置き換えられた場合も、新しい値が返されることを確認"""
+        accessor = self.settings.accessor("main_window.x")
+        self.assertEqual(accessor.get(), 0)
+        self.settings.changeSetting("main_window", {"x": 8})
+        self.assertEqual(accessor.get(), 8)
+
+    def test_reload(self):
+        """ファイルを読み込み直した場合も、新しい値が返されることを確認"""
+        accessor = self.settings.accessor("view.font")
+        self.assertEqual(accessor.get(), "")
+        with open(self.settings.filename, encoding="utf-8") as f:
+            data = json.load(f)
+        data["view"]["font"] = "Arial 12"
+        with open(self.settings.filename, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        self.settings.loadOrCreateDefault()
+        self.assertEqual(accessor.get(), "Arial 12")
+
+    def test_missing(self):
+        """存在しない値にはデフォルト値が返されることを確認"""
+        self.assertIsNone(self.settings.accessor("view.unknown").get())
+        self.assertEqual(self.settings.getSetting("view.is_dark.x", "default"), "default")
+
+    def test_values_view(self):
+        """属性としてたどって読み書きできることを確認"""
+        values = self.settings.values
+        self.assertFalse(values.view.is_dark)
+        values.view.is_dark = True
+        self.assertTrue(self.settings.getSetting("view.is_dark"))
+        self.assertTrue(values.custom.feature.enabled)
+        self.assertEqual(values.custom.free, {})
+        self.assertEqual(values.shortcuts, {})
+        self.assertIn("is_word_wrap", dir(values.view))
+        with self.assertRaises(AttributeError):
+            values.view.unknown
+        with self.assertRaises(AttributeError):
+            values.view.unknown = 1
+        with self.assertRaises(ValueError):
+            values.main_window.x = -5
+
+
+class TestSettingsManagerRuleCustomField(unittest.TestCase):
+    """値そのもののルールで定義したカスタムフィールドのテスト"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.temp_dir.name, "settings.json")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def createManager(self, storage=None):
+        settings = SettingsManager(self.filename, storage=storage)
+        settings.registerCustomField(CustomSettingField("user_name", {"type": "string", "default": "nekochan"}))
+        settings.registerCustomField(CustomSettingField("user_age", {"type": "integer", "default": 27}))
+        settings.loadOrCreateDefault()
+        return settings
+
+    def test_defaults(self):
+        """デフォルト値で作成し、読み込み直しても同じ値になることを確認"""
+        for i in range(2):
+            settings = self.createManager()
+            self.assertEqual(settings.getSetting("custom.user_name"), "nekochan")
+            self.assertEqual(settings.getSetting("custom.user_age"), 27)
+            self.assertEqual(settings.values.custom.user_name, "nekochan")
+
+    def test_change(self):
+        """ルールに従って検証され、変更が保存されることを確認"""
+        settings = self.createManager()
+        settings.setCustomSetting("user_name", "inuchan")
+        settings.changeSetting("custom.user_age", 3)
+        with self.assertRaises(ValueError):
+            settings.changeSetting("custom.user_age", "three")
+        with self.assertRaises(ValueError):
+            settings.changeSetting("custom.user_name.first", "a")
+        settings.save()
+        settings = self.createManager()
+        self.assertEqual(settings.getSetting("custom.user_name"), "inuchan")
+        self.assertEqual(settings.getSetting("custom.user_age"), 3)
+
+    def test_storage_default(self):
+        """ストレージを使う場合も、行がなければデフォルト値になることを確認"""
+        storage = SqliteStorage(os.path.join(self.temp_dir.name, "settings.db"))
+        try:
+            self.createManager(storage)
+            storage.write({"custom.user_age": None, "custom.user_name": json.dumps(5)})
+            settings = self.createManager(storage)
+            self.assertEqual(settings.getSetting("custom.user_age"), 27)
+            self.assertEqual(settings.getSetting("custom.user_name"), "nekochan")
+        finally:
+            storage.close()
+
+
+class RecordingStorage(SqliteStorage):
+    """読み書きされた行を記録するストレージ"""
+
+    def __init__(self, filename):
+        super().__init__(filename)
+        self.reads = []
+        self.writes = []
+
+    def read(self, key):
+        self.reads.append(key)
+        return super().read(key)
+
+    def write(self, rows):
+        self.writes.append(dict(rows))
+        super().write(rows)
+
+
+class TestSettingsManagerStorage(unittest.TestCase):
+    """SettingsManagerのストレージ(SqliteStorage)のテスト"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.temp_dir.name, "settings.db")
+        self.storages = []
+        settings = self.createManager()
+        settings.changeSetting("main_window.x", 20)
+        settings.setCustomSetting("history", list(range(100)))
+        settings.save()
+
+    def tearDown(self):
+        for storage in self.storages:
+            storage.close()
+        self.temp_dir.cleanup()
+
+    def createManager(self):
+        storage = RecordingStorage(self.db)
+        self.storages.append(storage)
+        settings = SettingsManager(os.path.join(self.temp_dir.name, "settings.json"), storage=storage)
+        settings.registerCustomField(CustomSettingField("history", {}))
+        settings.registerCustomField(CustomSettingField("feature", {"enabled": {"type": "boolean", "default": True}}))
+        settings.loadOrCreateDefault()
+        return settings
+
+    def test_default_rows(self):
+        """最初の読み込みで、行ごとにデフォルト値が書き込まれることを確認"""
+        self.assertEqual(self.storages[0].keys(), {"app_version", "schema_version", "shortcuts", "main_window", "view", "custom.history", "custom.feature"})
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir.name, "settings.json")))
+        with sqlite3.connect(self.db) as connection:
+            self.assertEqual(connection.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+    def test_lazy_load(self):
+        """参照された行だけが読み込まれることを確認"""
+        settings = self.createManager()
+        storage = self.storages[-1]
+        self.assertEqual(storage.reads, [])
+        self.assertEqual(settings.getSetting("main_window.x"), 20)
+        self.assertEqual(storage.reads, ["main_window"])
+        self.assertEqual(settings.getSetting("custom.history")[-1], 99)
+        self.assertEqual(storage.reads, ["main_window", "custom.history"])
+
+    def test_write_changed_rows(self):
+        """保存時に変更された行だけが書き込まれることを確認"""
+        settings = self.createManager()
+        storage = self.storages[-1]
+        settings.changeSetting("view.is_dark", True)
+        settings.save()
+        self.assertEqual(len(storage.writes), 1)
+        self.assertEqual(set(storage.writes[0]), {"view", "app_version"})
+        self.assertNotIn("custom.history", storage.reads)
+        self.assertTrue(self.createManager().getSetting("view.is_dark"))
+
+    def test_invalid_row_uses_default(self):
+        """不正な行は、その行だけデフォルト値になることを確認"""
+        self.storages[0].write({"view": json.dumps({"is_dark": "yes"}), "custom.feature": json.dumps({"enabled": 1})})
+        settings = self.createManager()
+        self.assertFalse(settings.getSetting("view.is_dark"))
+        self.assertTrue(settings.getSetting("custom.feature.enabled"))
+        self.assertEqual(settings.getSetting("main_window.x"), 20)
+
+    def test_whole_data(self):
+        """設定全体を参照すると、すべての行が読み込まれることを確認"""
+        settings = self.createManager()
+        self.assertEqual(settings.getSetting("custom")["history"], list(range(100)))
+        self.assertEqual(settings.values.main_window.x, 20)
+        self.assertEqual(settings.getSetting("view.font"), "")
+
+    def test_validation_holds_lock(self):
+        """共有のValidatorによる検証は、書き込みスレッドと同時に行われないよう_lockを取って行われることを確認"""
+        settings = self.createManager()
+        results = []
+
+        class CheckingValidator:
+            def __init__(self, validator):
+                self.validator = validator
+
+            def validate(self, document):
+                # 他のスレッドから_lockを取れなければ、検証中は書き込みスレッドが検証できない
+                def try_acquire():
+                    acquired = settings._lock.acquire(blocking=False)
+                    if acquired:
+                        settings._lock.release()
+                    results.append(acquired)
+                thread = threading.Thread(target=try_acquire)
+                thread.start()
+                thread.join()
+                return self.validator.validate(document)
+
+            def __getattr__(self, name):
+                return getattr(self.validator, name)
+        for path, validator in list(settings._path_validators.items()):
+            settings._path_validators[path] = CheckingValidator(validator)
+        settings._custom_validators["feature"] = CheckingValidator(settings._custom_validators["feature"])
+        settings.changeSetting("view.is_dark", True)
+        settings.changeSetting("custom.feature.enabled", False)
+        self.assertEqual(settings.getSetting("main_window.x"), 20)
+        # 行の読み込みでの検証を含む
+        self.assertGreaterEqual(len(results), 3)
+        self.assertFalse(any(results))
+
+    def test_journal_not_allowed(self):
+        """ジャーナルとストレージは同時に使えないことを確認"""
+        with self.assertRaises(ValueError):
+            SettingsManager("settings.json", journal=True, storage=SqliteStorage(self.db))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,61 @@
+import queue
+import unittest
+from viewkit.creator.objects.stream_loader import StreamLoader
+
+
+class TestStreamLoader(unittest.TestCase):
+    """StreamLoaderクラスのテスト"""
+
+    def setUp(self):
+        self.queue = queue.Queue()
+        self.rows = []
+        self.progress = []
+        self.finished = []
+
+    def post(self, func, *args):
+        self.queue.put((func, args))
+
+    def createLoader(self, iterable, **kw):
+        return StreamLoader(iterable, self.rows.extend, lambda loaded, total: self.progress.append((loaded, total)),
+                            self.finished.append, post=self.post, **kw)
+
+    def pump(self):
+        """UIスレッドの代わりに、送られた処理を完了まで実行する"""
+        while not self.finished:
+            func, args = self.queue.get(timeout=5)
+            func(*args)
+
+    def test_load_in_chunks(self):
+        """指定した行数ごとに渡されることを確認"""
+        loader = self.createLoader(iter(range(25)), chunkSize=10, interval=60).start()
+        self.pump()
+        self.assertEqual(self.rows, list(range(25)))
+        self.assertEqual(self.progress, [(10, None), (20, None), (25, None)])
+        self.assertTrue(loader.finished)
+        self.assertIsNone(loader.error)
+
+    def test_total_from_len(self):
+        """長さのわかるものは全体の行数が通知されることを確認"""
+        self.createLoader(list(range(5)), chunkSize=10).start()
+        self.pump()
+        self.assertEqual(self.progress, [(5, 5)])
+
+    def test_error(self):
+        """読み出し中の例外がerrorに格納されることを確認"""
+        def gen():
+            yield 1
+            raise ValueError("broken")
+        loader = self.createLoader(gen(), chunkSize=10).start()
+        self.pump()
+        self.assertIsInstance(loader.error, ValueError)
+
+    def test_cancel(self):
+        """中止後に送られた行は反映されないことを確認"""
+        loader = self.createLoader(iter(range(10 ** 9)), chunkSize=10).start()
+        func, args = self.queue.get(timeout=5)
+        func(*args)
+        loader.cancel()
+        self.pump()
+        loader.join(5)
+        self.assertTrue(loader.cancelled)
+        self.assertEqual(len(self.rows), 10)
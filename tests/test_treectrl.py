@@ -0,0 +1,69 @@
+import unittest
+
+import wx_stub
+
+treectrl = wx_stub.importObjects("treectrl")
+
+TREE = {"root": ["a", "b"], "a": ["a1", "a2"], "b": [], "a1": ["x"], "a2": [], "x": []}
+
+
+def createTree(background=True):
+    tree = treectrl.treeCtrl()
+    tree.setChildrenProvider(TREE.__getitem__, hasChildren=lambda v: bool(TREE[v]), background=background)
+    tree.setRootValue("root")
+    return tree
+
+
+class TestTreeCtrlLazy(unittest.TestCase):
+    """treeCtrlの遅延読み込みモードのテスト"""
+
+    def setUp(self):
+        wx_stub.processPendingCalls()
+
+    def expand(self, tree, item):
+        node = tree.GetItemData(item)
+        tree._loadNode(node)
+        item.expanded = True
+        if tree._loadInBackground:
+            wx_stub.processPendingCalls()
+
+    def children(self, item):
+        return [i.text for i in item.children]
+
+    def test_load(self):
+        """開いたときに子が読み込まれることを確認"""
+        tree = createTree()
+        root = tree.GetRootItem()
+        self.expand(tree, root)
+        self.assertEqual(self.children(root), ["a", "b"])
+        self.assertEqual(tree.getLoadedNodeCount(), 2)
+        self.assertTrue(root.children[0].hasChildren)
+        self.assertFalse(root.children[1].hasChildren)
+
+    def test_parent_reloaded_while_loading(self):
+        """読み込み中に親の子が破棄された場合、削除された項目に触れずに結果を捨てることを確認"""
+        tree = createTree()
+        root = tree.GetRootItem()
+        self.expand(tree, root)
+        a = root.children[0]
+        node = tree.GetItemData(a)
+        tree._loadNode(node)
+        tree.reloadItem(root)
+        self.assertTrue(a.deleted)
+        wx_stub.processPendingCalls()
+        self.assertIsNone(node.item)
+        # 開いていたルートは読み込み直される
+        self.assertEqual(self.children(root), ["a", "b"])
+        self.assertEqual(tree.getLoadedNodeCount(), 2)
+
+    def test_tree_rebuilt_while_loading(self):
+        """読み込み中にツリーが作り直された場合、結果を捨てることを確認"""
+        tree = createTree()
+        tree._loadNode(tree.GetItemData(tree.GetRootItem()))
+        tree.setRootValue("a")
+        wx_stub.processPendingCalls()
+        self.assertEqual(self.children(tree.GetRootItem()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
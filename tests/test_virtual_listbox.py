@@ -0,0 +1,51 @@
+import unittest
+import wx_stub
+
+virtual_listbox = wx_stub.importObjects("virtual_listbox")
+
+
+class TestVirtualListBoxEvent(unittest.TestCase):
+    """virtualListBoxが、wx.ListBoxと同じEVT_LISTBOXを発生させることを確認するテスト"""
+
+    def createListBox(self, style=0):
+        listBox = virtual_listbox.virtualListBox(None, style=style, count=10, item_text=lambda n: "item%d" % n)
+        self.events = []
+        listBox.Bind(wx_stub.EVT_LISTBOX, lambda event: self.events.append((event.GetSelection(), event.GetString(), event.IsSelection())))
+        return listBox
+
+    def userSelect(self, listBox, index, on=1):
+        # ユーザーの操作と同じく、ネイティブのコントロールだけで選択を変更する
+        wx_stub.ListCtrl.Select(listBox, index, on)
+
+    def test_user_selection(self):
+        """ユーザーの操作で選択すると、選択された項目のEVT_LISTBOXが送られることを確認"""
+        listBox = self.createListBox()
+        self.userSelect(listBox, 3)
+        self.assertEqual(self.events, [(3, "item3", True)])
+        self.assertEqual(listBox.GetSelection(), 3)
+
+    def test_program_selection(self):
+        """プログラムからの選択の変更では、wx.ListBoxと同じくEVT_LISTBOXが送られないことを確認"""
+        listBox = self.createListBox()
+        listBox.SetSelection(2)
+        listBox.Deselect(2)
+        listBox.selectRange(0, 1)
+        self.assertEqual(self.events, [])
+
+    def test_multiple_deselect(self):
+        """複数選択の場合は、選択の解除もEVT_LISTBOXで送られることを確認"""
+        listBox = self.createListBox(wx_stub.LB_MULTIPLE)
+        self.userSelect(listBox, 1)
+        self.userSelect(listBox, 1, 0)
+        self.assertEqual(self.events, [(1, "item1", True), (1, "item1", False)])
+
+    def test_single_deselect(self):
+        """単一選択の場合は、選択の解除ではEVT_LISTBOXが送られないことを確認"""
+        listBox = self.createListBox()
+        self.userSelect(listBox, 1)
+        self.userSelect(listBox, 1, 0)
+        self.assertEqual(self.events, [(1, "item1", True)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,544 @@
+import unittest
+import wx_stub
+
+virtual_listctrl = wx_stub.importObjects("virtual_listctrl")
+data_source = wx_stub.importObjects("data_source")
+
+
+def createList(rows=None, columns=3, **kArg):
+    ctrl = virtual_listctrl.virtualListCtrl(None, **kArg)
+    for i in range(columns):
+        ctrl.AppendColumn("col%d" % i)
+    if rows is not None:
+        ctrl.setList(rows)
+    return ctrl
+
+
+class ListSource(data_source.DataSource):
+    def __init__(self, rows):
+        self.lst = rows
+
+    def count(self):
+        return len(self.lst)
+
+    def rows(self, start, stop):
+        return self.lst[start:stop]
+
+
+def makeRows(count):
+    return [[i, "item%d" % i, ("file", "dir", "link")[i % 3]] for i in range(count)]
+
+
+class TestVirtualListCtrlView(unittest.TestCase):
+    """virtualListCtrlの表示文字列のテスト"""
+
+    def test_item_text(self):
+        """行とカラムに対応する表示文字列が返されることを確認"""
+        ctrl = createList(makeRows(5))
+        self.assertEqual(ctrl.GetItemCount(), 5)
+        self.assertEqual(ctrl.OnGetItemText(3, 1), "item3")
+        self.assertEqual(ctrl.OnGetItemText(3, 0), "3")
+
+    def test_cache_invalidated(self):
+        """行の変更後に、キャッシュされた古い表示文字列が返されないことを確認"""
+        ctrl = createList(makeRows(5))
+        self.assertEqual(ctrl.OnGetItemText(2, 1), "item2")
+        ctrl[2] = [2, "changed", "file"]
+        self.assertEqual(ctrl.OnGetItemText(2, 1), "changed")
+        ctrl.insert(0, [9, "head", "dir"])
+        self.assertEqual(ctrl.OnGetItemText(3, 1), "changed")
+
+    def test_formatter(self):
+        """書式化関数の設定が表示に反映されることを確認"""
+        ctrl = createList(makeRows(3))
+        self.assertEqual(ctrl.OnGetItemText(1, 0), "1")
+        ctrl.setColumnFormatter(0, lambda v: "#%03d" % v)
+        self.assertEqual(ctrl.OnGetItemText(1, 0), "#001")
+
+
+class TestVirtualListCtrlColumns(unittest.TestCase):
+    """virtualListCtrlのカラムの挿入・削除のテスト"""
+
+    def rowTexts(self, ctrl, item):
+        return [ctrl.OnGetItemText(item, i) for i in range(ctrl.GetColumnCount())]
+
+    def test_delete_column_rewrites_rows(self):
+        """既定では、カラムの削除で行データからも削除され、以降に追加した行がそろって表示されることを確認"""
+        ctrl = createList([["a", "b", "c"]])
+        ctrl.DeleteColumn(1)
+        self.assertEqual(ctrl[0], ["a", "c"])
+        ctrl.append(["x", "z"])
+        self.assertEqual(self.rowTexts(ctrl, 0), ["a", "c"])
+        self.assertEqual(self.rowTexts(ctrl, 1), ["x", "z"])
+
+    def test_insert_column_rewrites_rows(self):
+        """既定では、カラムの挿入で行データにも空のフィールドが挿入されることを確認"""
+        ctrl = createList([["a", "b", "c"]])
+        self.assertEqual(ctrl.InsertColumn(0, "new"), 0)
+        self.assertEqual(ctrl[0], ["", "a", "b", "c"])
+        ctrl.append(["w", "x", "y", "z"])
+        self.assertEqual(self.rowTexts(ctrl, 0), ["", "a", "b", "c"])
+        self.assertEqual(self.rowTexts(ctrl, 1), ["w", "x", "y", "z"])
+        ctrl.InsertColumn(2, "mid")
+        self.assertEqual(self.rowTexts(ctrl, 1), ["w", "x", "", "y", "z"])
+
+    def test_sort_after_delete_column(self):
+        """カラムの削除後も、並べ替えが正しいフィールドで行われることを確認"""
+        ctrl = createList([[1, "x", "b"], [2, "y", "a"]])
+        ctrl.DeleteColumn(0)
+        ctrl.sortByColumns([(1, True)])
+        self.assertEqual(list(ctrl), [["y", "a"], ["x", "b"]])
+
+    def test_field_mapping(self):
+        """setFieldMapping(True)の場合は、行データを書き換えずにフィールドを表示し続けることを確認"""
+        ctrl = createList([["a", "b", "c"]], field_mapping=True)
+        ctrl.DeleteColumn(1)
+        self.assertEqual(ctrl[0], ["a", "b", "c"])
+        self.assertEqual(self.rowTexts(ctrl, 0), ["a", "c"])
+        col = ctrl.InsertColumn(0, "new")
+        self.assertEqual(ctrl.getColumnField(col), 3)
+        self.assertEqual(self.rowTexts(ctrl, 0), ["", "a", "c"])
+        ctrl.append(["x", "y", "z", "w"])
+        self.assertEqual(self.rowTexts(ctrl, 1), ["w", "x", "z"])
+
+    def test_explicit_field(self):
+        """fieldを指定したカラムは、既存のフィールドを表示し、削除しても行データが残ることを確認"""
+        ctrl = createList([["a", "b", "c"]])
+        col = ctrl.InsertColumn(0, "copy", field=2)
+        self.assertEqual(ctrl[0], ["a", "b", "c"])
+        self.assertEqual(self.rowTexts(ctrl, 0), ["c", "a", "b", "c"])
+        ctrl.DeleteColumn(col)
+        self.assertEqual(ctrl[0], ["a", "b", "c"])
+
+    def test_data_source_not_rewritten(self):
+        """データソースの表示中は、行データを書き換えずにカラムを追加できることを確認"""
+        ctrl = createList()
+        ctrl.setDataSource(ListSource([["a", "b", "c"]]))
+        ctrl.InsertColumn(0, "new")
+        self.assertEqual(self.rowTexts(ctrl, 0), ["", "a", "b", "c"])
+
+    def test_columnar_store_not_rewritten(self):
+        """既定では、列指向のストアの行データは書き換えず、list of listsに切り替えると書き換えることを確認"""
+        ctrl = createList(row_store=virtual_listctrl.row_store.ColumnarRowStore(["q", None, None]))
+        ctrl.extend([[1, "a", "b"]])
+        self.assertTrue(ctrl.isFieldMapping())
+        ctrl.DeleteColumn(1)
+        col = ctrl.InsertColumn(0, "new")
+        self.assertEqual(ctrl.getColumnField(col), 3)
+        self.assertEqual(ctrl.getStore().typecodes, ["q", None, None])
+        self.assertEqual(self.rowTexts(ctrl, 0), ["", "1", "b"])
+        ctrl.setStore([[1, "a", "b", "c"]])
+        self.assertFalse(ctrl.isFieldMapping())
+
+
+class CountingSource(ListSource):
+    def __init__(self, rows):
+        super().__init__(rows)
+        self.requested = 0  # 読み込んだ行数
+
+    def rows(self, start, stop):
+        self.requested += stop - start
+        return super().rows(start, stop)
+
+
+class TestVirtualListCtrlDataSource(unittest.TestCase):
+    """データソースを表示中のvirtualListCtrlのテスト"""
+
+    def setUp(self):
+        self.source = CountingSource(makeRows(1000))
+        self.ctrl = createList()
+        self.ctrl.setDataSource(self.source, pageSize=10, maxPages=4)
+        self.ctrl.Select(2)
+
+    def test_mutation_rejected(self):
+        """行の変更は、コントロールの状態を変えずにRuntimeErrorになることを確認"""
+        for func in (lambda: self.ctrl.append([0]), lambda: self.ctrl.insert(0, [0]), lambda: self.ctrl.pop(1),
+                     lambda: self.ctrl.DeleteItem(1), lambda: self.ctrl.deleteItems([1, 2]),
+                     lambda: self.ctrl.SetItem(0, 1, "x"), lambda: self.ctrl.reverse()):
+            self.assertRaises(RuntimeError, func)
+        self.assertEqual(self.ctrl.GetItemCount(), 1000)
+        self.assertEqual(self.ctrl.getItemSelections(), [2])
+        self.assertEqual(self.ctrl.OnGetItemText(1, 1), "item1")
+
+    def test_sort_rejected(self):
+        """並べ替えは、並び順の表示を変えずにRuntimeErrorになることを確認"""
+        self.assertRaises(RuntimeError, self.ctrl.sortByColumns, [(1, True)], True)
+        self.assertEqual(self.ctrl.getSortColumns(), [])
+        self.assertIsNone(self.ctrl.sortIndicator)
+        self.assertFalse(self.ctrl.isSorting())
+
+    def test_column_click_ignored(self):
+        """カラムのクリックでは並べ替えず、イベントを処理しないことを確認"""
+        self.ctrl.setSortOnColumnClick(True)
+        requested = self.source.requested
+        self.ctrl.onColumnClick(wx_stub.ListEvent(wx_stub.wxEVT_LIST_COL_CLICK, column=1))
+        self.assertEqual(self.ctrl.getSortColumns(), [])
+        self.assertEqual(self.source.requested, requested)
+
+    def test_filter_rejected(self):
+        """絞り込みは全行を読まずにRuntimeErrorになり、解除はできることを確認"""
+        requested = self.source.requested
+        self.assertRaises(RuntimeError, self.ctrl.setFilter, lambda row: True)
+        self.assertRaises(RuntimeError, self.ctrl.setFilterText, "item")
+        self.ctrl.setFilter(None)
+        self.assertEqual(self.source.requested, requested)
+        self.assertEqual(self.ctrl.GetItemCount(), 1000)
+
+    def test_type_ahead_disabled(self):
+        """インクリメンタルサーチは全行を読まずに-1を返すことを確認"""
+        requested = self.source.requested
+        self.ctrl.setTypeAhead(True)
+        self.assertEqual(self.ctrl.OnFindItem(0, "item5"), -1)
+        self.assertEqual(self.source.requested, requested)
+
+    def test_clear(self):
+        """clearとloadAsyncでは、データソースの表示をやめて空のリストになることを確認"""
+        self.ctrl.clear()
+        self.assertFalse(self.ctrl.isDataSource())
+        self.assertEqual(self.ctrl.GetItemCount(), 0)
+        self.ctrl.append([1, "a", "b"])
+        self.assertEqual(len(self.ctrl), 1)
+        self.ctrl.setDataSource(self.source)
+        self.assertRaises(RuntimeError, self.ctrl.loadAsync, iter([]), False)
+        self.ctrl.loadAsync(iter([]))
+        self.assertFalse(self.ctrl.isDataSource())
+        self.ctrl.cancelLoading()
+
+    def test_filter_and_sort_reset(self):
+        """データソースに切り替えると、絞り込みと並び順が解除されることを確認"""
+        ctrl = createList(makeRows(10))
+        ctrl.sortByColumns([(0, False)])
+        ctrl.setFilter(lambda row: row[0] % 2 == 0)
+        ctrl.setDataSource(self.source)
+        self.assertFalse(ctrl.isFiltered())
+        self.assertEqual(ctrl.getSortColumns(), [])
+        self.assertEqual(ctrl.GetItemCount(), 1000)
+
+
+
+class TestVirtualListCtrlDelete(unittest.TestCase):
+    """virtualListCtrlの複数行の削除のテスト"""
+
+    def setUp(self):
+        self.ctrl = createList(makeRows(1000))
+
+    def assertSelection(self, expected):
+        self.assertEqual(self.ctrl.getItemSelections(), expected)
+        # ネイティブのコントロールの選択状態も一致している
+        self.assertEqual(sorted(self.ctrl._selected), expected)
+
+    def test_selection_remapped(self):
+        """削除されなかった行の選択が、詰められた位置に付け替えられることを確認"""
+        for i in (2, 3, 4, 7, 8):
+            self.ctrl.Select(i)
+        self.ctrl.deleteItems([0, 3])
+        self.assertSelection([1, 2, 5, 6])
+        self.assertEqual(self.ctrl[1][0], 2)
+
+    def test_few_native_calls(self):
+        """選択範囲がずれるだけの場合、変わる項目だけがコントロールに反映されることを確認"""
+        self.ctrl.selectRange(100, 899)
+        self.ctrl.selectCalls = 0
+        self.ctrl.deleteItems(range(10))
+        self.assertSelection(list(range(90, 890)))
+        self.assertLessEqual(self.ctrl.selectCalls, 20)
+        self.ctrl.selectCalls = 0
+        self.ctrl.deleteItems(range(0, 990, 2))
+        self.assertEqual(self.ctrl.getItemSelections(), list(range(45, 445)))
+        self.assertEqual(sorted(self.ctrl._selected), list(range(45, 445)))
+
+    def test_focus_and_top(self):
+        """フォーカスと表示位置が、同じ行に保たれることを確認"""
+        self.ctrl.ScrollList(0, 50 * self.ctrl.ROW_HEIGHT)
+        self.ctrl.SetItemState(60, wx_stub.LIST_STATE_FOCUSED, wx_stub.LIST_STATE_FOCUSED)
+        del self.ctrl[0:10]
+        self.assertEqual(self.ctrl.GetTopItem(), 40)
+        self.assertEqual(self.ctrl.GetFocusedItem(), 50)
+        self.assertEqual(self.ctrl[50][0], 60)
+
+    def test_filtered(self):
+        """絞り込み中は、表示されている行の削除だけが選択位置を詰めることを確認"""
+        self.ctrl.setFilter(lambda row: row[0] % 2 == 0)
+        self.ctrl.Select(3)
+        self.ctrl.Select(5)
+        self.ctrl.deleteItems([1, 2, 3, 4])
+        # 元データの2, 4行目(表示上の1, 2行目)が削除された
+        self.assertSelection([1, 3])
+        self.assertEqual(self.ctrl.GetItemCount(), 498)
+        self.assertEqual([self.ctrl[self.ctrl.viewToModel(i)][0] for i in (1, 3)], [6, 10])
+
+
+
+class TestVirtualListCtrlSort(unittest.TestCase):
+    """virtualListCtrlの並べ替えのテスト"""
+
+    def setUp(self):
+        self.ctrl = createList([[3, "b"], [1, "a"], [2, "b"], [1, "b"]], columns=2)
+
+    def finishBackgroundSort(self):
+        while self.ctrl.isSorting():
+            self.ctrl._sortThread.join(5)
+            wx_stub.processPendingCalls()
+
+    def test_sort_by_columns(self):
+        """複数カラムの並べ替えと、並び順の表示を確認"""
+        self.ctrl.sortByColumns([(1, True), (0, False)])
+        self.assertEqual(list(self.ctrl), [[1, "a"], [3, "b"], [2, "b"], [1, "b"]])
+        self.assertEqual(self.ctrl.getSortColumns(), [(1, True), (0, False)])
+        self.assertEqual(self.ctrl.sortIndicator, (1, True))
+
+    def test_selection_follows_rows(self):
+        """並べ替え後も、同じ行が選択・フォーカスされていることを確認"""
+        self.ctrl.Select(0)
+        self.ctrl.Focus(2)
+        self.ctrl.sortByColumns([(0, True)])
+        self.assertEqual(self.ctrl.GetSelectedItems(), [[3, "b"]])
+        self.assertEqual(self.ctrl[self.ctrl.GetFocusedItem()], [2, "b"])
+
+    def test_background(self):
+        """バックグラウンドでの並べ替えが、UIスレッドで反映されることを確認"""
+        self.ctrl.sortByColumns([(0, True)], background=True)
+        self.assertTrue(self.ctrl.isSorting())
+        self.assertEqual(self.ctrl.getSortColumns(), [(0, True)])
+        self.finishBackgroundSort()
+        self.assertEqual([i[0] for i in self.ctrl], [1, 1, 2, 3])
+
+    def test_background_retry(self):
+        """並べ替え中に行が変更された場合は、やり直して変更後の行も並べ替えることを確認"""
+        self.ctrl.sortByColumns([(0, True)], background=True)
+        self.ctrl._sortThread.join(5)
+        self.ctrl.append([0, "c"])
+        self.finishBackgroundSort()
+        self.assertEqual([i[0] for i in self.ctrl], [0, 1, 1, 2, 3])
+
+    def test_background_error(self):
+        """バックグラウンドでの失敗は、並べ替え中の状態を解除してUIスレッドで例外になることを確認"""
+        def fail(value):
+            raise KeyError(value)
+        self.ctrl.setColumnSortKey(0, fail)
+        self.ctrl.sortByColumns([(0, True)], background=True)
+        self.ctrl._sortThread.join(5)
+        self.assertRaises(KeyError, wx_stub.processPendingCalls)
+        self.assertFalse(self.ctrl.isSorting())
+        self.assertEqual(self.ctrl.getSortColumns(), [])
+        self.assertIsNone(self.ctrl.sortIndicator)
+
+    def test_error_keeps_state(self):
+        """並べ替えキーの抽出に失敗した場合、並び順の表示が変わらないことを確認"""
+        self.ctrl.sortByColumns([(1, True)])
+        self.ctrl.setColumnSortKey(0, lambda value: 1 / 0)
+        self.assertRaises(ZeroDivisionError, self.ctrl.sortByColumns, [(0, True)])
+        self.assertEqual(self.ctrl.getSortColumns(), [(1, True)])
+        self.assertEqual(self.ctrl.sortIndicator, (1, True))
+
+    def test_superseded_background(self):
+        """後から並べ替えた場合、先に始めたバックグラウンドの結果は使われないことを確認"""
+        self.ctrl.sortByColumns([(0, True)], background=True)
+        self.ctrl.sortByColumns([(0, False)])
+        self.assertFalse(self.ctrl.isSorting())
+        self.ctrl._sortThread is None or self.ctrl._sortThread.join(5)
+        wx_stub.processPendingCalls()
+        self.assertEqual([i[0] for i in self.ctrl], [3, 2, 1, 1])
+
+    def test_column_click(self):
+        """カラムのクリックで昇順・降順が切り替わり、Shiftで第2キーが追加されることを確認"""
+        def click(col):
+            event = wx_stub.ListEvent(wx_stub.wxEVT_LIST_COL_CLICK, column=col)
+            self.ctrl.onColumnClick(event)
+            return event
+        self.assertTrue(click(0).GetSkipped())
+        self.assertEqual(self.ctrl.getSortColumns(), [])
+        self.ctrl.setSortOnColumnClick(True)
+        self.assertFalse(click(1).GetSkipped())
+        self.assertEqual(self.ctrl.getSortColumns(), [(1, True)])
+        click(1)
+        self.assertEqual(self.ctrl.getSortColumns(), [(1, False)])
+        wx_stub.keyState.add(wx_stub.WXK_SHIFT)
+        try:
+            click(0)
+        finally:
+            wx_stub.keyState.clear()
+        self.assertEqual(self.ctrl.getSortColumns(), [(1, False), (0, True)])
+        self.assertEqual(list(self.ctrl), [[1, "b"], [2, "b"], [3, "b"], [1, "a"]])
+
+    def test_column_click_outside_columns(self):
+        """カラムのない部分のクリックは、並べ替えずにイベントを処理しないことを確認"""
+        self.ctrl.setSortOnColumnClick(True)
+        for col in (-1, 5):
+            event = wx_stub.ListEvent(wx_stub.wxEVT_LIST_COL_CLICK, column=col)
+            self.ctrl.onColumnClick(event)
+            self.assertTrue(event.GetSkipped())
+            self.assertEqual(event.GetColumn(), col)
+        self.assertEqual(self.ctrl.getSortColumns(), [])
+
+    def test_column_click_vetoed(self):
+        """Bindした関数で拒否された場合は並べ替えず、イベントを処理しないことを確認"""
+        self.ctrl.setSortOnColumnClick(True)
+        self.ctrl.Bind(wx_stub.EVT_LIST_COL_CLICK, lambda event: event.Veto())
+        event = wx_stub.ListEvent(wx_stub.wxEVT_LIST_COL_CLICK, column=0)
+        self.ctrl.onColumnClick(event)
+        self.assertTrue(event.GetSkipped())
+        self.assertEqual(self.ctrl.getSortColumns(), [])
+
+
+
+class TestVirtualListCtrlReconcile(unittest.TestCase):
+    """virtualListCtrl.setListでキーを指定した場合の差分反映のテスト"""
+
+    def setUp(self):
+        self.rows = makeRows(100)
+        self.ctrl = createList(self.rows)
+        self.ctrl.setKeyFunction(lambda row: row[0])
+        self.calls = {"reset": 0, "changed": 0, "inserted": 0, "removed": 0}
+        self.wrap("_onRowsReset", "reset")
+        self.wrap("_onRowChanged", "changed")
+        self.wrap("_onRowsInserted", "inserted")
+        self.wrap("_onRowsRemoved", "removed")
+
+    def wrap(self, name, counter):
+        func = getattr(self.ctrl, name)
+
+        def wrapper(*pArg):
+            self.calls[counter] += 1
+            return func(*pArg)
+        setattr(self.ctrl, name, wrapper)
+
+    def setList(self, rows):
+        self.ctrl.refreshed = []
+        self.ctrl.setList(rows, key=lambda row: row[0])
+        self.assertEqual(list(self.ctrl), rows)
+        for row in rows:
+            self.assertEqual(self.ctrl.indexOfKey(row[0]), rows.index(row))
+
+    def test_changed_rows(self):
+        """行の構成が同じ場合は、内容の変わった行だけが再描画されることを確認"""
+        rows = [list(i) for i in self.rows]
+        rows[5][1] = "changed"
+        self.setList(rows)
+        self.assertEqual(self.calls, {"reset": 0, "changed": 1, "inserted": 0, "removed": 0})
+        self.assertEqual(self.ctrl.refreshed, [(5, 5)])
+
+    def test_head_insert(self):
+        """先頭に挿入した場合、既存の行は変更として扱わず、選択とフォーカスが同じ行に保たれることを確認"""
+        self.ctrl.Select(10)
+        self.ctrl.Select(11)
+        self.ctrl.Focus(11)
+        self.ctrl.selectCalls = 0
+        self.setList([[-1, "new", "file"]] + self.rows)
+        self.assertEqual(self.calls, {"reset": 0, "changed": 0, "inserted": 1, "removed": 0})
+        self.assertEqual(self.ctrl.GetItemCount(), 101)
+        self.assertEqual(self.ctrl.GetSelectedItems(), [self.rows[10], self.rows[11]])
+        self.assertEqual(self.ctrl.GetFocusedItem(), 12)
+        # 外れた行の解除と、追加された行の選択だけを行う
+        self.assertEqual(self.ctrl.selectCalls, 2)
+
+    def test_type_ahead_index(self):
+        """差分の反映後も、インクリメンタルサーチで新しい位置の行が見つかることを確認"""
+        self.ctrl.setTypeAhead(True, 1)
+        self.assertEqual(self.ctrl.OnFindItem(0, "item50"), 50)
+        self.setList([[-1, "new", "file"]] + self.rows[:50] + self.rows[51:])
+        self.assertEqual(self.calls["reset"], 0)
+        self.assertEqual(self.ctrl.OnFindItem(0, "new"), 0)
+        self.assertEqual(self.ctrl.OnFindItem(0, "item51"), 51)
+        self.assertEqual(self.ctrl.OnFindItem(0, "item50"), -1)
+
+    def test_reordered(self):
+        """移動した行だけが削除・挿入として扱われ、選択が移動先に付いていくことを確認"""
+        self.ctrl.Select(0)
+        rows = self.rows[1:50] + self.rows[:1] + self.rows[50:]
+        self.setList(rows)
+        self.assertEqual(self.calls, {"reset": 0, "changed": 0, "inserted": 1, "removed": 1})
+        self.assertEqual(self.ctrl.GetSelectedItems(), [self.rows[0]])
+        self.assertEqual(self.ctrl.GetFirstSelected(), 49)
+
+    def test_insert_remove_and_change(self):
+        """挿入・削除・変更が混ざった場合に、それぞれの行だけが通知されることを確認"""
+        rows = [list(i) for i in self.rows]
+        del rows[20]
+        rows.insert(60, [1000, "new", "dir"])
+        rows[80][2] = "changed"
+        self.setList(rows)
+        self.assertEqual(self.calls, {"reset": 0, "changed": 1, "inserted": 1, "removed": 1})
+        self.assertEqual(self.ctrl.refreshed, [(20, 99)])
+
+    def test_filtered(self):
+        """絞り込み中でも、表示される行と選択が正しく反映されることを確認"""
+        self.ctrl.setFilter(lambda row: row[2] == "file")
+        self.ctrl.Select(2)
+        rows = [[-1, "new", "file"], [-2, "new", "dir"]] + self.rows[3:]
+        self.setList(rows)
+        self.assertEqual(self.calls["reset"], 0)
+        self.assertEqual(self.ctrl.GetItemCount(), 1 + 33)
+        self.assertEqual([self.ctrl.viewToModel(i) for i in range(3)], [0, 2, 5])
+        self.assertEqual(self.ctrl.GetSelectedItems(), [self.rows[6]])
+        self.assertEqual(self.ctrl.GetFirstSelected(), 2)
+
+    def test_many_changes(self):
+        """変更が多い場合は全体を入れ替え、選択は同じキーの行に付け替えることを確認"""
+        self.ctrl.Select(10)
+        rows = list(reversed(self.rows))
+        self.setList(rows)
+        self.assertEqual(self.calls["reset"], 1)
+        self.assertEqual(self.ctrl.GetSelectedItems(), [self.rows[10]])
+        self.assertEqual(self.ctrl.GetFirstSelected(), 89)
+
+
+
+class TestVirtualListCtrlKeyFunction(unittest.TestCase):
+    """key_funcを指定したvirtualListCtrlの、listとしての検索のテスト"""
+
+    def setUp(self):
+        self.ctrl = createList([[1, "a"], [2, "b"], [1, "c"]], columns=2, key_func=lambda row: row[0])
+
+    def test_index(self):
+        """キーが同じでも値が異なる行は、等しい行として扱わないことを確認"""
+        self.assertEqual(self.ctrl.index([2, "b"]), 1)
+        self.assertEqual(self.ctrl.index([1, "c"]), 2)
+        self.assertEqual(self.ctrl.index([1, "a"]), 0)
+        self.assertRaises(ValueError, self.ctrl.index, [1, "x"])
+
+    def test_remove(self):
+        """removeは値の等しい行を削除し、なければValueErrorになることを確認"""
+        self.ctrl.remove([1, "c"])
+        self.assertEqual(list(self.ctrl), [[1, "a"], [2, "b"]])
+        self.assertRaises(ValueError, self.ctrl.remove, [2, "x"])
+        self.assertEqual(list(self.ctrl), [[1, "a"], [2, "b"]])
+
+
+
+class TestVirtualListCtrlLabelEdit(unittest.TestCase):
+    """virtualListCtrlのラベルの編集のテスト"""
+
+    def setUp(self):
+        store = virtual_listctrl.row_store.ColumnarRowStore(["q", None])
+        self.ctrl = createList(columns=2, row_store=store)
+        self.ctrl.extend([[1, "a"], [2, "b"]])
+        self.ctrl.Focus(1)
+
+    def editLabel(self, text):
+        self.ctrl.editControl = wx_stub.TextCtrl(text)
+        event = wx_stub.ListEvent(wx_stub.wxEVT_LIST_END_LABEL_EDIT, 1)
+        self.ctrl.onLabelEditEnd(event)
+        return event
+
+    def test_numeric_column(self):
+        """数値の列の編集は、列の型に変換して反映されることを確認"""
+        self.assertTrue(self.editLabel("20").IsAllowed())
+        self.assertEqual(self.ctrl[1], [20, "b"])
+        self.assertEqual(self.ctrl.OnGetItemText(1, 0), "20")
+
+    def test_invalid_number(self):
+        """数値の列に数値でない文字列を入力した場合は、編集を拒否して値を変えないことを確認"""
+        self.assertFalse(self.editLabel("abc").IsAllowed())
+        self.assertEqual(self.ctrl[1], [2, "b"])
+
+    def test_set_item(self):
+        """SetItemで変換できない値を設定した場合はValueErrorになることを確認"""
+        self.ctrl.SetItem(0, 0, "7")
+        self.assertEqual(self.ctrl[0], [7, "a"])
+        self.assertRaises(ValueError, self.ctrl.SetItem, 0, 0, "x")
+        self.assertEqual(self.ctrl[0], [7, "a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
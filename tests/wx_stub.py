@@ -0,0 +1,541 @@
+# テストとベンチマーク(benchmarks/virtual_listctrl.py)で共用するwxスタブ
+# wxPythonやディスプレイのない環境でvirtualListCtrlなどのコントロールを動かすため、使用している名前だけを定義する
+# ListCtrlはネイティブ側の選択状態を保持し、選択関係のイベントを発生させる。描画は行わない
+# CallAfterで登録された関数は、processPendingCallsを呼ぶまで実行しない
+
+import collections
+import importlib
+import itertools
+import os
+import sys
+import threading
+import types
+
+OBJECTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "viewkit", "creator", "objects")
+PACKAGE_NAME = "viewkit_objects_stub"
+
+ID_ANY = -1
+HORIZONTAL = 0x0004
+VERTICAL = 0x0008
+LC_REPORT = 0x0020
+LC_VIRTUAL = 0x0200
+LC_NO_HEADER = 0x0800
+LC_SINGLE_SEL = 0x2000
+LB_SINGLE = 0x0020
+LB_MULTIPLE = 0x0040
+LB_EXTENDED = 0x0080
+NOT_FOUND = -1
+LIST_FORMAT_LEFT = 0
+LIST_AUTOSIZE = -1
+LIST_RECT_LABEL = 2
+LIST_STATE_FOCUSED = 0x0002
+LIST_STATE_SELECTED = 0x0004
+TR_HIDE_ROOT = 0x0800
+WXK_NONE = 0
+WXK_SHIFT = 306
+DefaultPosition = (-1, -1)
+NullFont = None
+
+_eventTypes = itertools.count(10000)
+
+
+class PyEventBinder:
+    def __init__(self, typeId):
+        self.typeId = typeId
+
+
+def _binder():
+    binder = PyEventBinder(next(_eventTypes))
+    return binder, binder.typeId
+
+
+EVT_CHAR, wxEVT_CHAR = _binder()
+EVT_SIZE, wxEVT_SIZE = _binder()
+EVT_LISTBOX, wxEVT_LISTBOX = _binder()
+EVT_LIST_CACHE_HINT, wxEVT_LIST_CACHE_HINT = _binder()
+EVT_LIST_COL_BEGIN_DRAG, wxEVT_LIST_COL_BEGIN_DRAG = _binder()
+EVT_LIST_COL_CLICK, wxEVT_LIST_COL_CLICK = _binder()
+EVT_LIST_COL_DRAGGING, wxEVT_LIST_COL_DRAGGING = _binder()
+EVT_LIST_COL_END_DRAG, wxEVT_LIST_COL_END_DRAG = _binder()
+EVT_LIST_COL_RIGHT_CLICK, wxEVT_LIST_COL_RIGHT_CLICK = _binder()
+EVT_LIST_END_LABEL_EDIT, wxEVT_LIST_END_LABEL_EDIT = _binder()
+EVT_LIST_ITEM_SELECTED, wxEVT_LIST_ITEM_SELECTED = _binder()
+EVT_LIST_ITEM_DESELECTED, wxEVT_LIST_ITEM_DESELECTED = _binder()
+EVT_TREE_ITEM_EXPANDING, wxEVT_TREE_ITEM_EXPANDING = _binder()
+EVT_TREE_ITEM_COLLAPSED, wxEVT_TREE_ITEM_COLLAPSED = _binder()
+
+_pendingCalls = collections.deque()
+_pendingLock = threading.Lock()
+keyState = set()  # GetKeyStateで押されているとみなすキー
+
+
+def CallAfter(func, *pArg, **kArg):
+    with _pendingLock:
+        _pendingCalls.append((func, pArg, kArg))
+
+
+def processPendingCalls():
+    """CallAfterで登録された関数を、登録順にすべて呼ぶ"""
+    while True:
+        with _pendingLock:
+            if not _pendingCalls:
+                return
+            func, pArg, kArg = _pendingCalls.popleft()
+        func(*pArg, **kArg)
+
+
+def GetKeyState(key):
+    return key in keyState
+
+
+class Point:
+    def __init__(self, x=0, y=0):
+        self.x = x
+        self.y = y
+
+
+class Rect:
+    def __init__(self, x=0, y=0, width=0, height=20):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    def GetBottomRight(self):
+        return Point(self.x + self.width - 1, self.y + self.height - 1)
+
+
+class Colour:
+    def __init__(self, *pArg):
+        self.value = pArg
+
+
+NullColour = Colour()
+
+
+class ItemAttr:
+    def __init__(self, colText=NullColour, colBack=NullColour, font=NullFont):
+        self.colText = colText
+        self.colBack = colBack
+        self.font = font
+
+
+class ContextMenuEvent:
+    pass
+
+
+class ListItem:
+    def __init__(self):
+        self.text = ""
+        self.column = 0
+
+    def SetText(self, text):
+        self.text = text
+
+    def SetColumn(self, col):
+        self.column = col
+
+
+class CommandEvent:
+    def __init__(self, eventType, id=0):
+        self.eventType = eventType
+        self.id = id
+        self.eventObject = None
+        self.commandInt = 0
+        self.commandString = ""
+        self.extraLong = 0
+        self.skipped = False
+
+    def GetEventType(self):
+        return self.eventType
+
+    def GetId(self):
+        return self.id
+
+    def SetEventObject(self, obj):
+        self.eventObject = obj
+
+    def GetEventObject(self):
+        return self.eventObject
+
+    def SetInt(self, value):
+        self.commandInt = value
+
+    def GetInt(self):
+        return self.commandInt
+
+    def GetSelection(self):
+        return self.commandInt
+
+    def SetString(self, value):
+        self.commandString = value
+
+    def GetString(self):
+        return self.commandString
+
+    def SetExtraLong(self, value):
+        self.extraLong = value
+
+    def IsSelection(self):
+        return self.extraLong != 0
+
+    def Skip(self, skip=True):
+        self.skipped = skip
+
+    def GetSkipped(self):
+        return self.skipped
+
+
+class ListEvent:
+    def __init__(self, eventType, index=-1, column=-1, editCancelled=False):
+        self.eventType = eventType
+        self.index = index
+        self.column = column
+        self.editCancelled = editCancelled
+        self.skipped = False
+        self.allowed = True
+
+    def GetEventType(self):
+        return self.eventType
+
+    def GetIndex(self):
+        return self.index
+
+    def GetColumn(self):
+        return self.column
+
+    def SetColumn(self, col):
+        self.column = col
+
+    def Skip(self, skip=True):
+        self.skipped = skip
+
+    def GetSkipped(self):
+        return self.skipped
+
+    def IsAllowed(self):
+        return self.allowed
+
+    def Veto(self):
+        self.allowed = False
+
+    def IsEditCancelled(self):
+        return self.editCancelled
+
+
+class TextCtrl:
+    def __init__(self, value=""):
+        self.value = value
+
+    def GetLineText(self, lineNo):
+        return self.value.split("\n")[lineNo]
+
+
+class ListCtrl:
+    ROW_HEIGHT = 20
+    COUNT_PER_PAGE = 30
+
+    def __init__(self, *pArg, style=0, **kArg):
+        self._style = style
+        self._count = 0
+        self._selected = set()  # ネイティブ側の選択状態
+        self._focus = -1
+        self._top = 0
+        self._columns = []
+        self._handlers = {}
+        self._frozen = 0
+        self.selectCalls = 0  # Selectが呼ばれた回数
+        self.refreshed = []  # 再描画された (最初の行, 最後の行)
+        self.editControl = None  # ラベルの編集中に、GetEditControlが返すTextCtrl
+        self.sortIndicator = None
+
+    # イベント
+
+    def Bind(self, event, handler, source=None, id=ID_ANY, id2=ID_ANY):
+        self._handlers.setdefault(event.typeId, []).append(handler)
+
+    def Unbind(self, event, source=None, id=ID_ANY, id2=ID_ANY, handler=None):
+        handlers = self._handlers.get(event.typeId, [])
+        for i in reversed(range(len(handlers))):
+            if handler is None or handlers[i] == handler:
+                del handlers[i]
+                return True
+        return False
+
+    def ProcessEvent(self, event):
+        """後からBindされた関数から順に、Skipされなくなるまで呼ぶ"""
+        for handler in reversed(self._handlers.get(event.GetEventType(), [])):
+            event.Skip(False)
+            handler(event)
+            if not event.GetSkipped():
+                return True
+        return False
+
+    def Freeze(self):
+        self._frozen += 1
+
+    def Thaw(self):
+        self._frozen -= 1
+
+    def IsFrozen(self):
+        return self._frozen > 0
+
+    def GetId(self):
+        return ID_ANY
+
+    def GetEventHandler(self):
+        return self
+
+    def HasFlag(self, flag):
+        return bool(self._style & flag)
+
+    # 行
+
+    def SetItemCount(self, count):
+        self._count = count
+        self._selected = {i for i in self._selected if i < count}
+        if self._focus >= count:
+            self._focus = count - 1
+        self._top = max(0, min(self._top, count - 1))
+
+    def GetItemCount(self):
+        return self._count
+
+    def InsertItem(self, index, label=None):
+        self._count += 1
+        self._selected = {i + 1 if i >= index else i for i in self._selected}
+        return index
+
+    def DeleteItem(self, index):
+        self._count -= 1
+        self._selected = {i - 1 if i > index else i for i in self._selected if i != index}
+        if self._focus > index or self._focus >= self._count:
+            self._focus -= 1
+        return True
+
+    def DeleteAllItems(self):
+        self._count = 0
+        self._selected = set()
+        self._focus = -1
+        self._top = 0
+        return True
+
+    def RefreshItem(self, item):
+        self.refreshed.append((item, item))
+
+    def RefreshItems(self, first, end):
+        self.refreshed.append((first, end))
+
+    def SortItems(self, fnSortCallBack):
+        return True
+
+    # 選択・フォーカス・表示位置
+
+    def Select(self, idx, on=1):
+        self.selectCalls += 1
+        if idx < 0:
+            changed = bool(self._selected) if not on else len(self._selected) < self._count
+            self._selected = set(range(self._count)) if on else set()
+        else:
+            changed = (idx in self._selected) != bool(on)
+            if on:
+                self._selected.add(idx)
+            else:
+                self._selected.discard(idx)
+        if changed:
+            self.ProcessEvent(ListEvent(wxEVT_LIST_ITEM_SELECTED if on else wxEVT_LIST_ITEM_DESELECTED, idx))
+
+    def GetFirstSelected(self, *pArg):
+        return min(self._selected, default=-1)
+
+    def GetNextSelected(self, item):
+        return min((i for i in self._selected if i > item), default=-1)
+
+    def Focus(self, idx):
+        if 0 <= idx < self._count:
+            self._focus = idx
+            self.EnsureVisible(idx)
+
+    def GetFocusedItem(self):
+        return self._focus
+
+    def SetItemState(self, item, state, stateMask):
+        if stateMask & LIST_STATE_FOCUSED and 0 <= item < self._count:
+            self._focus = item
+        return True
+
+    def GetTopItem(self):
+        return self._top
+
+    def GetCountPerPage(self):
+        return self.COUNT_PER_PAGE
+
+    def EnsureVisible(self, item):
+        if item < self._top:
+            self._top = item
+        elif item >= self._top + self.COUNT_PER_PAGE:
+            self._top = item - self.COUNT_PER_PAGE + 1
+        return True
+
+    def ScrollList(self, dx, dy):
+        self._top = max(0, min(self._top + dy // self.ROW_HEIGHT, self._count - 1))
+        return True
+
+    def GetItemRect(self, item, code=LIST_RECT_LABEL):
+        return Rect(0, (item - self._top) * self.ROW_HEIGHT, 100, self.ROW_HEIGHT)
+
+    def GetEditControl(self):
+        return self.editControl
+
+    # カラム
+
+    def AppendColumn(self, heading, format=LIST_FORMAT_LEFT, width=-1):
+        self._columns.append([heading, width])
+        return len(self._columns) - 1
+
+    def InsertColumn(self, col, heading, format=LIST_FORMAT_LEFT, width=LIST_AUTOSIZE):
+        self._columns.insert(col, [heading, width])
+        return col
+
+    def DeleteColumn(self, col):
+        del self._columns[col]
+        return True
+
+    def DeleteAllColumns(self):
+        self._columns = []
+        return True
+
+    def GetColumnCount(self):
+        return len(self._columns)
+
+    def GetColumnOrder(self, col):
+        return col
+
+    def GetColumnsOrder(self):
+        return list(range(len(self._columns)))
+
+    def GetColumnWidth(self, col):
+        return self._columns[col][1]
+
+    def SetColumnWidth(self, col, width):
+        self._columns[col][1] = width
+        return True
+
+    def SetColumn(self, col, item):
+        self._columns[col][0] = item.text
+        return True
+
+    def ShowSortIndicator(self, col, ascending=True):
+        self.sortIndicator = (col, ascending)
+
+    def RemoveSortIndicator(self):
+        self.sortIndicator = None
+
+
+class TreeItemId:
+    """削除された項目のIDもIsOkはTrueを返す点は本物と同じ。deletedで削除済みかを判定できる"""
+
+    def __init__(self, text, data, parent):
+        self.text = text
+        self.data = data
+        self.parent = parent
+        self.children = []
+        self.hasChildren = False
+        self.expanded = False
+        self.deleted = False
+
+    def IsOk(self):
+        return True
+
+
+class TreeCtrl:
+    def __init__(self, *pArg, style=0, **kArg):
+        self._style = style
+        self._root = None
+        self._handlers = {}
+        self._frozen = 0
+
+    def Bind(self, event, handler, source=None, id=ID_ANY, id2=ID_ANY):
+        self._handlers.setdefault(event.typeId, []).append(handler)
+
+    def Freeze(self):
+        self._frozen += 1
+
+    def Thaw(self):
+        self._frozen -= 1
+
+    def HasFlag(self, flag):
+        return bool(self._style & flag)
+
+    def AddRoot(self, text, image=-1, selImage=-1, data=None):
+        self._root = TreeItemId(text, data, None)
+        return self._root
+
+    def GetRootItem(self):
+        return self._root
+
+    def AppendItem(self, parent, text, image=-1, selImage=-1, data=None):
+        assert not parent.deleted
+        item = TreeItemId(text, data, parent)
+        parent.children.append(item)
+        return item
+
+    def _delete(self, item):
+        item.deleted = True
+        for i in item.children:
+            self._delete(i)
+
+    def DeleteChildren(self, item):
+        assert not item.deleted
+        for i in item.children:
+            self._delete(i)
+        item.children = []
+
+    def DeleteAllItems(self):
+        if self._root is not None:
+            self._delete(self._root)
+        self._root = None
+
+    def GetItemData(self, item):
+        assert not item.deleted, "GetItemData on a deleted item"
+        return item.data
+
+    def GetChildrenCount(self, item, recursively=True):
+        return len(item.children)
+
+    def SetItemHasChildren(self, item, has=True):
+        assert not item.deleted
+        item.hasChildren = has
+
+    def ItemHasChildren(self, item):
+        return item.hasChildren
+
+    def IsExpanded(self, item):
+        return item.expanded
+
+    def Collapse(self, item):
+        item.expanded = False
+
+
+def importObjects(name):
+    """
+    viewkit/creator/objectsのnameモジュールを、このスタブをwxとして読み込んで返す
+    viewkitパッケージ全体は読み込まず、objectsディレクトリだけを別名のパッケージとして登録する
+    """
+    fullName = PACKAGE_NAME + "." + name
+    if fullName in sys.modules:
+        return sys.modules[fullName]
+    if PACKAGE_NAME not in sys.modules:
+        package = types.ModuleType(PACKAGE_NAME)
+        package.__path__ = [OBJECTS_DIR]
+        sys.modules[PACKAGE_NAME] = package
+    # 他のテストが本物のwxを使えるよう、読み込みの間だけ差し替える
+    saved = sys.modules.get("wx")
+    sys.modules["wx"] = sys.modules[__name__]
+    try:
+        return importlib.import_module(fullName)
+    finally:
+        if saved is None:
+            del sys.modules["wx"]
+        else:
+            sys.modules["wx"] = saved
@@ -21,6 +21,8 @@ class App(wx.App):
         self._initial_window = initial_window
         self.logger.debug("App initialized with initial_window=%s", initial_window)
         wx.App.__init__(self)
+        # 設定の変更通知は、イベント処理の後にまとめて行う
+        self.ctx.settings.setNotifier(wx.CallAfter)
 
     def run(self):
         """ウインドウを表示して、アプリケーションを開始。アプリケーションが終了するまで制御を返さない"""
@@ -38,6 +40,11 @@ class App(wx.App):
         self.MainLoop()
         self.logger.info("application exited")
 
+    def OnExit(self):
+        # 遅延書き込みを待っている設定を書き込む
+        self.ctx.settings.flush()
+        return super().OnExit()
+
     def _openMainWindow(self):
         wnd = self._initial_window(self.ctx)
         wnd._registerFeatures(wnd.define_features())
@@ -1,6 +1,6 @@
 import logging
 import logging.handlers
-from viewkit.settings import SettingsManager, CustomSettingField
+from viewkit.settings import SettingsManager, CustomSettingField, SettingsStorage
 from viewkit.fontManager import FontManager, DEFAULT_FONT
 from .message import ContextMessageHandler, ContextMessageReceiver
 
@@ -15,6 +15,8 @@ class ApplicationContext:
         supported_languages: dict,
         language: str,
         setting_file_name: str = "",
+        setting_journal: bool = False,
+        setting_storage: SettingsStorage = None,
         custom_setting_fields: list[CustomSettingField] = [],
         log_handler: logging.Handler = None,
     ):
@@ -37,7 +39,7 @@ class ApplicationContext:
         if self.setting_file_name == "":
             self.setting_file_name = "%s.json" % self.application_name
             self.logger.debug("ApplicationContext using default setting_file_name=%s", self.setting_file_name)
-        self.settings = SettingsManager(self.setting_file_name)
+        self.settings = SettingsManager(self.setting_file_name, journal=setting_journal, storage=setting_storage)
         self.font = FontManager()
         for field in custom_setting_fields:
             self.settings.registerCustomField(field)
@@ -45,6 +47,11 @@ class ApplicationContext:
         print(self.settings.getSetting("view.font"))
         if not self.font.setFontFromString(self.settings.getSetting("view.font")):
             self.settings.changeSetting("view.font", DEFAULT_FONT)
+        self.settings.subscribe("view.font", self._onFontSettingChanged)
+
+    def _onFontSettingChanged(self, value):
+        if not self.font.setFontFromString(value):
+            self.settings.changeSetting("view.font", DEFAULT_FONT)
 
     def registerContextMessageReceiver(self, key, callable):
         self._message_handler.registerReceiver(key, ContextMessageReceiver(callable))
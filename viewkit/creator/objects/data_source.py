@@ -0,0 +1,128 @@
+# dataSource for virtualListCtrl
+# 全件をメモリに持たず、表示に必要な行だけをページ単位で読み込むための層
+
+from collections import OrderedDict
+
+from . import row_store
+
+DEFAULT_PAGE_SIZE = 256
+DEFAULT_MAX_PAGES = 64
+
+
+class DataSource:
+    """
+    virtualListCtrlに行を供給するデータソースの基底クラス
+    派生クラスは count と rows を実装する。どちらもUIスレッドから呼ばれる
+    """
+
+    def count(self):
+        """全体の行数を返す"""
+        raise NotImplementedError
+
+    def rows(self, start, stop):
+        """start行目からstop行目の手前までの行を、リストなどのシーケンスで返す"""
+        raise NotImplementedError
+
+
+class PagedRowStore(row_store.RowStore):
+    """
+    DataSourceから、参照された行を含むページだけを読み込んで保持する読み取り専用のストア
+    保持するページ数はmaxPagesまでで、最も長く参照されていないページから破棄する
+    """
+
+    def __init__(self, source, pageSize=DEFAULT_PAGE_SIZE, maxPages=DEFAULT_MAX_PAGES):
+        if pageSize <= 0 or maxPages <= 0:
+            raise ValueError("pageSize and maxPages must be positive")
+        self.source = source
+        self.pageSize = pageSize
+        self.maxPages = maxPages
+        self._pages = OrderedDict()
+        self._len = source.count()
+
+    def reload(self):
+        """データソースの内容が変わった場合に呼び、行数を取得し直してページを破棄する"""
+        self._pages.clear()
+        self._len = self.source.count()
+
+    def _page(self, page):
+        rows = self._pages.get(page)
+        if rows is not None:
+            self._pages.move_to_end(page)
+            return rows
+        start = page * self.pageSize
+        rows = self.source.rows(start, min(start + self.pageSize, self._len))
+        self._pages[page] = rows
+        if len(self._pages) > self.maxPages:
+            self._pages.popitem(last=False)
+        return rows
+
+    def prefetch(self, first, last):
+        first = max(first, 0)
+        last = min(last, self._len - 1)
+        if last < first:
+            return
+        # 保持できる範囲を超えて読み込むと、先に読んだページが破棄されてしまう
+        lastPage = min(last // self.pageSize, first // self.pageSize + self.maxPages - 1)
+        for page in range(first // self.pageSize, lastPage + 1):
+            self._page(page)
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._len))]
+        if index < 0:
+            index += self._len
+        if index < 0 or index >= self._len:
+            raise IndexError("list index out of range")
+        rows = self._page(index // self.pageSize)
+        offset = index % self.pageSize
+        if offset >= len(rows):
+            # 読み込み後にデータソースの行数が減った
+            raise IndexError("list index out of range")
+        return rows[offset]
+
+    def __iter__(self):
+        # 全体を走査する場合は、表示中のページを破棄しないようキャッシュを経由しない
+        for start in range(0, self._len, self.pageSize):
+            yield from self.source.rows(start, min(start + self.pageSize, self._len))
+
+    def getCell(self, index, col, default=""):
+        row = self[index]
+        return row[col] if len(row) > col else default
+
+    def getColumnValues(self, col, default=""):
+        return [i[col] if len(i) > col else default for i in self]
+
+    def createEmpty(self):
+        return row_store.ListRowStore([])
+
+    # 読み取り専用
+
+    def __setitem__(self, index, value):
+        raise NotImplementedError
+
+    def __delitem__(self, index):
+        raise NotImplementedError
+
+    def insert(self, index, value):
+        raise NotImplementedError
+
+    def setCell(self, index, col, value):
+        raise NotImplementedError
+
+    def insertColumn(self, col, default=""):
+        raise NotImplementedError
+
+    def deleteColumn(self, col):
+        raise NotImplementedError
+
+    def permute(self, order):
+        raise NotImplementedError
+
+    def deleteIndexes(self, indexes):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
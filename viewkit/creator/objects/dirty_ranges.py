@@ -0,0 +1,50 @@
+# dirtyRanges for virtualListCtrl
+# 再描画が必要な行の範囲を集め、まとめて反映するための補助クラス
+
+# 範囲がこれより多くなった場合は、全体を1つの範囲として再描画する
+MAX_RANGES = 16
+
+
+class DirtyRanges:
+    """再描画が必要な行の範囲 (first, last) を集める。lastは範囲に含む"""
+
+    def __init__(self):
+        self._ranges = []
+
+    def __bool__(self):
+        return len(self._ranges) > 0
+
+    def add(self, first, last):
+        if last < first:
+            return
+        if self._ranges:
+            # 直前に追加した範囲と重なるか隣接する場合は、その範囲を広げる
+            prevFirst, prevLast = self._ranges[-1]
+            if first <= prevLast + 1 and last >= prevFirst - 1:
+                self._ranges[-1] = (min(first, prevFirst), max(last, prevLast))
+                return
+        self._ranges.append((first, last))
+
+    def clear(self):
+        self._ranges = []
+
+    def pop(self, count, maxRanges=MAX_RANGES):
+        """
+        集めた範囲を統合して返し、空にする
+        countは現在の行数で、範囲外の部分は切り捨てる
+        """
+        ranges = sorted(self._ranges)
+        self._ranges = []
+        ret = []
+        for first, last in ranges:
+            first = max(first, 0)
+            last = min(last, count - 1)
+            if last < first:
+                continue
+            if ret and first <= ret[-1][1] + 1:
+                ret[-1] = (ret[-1][0], max(ret[-1][1], last))
+            else:
+                ret.append((first, last))
+        if len(ret) > maxRanges:
+            ret = [(ret[0][0], ret[-1][1])]
+        return ret
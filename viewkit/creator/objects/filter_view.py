@@ -0,0 +1,91 @@
+# filterView for virtualListCtrl
+# 条件に合う行だけを表示するための、表示上の位置→元データの位置 の対応表
+
+import bisect
+import itertools
+from array import array
+
+from . import row_store
+
+
+class FilterView:
+    """
+    predicate(行)がTrueとなる行の位置を、元データでの昇順に保持する
+    行データはコピーせず、位置の配列だけを持つ。表示上の位置をview、元データでの位置をmodelと呼ぶ
+    """
+
+    def __init__(self, predicate):
+        self.predicate = predicate
+        self.indexes = array("q")
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def __getitem__(self, viewIndex):
+        """表示上の位置に対応する元データの位置を返す"""
+        return self.indexes[viewIndex]
+
+    def build(self, store):
+        """storeの全行を調べて対応表を作り直す"""
+        self.indexes = array("q", itertools.compress(range(len(store)), map(self.predicate, store)))
+
+    def narrow(self, store, predicate):
+        """
+        現在表示している行だけを対象にpredicateで絞り込む
+        新しい条件に合う行が、必ず現在の条件にも合う場合にのみ使用できる
+        """
+        indexes = self.indexes
+        self.predicate = predicate
+        self.indexes = array("q", itertools.compress(indexes, map(predicate, map(store.__getitem__, indexes))))
+
+    def find(self, modelIndex):
+        """元データの位置に対応する表示上の位置を返す。表示されていない場合は-1"""
+        pos = bisect.bisect_left(self.indexes, modelIndex)
+        if pos < len(self.indexes) and self.indexes[pos] == modelIndex:
+            return pos
+        return -1
+
+    def lowerBound(self, modelIndex):
+        """元データでmodelIndex行目以降にある最初の行の、表示上の位置を返す"""
+        return bisect.bisect_left(self.indexes, modelIndex)
+
+    def appended(self, store, oldLen):
+        """oldLen行目以降に追加された行を反映する"""
+        newRows = itertools.islice(store, oldLen, None)
+        self.indexes.extend(itertools.compress(range(oldLen, len(store)), map(self.predicate, newRows)))
+
+    def inserted(self, store, index):
+        """index行目に1行挿入されたことを反映する"""
+        pos = bisect.bisect_left(self.indexes, index)
+        self.indexes[pos:] = array("q", [i + 1 for i in self.indexes[pos:]])
+        if self.predicate(store[index]):
+            self.indexes.insert(pos, index)
+
+    def removed(self, deleted):
+        """deleted(normalizeIndexesで正規化したもの)の行が削除されたことを反映する"""
+        if len(deleted) == 0:
+            return
+        pos = bisect.bisect_left(self.indexes, deleted[0])
+        tail = []
+        for i in self.indexes[pos:]:
+            newIndex, wasDeleted = row_store.remapIndex(i, deleted)
+            if not wasDeleted:
+                tail.append(newIndex)
+        self.indexes[pos:] = array("q", tail)
+
+    def changed(self, store, index):
+        """index行目の内容が変わったことを反映する。条件に合わなくなった行は表示から外れる"""
+        pos = bisect.bisect_left(self.indexes, index)
+        present = pos < len(self.indexes) and self.indexes[pos] == index
+        match = bool(self.predicate(store[index]))
+        if match and not present:
+            self.indexes.insert(pos, index)
+        elif present and not match:
+            del self.indexes[pos]
+
+    def reordered(self, order):
+        """行がorderの順に並べ替えられたことを反映する。条件の再評価は行わない"""
+        visible = bytearray(len(order))
+        for i in self.indexes:
+            visible[i] = 1
+        self.indexes = array("q", itertools.compress(range(len(order)), map(visible.__getitem__, order)))
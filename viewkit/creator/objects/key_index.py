@@ -0,0 +1,100 @@
+# keyIndex for virtualListCtrl
+# 行のキー(IDなど)から現在の位置を引くための索引
+
+import bisect
+import itertools
+
+
+class KeyIndex:
+    """
+    keyFunc(行)で求めたキー→行の位置 の辞書を保持する。キーは行ごとに一意である必要がある
+    行の挿入・削除で位置がずれた場合は、ずれた位置以降を次の検索時にまとめて作り直す
+    """
+
+    def __init__(self, keyFunc):
+        self.keyFunc = keyFunc
+        self._positions = {}
+        self._validUpTo = 0  # この位置より前の行は、辞書の位置が正しい
+
+    def clear(self):
+        """索引を破棄し、次の検索時に全体を作り直す"""
+        self._positions = {}
+        self._validUpTo = 0
+
+    def invalidateFrom(self, index):
+        """index行目以降の位置がずれたことを記録する"""
+        self._validUpTo = min(self._validUpTo, index)
+
+    def discard(self, row):
+        """削除される行のキーを索引から取り除く。行を削除する前に呼ぶ"""
+        self._positions.pop(self.keyFunc(row), None)
+
+    def appended(self, store, oldLen):
+        """oldLen行目以降に行が追加されたことを反映する"""
+        if self._validUpTo != oldLen:
+            return
+        for i, row in enumerate(itertools.islice(store, oldLen, None), oldLen):
+            self._positions[self.keyFunc(row)] = i
+        self._validUpTo = len(store)
+
+    def replaced(self, index, oldKey, row):
+        """index行目のキーがoldKeyからrowのキーに変わったことを反映する"""
+        if self._positions.get(oldKey) == index:
+            del self._positions[oldKey]
+        self._positions[self.keyFunc(row)] = index
+
+    def find(self, store, key):
+        """keyを持つ行の位置を返す。見つからない場合は-1"""
+        pos = self._positions.get(key)
+        if pos is not None and pos < self._validUpTo:
+            return pos
+        if self._validUpTo < len(store):
+            self._reindex(store)
+            pos = self._positions.get(key)
+        return -1 if pos is None else pos
+
+    def _reindex(self, store):
+        start = self._validUpTo
+        for i, row in enumerate(itertools.islice(store, start, None), start):
+            self._positions[self.keyFunc(row)] = i
+        self._validUpTo = len(store)
+
+
+def matchKeys(oldKeys, newKeys):
+    """
+    キーの列oldKeysとnewKeysで、同じキーの行を対応付ける。同じキーが複数ある場合は、出現順に対応付ける
+    (mapping, kept) を返す。mapping[i]はoldKeysのi番目に対応するnewKeysの位置で、対応する行がなければ-1
+    keptは、対応する行のうち前後関係を保ったまま残せる最大の組のoldKeysでの位置を、昇順に並べたもの。kept以外の行は移動したものとみなす
+    """
+    positions = {}
+    for i, key in enumerate(newKeys):
+        positions.setdefault(key, []).append(i)
+    for lst in positions.values():
+        lst.reverse()
+    mapping = []
+    for key in oldKeys:
+        lst = positions.get(key)
+        mapping.append(lst.pop() if lst else -1)
+    # 対応先の位置の最長増加部分列を求める
+    tails = []  # 長さi+1の増加部分列の末尾の、対応先の位置の最小値
+    tailIndexes = []  # その末尾の、oldKeysでの位置
+    previous = [-1] * len(mapping)
+    for i, pos in enumerate(mapping):
+        if pos < 0:
+            continue
+        length = bisect.bisect_left(tails, pos)
+        if length > 0:
+            previous[i] = tailIndexes[length - 1]
+        if length == len(tails):
+            tails.append(pos)
+            tailIndexes.append(i)
+        else:
+            tails[length] = pos
+            tailIndexes[length] = i
+    kept = []
+    i = tailIndexes[-1] if tailIndexes else -1
+    while i >= 0:
+        kept.append(i)
+        i = previous[i]
+    kept.reverse()
+    return mapping, kept
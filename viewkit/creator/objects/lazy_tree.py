@@ -0,0 +1,90 @@
+# lazyTree for treeCtrl
+# 子項目を開かれたときに初めて作成するツリーの、項目の親子関係と作成済み項目数の管理
+
+from collections import OrderedDict
+
+DEFAULT_MAX_NODES = 50000  # 作成済みの項目数がこれを超えると、閉じられた項目の子を破棄する
+
+
+class LazyNode:
+    """
+    遅延読み込みツリーの1項目。valueは表示と子の取得に使う、呼び出し元の値
+    childrenは作成済みの子のリストで、まだ読み込んでいない(または破棄した)場合はNone
+    """
+
+    __slots__ = ("value", "parent", "children", "loading", "item")
+
+    def __init__(self, value, parent=None):
+        self.value = value
+        self.parent = parent
+        self.children = None
+        self.loading = False  # バックグラウンドで子を読み込み中か
+        self.item = None  # 対応するwx.TreeItemId
+
+    def __repr__(self):
+        return "LazyNode(%r)" % (self.value,)
+
+    @property
+    def loaded(self):
+        return self.children is not None
+
+    def setChildren(self, values):
+        """子の値の列から子を作成して返す"""
+        self.children = [LazyNode(i, self) for i in values]
+        return self.children
+
+    def iterDescendants(self):
+        """作成済みの子孫をすべて返す"""
+        stack = list(self.children or ())
+        while stack:
+            node = stack.pop()
+            yield node
+            if node.children:
+                stack.extend(node.children)
+
+
+class NodeBudget:
+    """
+    作成済みの項目数を数え、maxNodesを超えた場合に、閉じられてから長く経つ項目から子を破棄する
+    破棄の対象は閉じられたまま開かれていない項目のみのため、表示中の項目は破棄されない
+    """
+
+    def __init__(self, maxNodes=DEFAULT_MAX_NODES):
+        self.maxNodes = maxNodes
+        self.count = 0
+        self._collapsed = OrderedDict()  # 閉じられた項目。古いものが先頭
+
+    def clear(self):
+        self.count = 0
+        self._collapsed.clear()
+
+    def isOver(self):
+        return self.count > self.maxNodes
+
+    def added(self, count):
+        self.count += count
+
+    def expanded(self, node):
+        self._collapsed.pop(node, None)
+
+    def collapsed(self, node):
+        self._collapsed[node] = None
+        self._collapsed.move_to_end(node)
+
+    def removed(self, node):
+        """nodeの子孫が削除されたことを反映する。node自身は残る。子孫のitemはNoneにする"""
+        for i in node.iterDescendants():
+            self._collapsed.pop(i, None)
+            i.item = None
+            self.count -= 1
+        node.children = None
+
+    def prune(self):
+        """上限内に収まるまで、閉じられた項目の子を破棄し、子を破棄した項目のリストを返す"""
+        pruned = []
+        while self.isOver() and self._collapsed:
+            node, _ = self._collapsed.popitem(last=False)
+            if node.children:
+                self.removed(node)
+                pruned.append(node)
+        return pruned
@@ -0,0 +1,183 @@
+# listExport for listCtrl and virtualListCtrl
+# リストの内容をCSV・TSV形式でファイルやクリップボードに書き出す
+# 行は1行ずつ取り出して一定行数ごとに書き込むため、元のリストの複製や全体を連結した文字列は作らない
+
+import csv
+import io
+import itertools
+import os
+import tempfile
+import threading
+
+import wx
+
+DEFAULT_CHUNK_ROWS = 2000  # 1回に書き込む行数
+BACKGROUND_EXPORT_THRESHOLD = 20000  # これ以上の行数の場合、UIを止めないように書き出す
+
+# 形式名→csvモジュールのdialect
+DIALECTS = {
+    "csv": "excel",
+    "tsv": "excel-tab",
+}
+
+
+def iterChunks(rows, format="csv", chunkRows=DEFAULT_CHUNK_ROWS, lineterminator="\r\n"):
+    """
+    rows(セルの文字列の列を返す反復子)を、chunkRows行ごとにCSV・TSV形式の文字列にする
+    (その塊の行数, 文字列) を返すジェネレータ
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, dialect=DIALECTS[format], lineterminator=lineterminator)
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunkRows))
+        if not chunk:
+            return
+        writer.writerows(chunk)
+        yield len(chunk), buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+class FileTarget:
+    """
+    pathへの書き出し先。同じフォルダの一時ファイルに書き込み、成功した場合のみpathに置き換える
+    失敗・中止した場合は一時ファイルを削除し、元のファイルはそのまま残る
+    """
+
+    def __init__(self, path, encoding="utf-8-sig"):
+        self.path = path
+        fd, self._tempPath = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        self._file = open(fd, "w", encoding=encoding, newline="")
+
+    def write(self, text):
+        self._file.write(text)
+
+    def close(self, ok):
+        self._file.close()
+        if ok:
+            os.replace(self._tempPath, self.path)
+        else:
+            os.remove(self._tempPath)
+
+
+class ClipboardTarget:
+    """クリップボードへの書き出し先。クリップボードには一度に設定する必要があるため、書き込まれた文字列は最後まで保持する"""
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+
+    def write(self, text):
+        self._buffer.write(text)
+
+    def close(self, ok):
+        if not ok:
+            return
+        if not wx.TheClipboard.Open():
+            raise RuntimeError("clipboard is not available")
+        try:
+            wx.TheClipboard.SetData(wx.TextDataObject(self._buffer.getvalue()))
+        finally:
+            wx.TheClipboard.Close()
+
+
+class Exporter:
+    """
+    rowsをCSV・TSV形式の文字列にして、chunkRows行ごとにtarget.write(文字列)に渡す
+    headerを指定すると先頭に見出し行として書き出す。最後にtarget.close(成功したか)をUIスレッドで呼ぶ
+    onProgress(書き出した行数, 全体の行数またはNone)、onFinished(exporter)もUIスレッドで呼ばれる
+    書き出し中に発生した例外はerrorに格納され、onFinishedで確認できる
+    """
+
+    def __init__(self, rows, target, total=None, format="csv", header=None, onProgress=None, onFinished=None,
+                 chunkRows=DEFAULT_CHUNK_ROWS, lineterminator="\r\n", post=None):
+        if format not in DIALECTS:
+            raise ValueError("unknown format: %r" % format)
+        if header is not None:
+            rows = itertools.chain([header], rows)
+        self._chunks = iterChunks(rows, format, chunkRows, lineterminator)
+        self._headerRows = 0 if header is None else 1
+        self._target = target
+        self.total = total
+        self._onProgress = onProgress
+        self._onFinished = onFinished
+        self._post = post if post is not None else wx.CallAfter
+        self._notify = self._call
+        self._cancelEvent = threading.Event()
+        self._thread = None
+        self.written = 0
+        self.error = None
+        self.finished = False
+
+    @property
+    def cancelled(self):
+        return self._cancelEvent.is_set()
+
+    def cancel(self):
+        """書き出しを中止する。書き出し先には何も残らない"""
+        self._cancelEvent.set()
+
+    def run(self):
+        """呼び出したスレッドで最後まで書き出す"""
+        while self._step():
+            pass
+        self._finish()
+        return self
+
+    def start(self):
+        """ワーカースレッドで書き出す。rowsはUIスレッド以外から読み出しても安全でなければならない"""
+        self._notify = self._post
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def startStepwise(self):
+        """UIスレッドで、イベント処理の合間に1塊ずつ書き出す。rowsがUIスレッドでしか読み出せない場合に使う"""
+        self._post(self._runStep)
+        return self
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while self._step():
+            pass
+        self._post(self._finish)
+
+    def _runStep(self):
+        if self._step():
+            self._post(self._runStep)
+        else:
+            self._finish()
+
+    def _step(self):
+        """1塊分を書き出す。続きがある場合はTrue"""
+        if self.cancelled:
+            return False
+        try:
+            count, text = next(self._chunks)
+            self._target.write(text)
+        except StopIteration:
+            return False
+        except Exception as e:
+            self.error = e
+            return False
+        self.written += count - self._headerRows
+        self._headerRows = 0
+        if self._onProgress is not None:
+            self._notify(self._onProgress, self.written, self.total)
+        return True
+
+    def _call(self, func, *pArg):
+        func(*pArg)
+
+    def _finish(self):
+        try:
+            self._target.close(self.error is None and not self.cancelled)
+        except Exception as e:
+            if self.error is None:
+                self.error = e
+        self.finished = True
+        if self._onFinished is not None:
+            self._onFinished(self)
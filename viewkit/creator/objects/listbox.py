@@ -17,9 +17,15 @@ class listBox(control.controlBase, wx.ListBox):
         x, y = self.GetSize()
         h = y // self.GetCountPerPage() - 1
         c = -1
-        for i in range(0, self.GetCountPerPage()):
-            if self.IsSelected(self.GetTopItem() + i):
-                c = i
+        if not self.HasMultipleSelection():
+            # 単一選択では選択位置から直接求める
+            selection = self.GetSelection()
+            if self.GetTopItem() <= selection < self.GetTopItem() + self.GetCountPerPage():
+                c = selection - self.GetTopItem()
+        else:
+            for i in range(0, self.GetCountPerPage()):
+                if self.IsSelected(self.GetTopItem() + i):
+                    c = i
         if c != -1:
             return wx.Point(x / 2, h * c - h // 2)
         else:
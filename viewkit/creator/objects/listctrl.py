@@ -4,7 +4,7 @@
 
 import json
 import wx
-from . import control, listctrl, util
+from . import control, list_export, listctrl, range_set, util
 
 
 class listCtrl(control.controlBase, wx.ListCtrl):
@@ -12,7 +12,12 @@ class listCtrl(control.controlBase, wx.ListCtrl):
         self._needSaveColumnInfo = False
         self.sectionName = ""
         self.keyName = ""
-        return super().__init__(*pArg, **kArg)
+        self._selection = range_set.RangeSet()  # 選択中の項目番号。ネイティブの状態をイベントから写し取る
+        self._selectionHandlers = {}  # 選択関係のイベントにBindされた関数
+        self._selectionSyncSuspended = False  # Trueの間は、選択のイベントで写しを更新しない
+        super().__init__(*pArg, **kArg)
+        super().Bind(wx.EVT_LIST_ITEM_SELECTED, self._onItemSelected)
+        super().Bind(wx.EVT_LIST_ITEM_DESELECTED, self._onItemDeselected)
 
     # ポップアップメニューの表示位置をクライアント座標のwx.Pointで返す
     def getPopupMenuPosition(self):
@@ -30,16 +35,189 @@ class listCtrl(control.controlBase, wx.ListCtrl):
         :returns: 選択中インデックスのリスト
         :rtype: list
         """
-        ret = []
-        i = self.GetFirstSelected()
-        if i >= 0:
-            ret.append(i)
+        return list(self._selection)
+
+    #
+    # 選択状態
+    # ネイティブのコントロールに問い合わせず、写し取った選択状態から答える
+    #
+
+    def _onItemSelected(self, event):
+        index = event.GetIndex()
+        if self._selectionSyncSuspended:
+            pass
+        elif index < 0:
+            self._selection.setRange(0, self.GetItemCount())
         else:
-            return ret
-        while True:
-            iTmp = i
-            i = self.GetNextSelected(iTmp)
-            if i >= 0:
-                ret.append(i)
+            self._selection.add(index)
+        self._callSelectionHandlers(event)
+
+    def _onItemDeselected(self, event):
+        index = event.GetIndex()
+        if index < 0:
+            self._selection.clear()
+        else:
+            self._selection.discard(index)
+        self._callSelectionHandlers(event)
+
+    def _callSelectionHandlers(self, event):
+        # wx標準と同様に、後からBindされた関数から順に、Skipされなくなるまで呼ぶ
+        for handler in reversed(self._selectionHandlers.get(event.GetEventType(), [])):
+            event.Skip(False)
+            handler(event)
+            if not event.GetSkipped():
+                return
+        event.Skip()
+
+    def Bind(self, event, handler, source=None, id=wx.ID_ANY, id2=wx.ID_ANY):
+        if event in (wx.EVT_LIST_ITEM_SELECTED, wx.EVT_LIST_ITEM_DESELECTED) and source is None and id == wx.ID_ANY and id2 == wx.ID_ANY:
+            # 選択状態の写しを必ず先に更新するため、自前で呼び出す
+            self._selectionHandlers.setdefault(event.typeId, []).append(handler)
+            return
+        return super().Bind(event, handler, source=source, id=id, id2=id2)
+
+    def Unbind(self, event, source=None, id=wx.ID_ANY, id2=wx.ID_ANY, handler=None):
+        if event in (wx.EVT_LIST_ITEM_SELECTED, wx.EVT_LIST_ITEM_DESELECTED) and source is None and id == wx.ID_ANY and id2 == wx.ID_ANY:
+            # Bindで自前の一覧に登録したものを、後から登録した順に探して1つ外す
+            handlers = self._selectionHandlers.get(event.typeId, [])
+            for i in reversed(range(len(handlers))):
+                if handler is None or handlers[i] == handler:
+                    del handlers[i]
+                    return True
+            return False
+        return super().Unbind(event, source=source, id=id, id2=id2, handler=handler)
+
+    def Select(self, idx, on=1):
+        if idx < 0:
+            if on:
+                self._selection.setRange(0, self.GetItemCount())
             else:
-                return ret
+                self._selection.clear()
+        elif on:
+            self._selection.add(idx)
+        else:
+            self._selection.discard(idx)
+        return super().Select(idx, on)
+
+    def selectAll(self):
+        """全項目を選択する。選択状態の写しの更新はO(1)"""
+        self.Select(-1)
+
+    def selectRange(self, first, last):
+        """first番目からlast番目まで(lastを含む)を選択する。写しはまとめて1回で更新する"""
+        if first > last:
+            return
+        self._selection.add(first, last + 1)
+        self.Freeze()
+        self._selectionSyncSuspended = True
+        try:
+            for i in range(first, last + 1):
+                super().Select(i)
+        finally:
+            self._selectionSyncSuspended = False
+            self.Thaw()
+
+    def IsSelected(self, idx):
+        return idx in self._selection
+
+    def GetSelectedItemCount(self):
+        return len(self._selection)
+
+    def GetFirstSelected(self, *pArg):
+        return self._selection.first()
+
+    def GetNextSelected(self, item):
+        return self._selection.next(item)
+
+    def iterSelections(self):
+        """選択中の項目番号を昇順に返すイテレータ"""
+        return iter(self._selection)
+
+    def syncSelection(self):
+        """ネイティブのコントロールから選択状態を読み直す。並べ替えなどで写しと食い違った場合に呼ぶ"""
+        self._selection.clear()
+        i = super().GetFirstSelected()
+        while i >= 0:
+            self._selection.add(i)
+            i = super().GetNextSelected(i)
+
+    def InsertItem(self, *pArg, **kArg):
+        ret = super().InsertItem(*pArg, **kArg)
+        if ret >= 0:
+            self._selection.insertShift(ret)
+        return ret
+
+    def DeleteItem(self, item):
+        self._selection.deleteShift(item)
+        return super().DeleteItem(item)
+
+    def DeleteAllItems(self):
+        self._selection.clear()
+        return super().DeleteAllItems()
+
+    def SetItemCount(self, count):
+        self._selection.truncate(count)
+        return super().SetItemCount(count)
+
+    def SortItems(self, fnSortCallBack):
+        ret = super().SortItems(fnSortCallBack)
+        self.syncSelection()
+        return ret
+
+    #
+    # 書き出し
+    # 表示中のカラムを表示順に、1行ずつ取り出しながら書き出す
+    #
+
+    def exportToFile(self, path, format="csv", selectedOnly=False, header=True, encoding="utf-8-sig",
+                     onProgress=None, onFinished=None, background=None):
+        """
+        リストの内容をpathにCSV("csv")またはTSV("tsv")形式で書き出し、list_export.Exporterを返す
+        selectedOnlyがTrueなら選択中の行のみ、headerがTrueなら先頭にカラム名の行を書き出す
+        backgroundがNoneの場合、list_export.BACKGROUND_EXPORT_THRESHOLD行以上ならUIを止めずに書き出す
+        onProgress(書き出した行数, 全体の行数)とonFinished(exporter)はUIスレッドで呼ばれる。失敗・中止した場合、pathは変更されない
+        """
+        return self._export(list_export.FileTarget(path, encoding), format, "\r\n", selectedOnly, header, onProgress, onFinished, background)
+
+    def exportToClipboard(self, format="tsv", selectedOnly=False, header=False, onProgress=None, onFinished=None, background=None):
+        """リストの内容をクリップボードにコピーし、list_export.Exporterを返す。引数はexportToFileと同じ"""
+        return self._export(list_export.ClipboardTarget(), format, "\n", selectedOnly, header, onProgress, onFinished, background)
+
+    def _export(self, target, format, lineterminator, selectedOnly, header, onProgress, onFinished, background):
+        columns = self._getExportColumns()
+        if selectedOnly:
+            # 選択範囲は呼び出し時点のものを使う
+            ranges = self._selection.ranges()
+            items = (i for start, stop in ranges for i in range(start, stop))
+            total = len(self._selection)
+        else:
+            total = self.GetItemCount()
+            items = range(total)
+        exporter = list_export.Exporter(self._iterExportRows(columns, items), target, total, format,
+                                        self._getExportHeader(columns) if header else None, onProgress, onFinished,
+                                        lineterminator=lineterminator)
+        if background is None:
+            background = total >= list_export.BACKGROUND_EXPORT_THRESHOLD
+        if not background:
+            return exporter.run()
+        if self._canExportInThread():
+            return exporter.start()
+        return exporter.startStepwise()
+
+    def _getExportColumns(self):
+        """書き出すカラムのwxのカラム番号を表示順に返す"""
+        if self.GetColumnCount() == 0:
+            return []
+        return list(super().GetColumnsOrder())
+
+    def _getExportHeader(self, columns):
+        return [super().GetColumn(i).GetText() for i in columns]
+
+    def _iterExportRows(self, columns, items):
+        """items(行番号の反復子)の各行の、columnsの表示文字列のリストを返す反復子を返す"""
+        for item in items:
+            yield [self.GetItemText(item, i) for i in columns]
+
+    def _canExportInThread(self):
+        """_iterExportRowsをワーカースレッドから読み出せるか。ネイティブのコントロールから読む場合はUIスレッドに限られる"""
+        return False
@@ -0,0 +1,161 @@
+# prefixIndex for virtualListCtrl
+# 表示文字列の前方一致で行を探すための、ソート済みのキーの索引
+
+import bisect
+import heapq
+from array import array
+
+from . import row_store
+
+# 一度に追加される行がこれより多い場合は、1行ずつ挿入せずにまとめて統合する
+MERGE_THRESHOLD = 64
+
+
+class PrefixIndex:
+    """
+    行の表示文字列(大文字と小文字を区別しない)を元データ順に保持し、検索用に (文字列, 位置) の順に並べた索引を作る
+    前方一致する範囲は二分探索で求める。行の追加と変更は索引にその場で反映し、
+    位置がずれる挿入・削除では索引を破棄して、次の検索の前に並べ直す
+    validがFalseの間は更新を行わず、次の検索の前にbuildで作り直す
+    """
+
+    def __init__(self):
+        self.texts = []  # 元データ順の表示文字列
+        self.keys = []
+        self.positions = array("q")
+        self.valid = False
+        self._sorted = True  # keysとpositionsがtextsの内容と一致しているか
+
+    def __len__(self):
+        return len(self.texts)
+
+    def clear(self):
+        """索引を破棄する。次の検索の前にbuildを呼ぶ必要がある"""
+        self.texts = []
+        self.keys = []
+        self.positions = array("q")
+        self.valid = False
+        self._sorted = True
+
+    def build(self, texts):
+        """texts(元データ順の表示文字列)から索引を作り直す"""
+        self.texts = [t.casefold() for t in texts]
+        self._sort()
+        self.valid = True
+
+    def _sort(self):
+        # 安定ソートのため、同じ文字列は位置の順に並ぶ
+        order = sorted(range(len(self.texts)), key=self.texts.__getitem__)
+        self.keys = [self.texts[i] for i in order]
+        self.positions = array("q", order)
+        self._sorted = True
+
+    def _invalidateOrder(self):
+        self.keys = []
+        self.positions = array("q")
+        self._sorted = False
+
+    def _insert(self, key, pos):
+        lo = bisect.bisect_left(self.keys, key)
+        hi = bisect.bisect_right(self.keys, key, lo)
+        i = bisect.bisect_left(self.positions, pos, lo, hi)
+        self.keys.insert(i, key)
+        self.positions.insert(i, pos)
+
+    def _remove(self, key, pos):
+        lo = bisect.bisect_left(self.keys, key)
+        hi = bisect.bisect_right(self.keys, key, lo)
+        i = bisect.bisect_left(self.positions, pos, lo, hi)
+        del self.keys[i]
+        del self.positions[i]
+
+    def appended(self, oldLen, texts):
+        """oldLen行目以降に追加された行の表示文字列textsを反映する"""
+        if not self.valid:
+            return
+        texts = [t.casefold() for t in texts]
+        self.texts.extend(texts)
+        if not self._sorted:
+            return
+        # 追加された行は既存の行より後ろにあるため、既存の位置はずれない
+        pairs = sorted(zip(texts, range(oldLen, oldLen + len(texts))))
+        if len(pairs) <= MERGE_THRESHOLD:
+            for key, pos in pairs:
+                self._insert(key, pos)
+        else:
+            pairs = list(heapq.merge(zip(self.keys, self.positions), pairs))
+            self.keys = [k for k, p in pairs]
+            self.positions = array("q", [p for k, p in pairs])
+
+    def inserted(self, index, text):
+        """index行目に表示文字列textの行が挿入されたことを反映する"""
+        if not self.valid:
+            return
+        key = text.casefold()
+        self.texts.insert(index, key)
+        if index == len(self.texts) - 1 and self._sorted:
+            self._insert(key, index)
+        else:
+            # 以降の行の位置がずれるため、次の検索の前に並べ直す
+            self._invalidateOrder()
+
+    def removed(self, deleted):
+        """deleted(normalizeIndexesで正規化したもの)の行が削除されたことを反映する"""
+        if not self.valid:
+            return
+        if isinstance(deleted, range):
+            del self.texts[deleted.start:deleted.stop]
+        else:
+            self.texts = row_store.compact(self.texts, deleted, [])
+        self._invalidateOrder()
+
+    def changed(self, index, text):
+        """index行目の表示文字列がtextに変わったことを反映する"""
+        if not self.valid:
+            return
+        key = text.casefold()
+        old = self.texts[index]
+        if key == old:
+            return
+        self.texts[index] = key
+        if self._sorted:
+            self._remove(old, index)
+            self._insert(key, index)
+
+    def find(self, prefix, start=0, visible=None):
+        """
+        表示文字列がprefixで始まる行のうち、start行目以降で最初の行の位置を返す。なければ先頭から探す
+        visible(位置)を指定した場合は、Trueを返す行だけを対象にする。見つからない場合は-1
+        """
+        if not self._sorted:
+            self._sort()
+        prefix = prefix.casefold()
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + "\U0010ffff", lo)
+        if lo == hi:
+            return -1
+        # 前方一致する範囲は、同じ文字列ごとの区間に分かれ、各区間の中では位置が昇順に並んでいる
+        groups = []
+        i = lo
+        while i < hi:
+            j = bisect.bisect_right(self.keys, self.keys[i], i, hi)
+            groups.append((i, j))
+            i = j
+        for begin, end in ((start, len(self.texts)), (0, start)):
+            for p in self._iterPositions(groups, begin, end):
+                if visible is None or visible(p):
+                    return p
+        return -1
+
+    def _iterPositions(self, groups, begin, end):
+        """groupsの各区間にある、begin以上end未満の位置を昇順に返す。各区間の開始位置は二分探索で求める"""
+        positions = self.positions
+        ranges = []
+        for i, j in groups:
+            first = bisect.bisect_left(positions, begin, i, j)
+            last = bisect.bisect_left(positions, end, first, j)
+            if first < last:
+                ranges.append(range(first, last))
+        if len(ranges) == 1:
+            return (positions[k] for k in ranges[0])
+        return heapq.merge(*[(positions[k] for k in r) for r in ranges])
@@ -0,0 +1,155 @@
+# rangeSet for listCtrl
+# 選択中の項目番号などの整数の集合を、連続する範囲の並びとして保持する
+
+import bisect
+
+
+class RangeSet:
+    """
+    整数の集合を、重ならず隣接もしない半開区間 [start, stop) の昇順の並びで保持する
+    要素数は常に保持しているため、len()はO(1)で求められる
+    """
+
+    def __init__(self):
+        self._starts = []
+        self._stops = []
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self._count > 0
+
+    def __contains__(self, value):
+        k = bisect.bisect_right(self._starts, value) - 1
+        return k >= 0 and value < self._stops[k]
+
+    def __iter__(self):
+        for start, stop in zip(self._starts, self._stops):
+            yield from range(start, stop)
+
+    def __repr__(self):
+        return "RangeSet(%r)" % self.ranges()
+
+    def ranges(self):
+        """[(start, stop), ...] を返す。stopは含まない"""
+        return list(zip(self._starts, self._stops))
+
+    def clear(self):
+        self._starts = []
+        self._stops = []
+        self._count = 0
+
+    def setRange(self, start, stop):
+        """[start, stop) だけを含む集合にする"""
+        self.clear()
+        if start < stop:
+            self._starts = [start]
+            self._stops = [stop]
+            self._count = stop - start
+
+    def add(self, start, stop=None):
+        """[start, stop) を追加する。stopを省略するとstartだけを追加する"""
+        if stop is None:
+            stop = start + 1
+        if stop <= start:
+            return
+        # 重なるか隣接する範囲をまとめる
+        lo = bisect.bisect_left(self._stops, start)
+        hi = bisect.bisect_right(self._starts, stop)
+        removed = 0
+        if lo < hi:
+            removed = sum(self._stops[k] - self._starts[k] for k in range(lo, hi))
+            start = min(start, self._starts[lo])
+            stop = max(stop, self._stops[hi - 1])
+        self._starts[lo:hi] = [start]
+        self._stops[lo:hi] = [stop]
+        self._count += stop - start - removed
+
+    def discard(self, start, stop=None):
+        """[start, stop) を取り除く。stopを省略するとstartだけを取り除く"""
+        if stop is None:
+            stop = start + 1
+        if stop <= start:
+            return
+        lo = bisect.bisect_right(self._stops, start)
+        hi = bisect.bisect_left(self._starts, stop)
+        if lo >= hi:
+            return
+        removed = sum(min(self._stops[k], stop) - max(self._starts[k], start) for k in range(lo, hi))
+        starts = []
+        stops = []
+        if self._starts[lo] < start:
+            starts.append(self._starts[lo])
+            stops.append(start)
+        if self._stops[hi - 1] > stop:
+            starts.append(stop)
+            stops.append(self._stops[hi - 1])
+        self._starts[lo:hi] = starts
+        self._stops[lo:hi] = stops
+        self._count -= removed
+
+    def truncate(self, length):
+        """length以上の値を取り除く"""
+        if self._stops and self._stops[-1] > length:
+            self.discard(max(length, 0), self._stops[-1])
+
+    def first(self):
+        """最小の値を返す。空の場合は-1"""
+        return self._starts[0] if self._starts else -1
+
+    def next(self, value):
+        """valueより大きい最小の値を返す。なければ-1"""
+        value += 1
+        k = bisect.bisect_right(self._starts, value) - 1
+        if k >= 0 and value < self._stops[k]:
+            return value
+        k += 1
+        return self._starts[k] if k < len(self._starts) else -1
+
+    def deleteShift(self, index):
+        """indexの項目が削除され、それより後ろが1つずつ詰められたことを反映する"""
+        self.discard(index)
+        k = bisect.bisect_right(self._starts, index)
+        for j in range(k, len(self._starts)):
+            self._starts[j] -= 1
+            self._stops[j] -= 1
+        if 0 < k < len(self._starts) and self._stops[k - 1] == self._starts[k]:
+            # 間の項目がなくなり、前後の範囲が隣接した
+            self._stops[k - 1] = self._stops[k]
+            del self._starts[k]
+            del self._stops[k]
+
+    def insertShift(self, index):
+        """indexに項目が挿入され、それ以降が1つずつ後ろにずれたことを反映する。挿入した項目は含まない"""
+        k = bisect.bisect_left(self._starts, index)
+        if k > 0 and self._stops[k - 1] > index:
+            # 範囲の途中に挿入された場合は2つに分ける。後半は下でずらす
+            self._starts.insert(k, index)
+            self._stops.insert(k, self._stops[k - 1])
+            self._stops[k - 1] = index
+        for j in range(k, len(self._starts)):
+            self._starts[j] += 1
+            self._stops[j] += 1
+
+
+def subtractRanges(a, b):
+    """
+    aの範囲からbの範囲を除いた範囲のリストを返す。a, bは [(start, stop), ...] の昇順の並びで、範囲どうしは重ならないもの
+    両方を先頭から一度ずつたどるため、O(len(a) + len(b))
+    """
+    ret = []
+    k = 0
+    for start, stop in a:
+        while k < len(b) and b[k][1] <= start:
+            k += 1
+        j = k
+        while j < len(b) and b[j][0] < stop:
+            if b[j][0] > start:
+                ret.append((start, b[j][0]))
+            start = max(start, b[j][1])
+            j += 1
+        if start < stop:
+            ret.append((start, stop))
+    return ret
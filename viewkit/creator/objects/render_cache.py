@@ -0,0 +1,60 @@
+# renderCache for virtualListCtrl
+# OnGetItemTextで生成した表示用文字列を行単位で保持するLRUキャッシュ
+
+from collections import OrderedDict
+
+DEFAULT_MAX_ROWS = 1024
+
+
+class RenderCache:
+    """
+    表示用文字列を {行: {列: 文字列}} の形で保持する
+    maxRowsを超えた場合は、最も長く参照されていない行から破棄する。0以下を指定するとキャッシュしない
+    """
+
+    def __init__(self, maxRows=DEFAULT_MAX_ROWS):
+        self.maxRows = maxRows
+        self._rows = OrderedDict()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def row(self, index):
+        """index行目の {列: 文字列} の辞書を返す。キャッシュがなければ作成する"""
+        cells = self._rows.get(index)
+        if cells is not None:
+            self._rows.move_to_end(index)
+            return cells
+        cells = {}
+        if self.maxRows > 0:
+            self._rows[index] = cells
+            if len(self._rows) > self.maxRows:
+                self._rows.popitem(last=False)
+        return cells
+
+    def setMaxRows(self, maxRows):
+        self.maxRows = maxRows
+        while len(self._rows) > max(maxRows, 0):
+            self._rows.popitem(last=False)
+
+    def invalidateRow(self, index):
+        self._rows.pop(index, None)
+
+    def invalidateRange(self, first, last):
+        """first行目からlast行目まで(lastを含む)のキャッシュを破棄する"""
+        if last < first:
+            return
+        if last - first + 1 <= len(self._rows):
+            for i in range(first, last + 1):
+                self._rows.pop(i, None)
+        else:
+            for i in [i for i in self._rows if first <= i <= last]:
+                del self._rows[i]
+
+    def invalidateFrom(self, index):
+        """index行目以降のキャッシュを破棄する。行の挿入・削除で位置がずれた場合に使う"""
+        for i in [i for i in self._rows if i >= index]:
+            del self._rows[i]
+
+    def clear(self):
+        self._rows.clear()
@@ -0,0 +1,60 @@
+# rowAttr for virtualListCtrl
+# 行の表示スタイルに使うwx.ItemAttrを、スタイル名ごとに1つだけ作成して共有する
+
+import wx
+
+# スタイル名→(文字色, 背景色)。Noneはコントロールの既定の色
+WHITE_STYLES = {
+    "error": ("#c00000", None),
+    "warning": ("#805000", None),
+    "disabled": ("#808080", None),
+    "highlight": (None, "#fff3b0"),
+}
+
+DARK_STYLES = {
+    "error": ("#ff8080", None),
+    "warning": ("#ffd060", None),
+    "disabled": ("#909090", None),
+    "highlight": (None, "#4a4000"),
+}
+
+
+class ItemAttrCache:
+    """
+    スタイル名から、現在のテーマ(ダーク・ホワイト)用のwx.ItemAttrを返す
+    wx.ItemAttrはテーマとスタイル名の組ごとに最初の参照時に1回だけ作成し、以降は同じものを返す
+    """
+
+    def __init__(self):
+        self._styles = {False: dict(WHITE_STYLES), True: dict(DARK_STYLES)}
+        self._attrs = {False: {}, True: {}}
+        self.dark = False
+
+    def setDark(self, dark):
+        self.dark = dark
+
+    def defineStyle(self, key, white, dark=None):
+        """スタイルを追加・変更する。white,darkは (文字色, 背景色)。darkを省略するとwhiteと同じ"""
+        self._styles[False][key] = white
+        self._styles[True][key] = dark if dark is not None else white
+        self._attrs[False].pop(key, None)
+        self._attrs[True].pop(key, None)
+
+    def get(self, key):
+        """keyのwx.ItemAttrを返す。keyがNoneまたは未定義の場合はNone"""
+        if key is None:
+            return None
+        attrs = self._attrs[self.dark]
+        attr = attrs.get(key)
+        if attr is None:
+            style = self._styles[self.dark].get(key)
+            if style is None:
+                return None
+            attr = attrs[key] = self._createAttr(*style)
+        return attr
+
+    def _createAttr(self, foreground, background):
+        return wx.ItemAttr(
+            wx.Colour(foreground) if foreground is not None else wx.NullColour,
+            wx.Colour(background) if background is not None else wx.NullColour,
+            wx.NullFont)
@@ -0,0 +1,538 @@
+# rowStore for virtualListCtrl
+# virtualListCtrlが保持する行データの格納方式を差し替えるための層
+
+import array
+import bisect
+from collections.abc import MutableSequence
+
+# 整数・浮動小数点数を格納するarrayの型コード
+INT_TYPECODES = "bBhHiIlLqQ"
+FLOAT_TYPECODES = "fd"
+
+
+class RowStore(MutableSequence):
+    """
+    virtualListCtrlの行データ格納方式の基底クラス
+    派生クラスは __len__, __getitem__, __setitem__, __delitem__, insert, getCell, setCell, insertColumn, deleteColumn, createEmpty を実装する
+    """
+
+    def getCell(self, index, col, default=""):
+        """index行目のcol列目の値を返す。列が存在しない場合はdefaultを返す"""
+        raise NotImplementedError
+
+    def setCell(self, index, col, value):
+        """index行目のcol列目の値を変更する。列に格納できない値の場合はValueErrorを送出する"""
+        raise NotImplementedError
+
+    def insertColumn(self, col, default=""):
+        """全行のcol列目にdefaultを挿入する"""
+        raise NotImplementedError
+
+    def deleteColumn(self, col):
+        """全行からcol列目を削除する"""
+        raise NotImplementedError
+
+    def createEmpty(self):
+        """同じ設定で空のストアを作成して返す"""
+        raise NotImplementedError
+
+    def getColumnValues(self, col, default=""):
+        """全行のcol列目の値をリストで返す"""
+        return [self.getCell(i, col, default) for i in range(len(self))]
+
+    def permute(self, order):
+        """行を並べ替える。orderの p 番目の値は、並べ替え後に p 行目になる行の現在の位置"""
+        rows = [self[i] for i in order]
+        self.clear()
+        self.extend(rows)
+
+    def prefetch(self, first, last):
+        """first行目からlast行目までが間もなく参照されることを通知する。必要なストアのみ実装する"""
+        pass
+
+    def deleteIndexes(self, indexes):
+        """normalizeIndexesで正規化したインデックスの行をまとめて削除する"""
+        if isinstance(indexes, range):
+            del self[indexes.start:indexes.stop]
+            return
+        for i in reversed(indexes):
+            del self[i]
+
+    def asList(self):
+        """比較などに使うためのリストを返す。内部のリストをそのまま返す場合があるため、変更してはならない"""
+        return self.copy()
+
+    def copy(self):
+        """行のリストを作成して返す"""
+        return list(self)
+
+    def clear(self):
+        del self[:]
+
+    def sort(self, key=None, reverse=False):
+        rows = sorted(self, key=key, reverse=reverse)
+        self.clear()
+        self.extend(rows)
+
+    def __eq__(self, other):
+        if isinstance(other, RowStore):
+            other = other.asList()
+        return self.asList() == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "%s(%d rows)" % (self.__class__.__name__, len(self))
+
+
+class ListRowStore(RowStore):
+    """Pythonのリストをそのまま保持するストア。従来のlist of lists形式の動作"""
+
+    def __init__(self, lst=None):
+        # 従来互換のため、渡されたリストはコピーせずそのまま保持する
+        self.lst = lst if lst is not None else []
+
+    def __len__(self):
+        return len(self.lst)
+
+    def __getitem__(self, key):
+        return self.lst[key]
+
+    def __setitem__(self, key, value):
+        self.lst[key] = value
+
+    def __delitem__(self, key):
+        del self.lst[key]
+
+    def __iter__(self):
+        return iter(self.lst)
+
+    def __reversed__(self):
+        return reversed(self.lst)
+
+    def __contains__(self, value):
+        return value in self.lst
+
+    def insert(self, index, value):
+        self.lst.insert(index, value)
+
+    def append(self, value):
+        self.lst.append(value)
+
+    def extend(self, values):
+        self.lst.extend(values)
+
+    def pop(self, index=-1):
+        return self.lst.pop(index)
+
+    def remove(self, value):
+        self.lst.remove(value)
+
+    def index(self, *pArg):
+        return self.lst.index(*pArg)
+
+    def count(self, value):
+        return self.lst.count(value)
+
+    def clear(self):
+        self.lst.clear()
+
+    def reverse(self):
+        self.lst.reverse()
+
+    def sort(self, key=None, reverse=False):
+        self.lst.sort(key=key, reverse=reverse)
+
+    def copy(self):
+        return self.lst.copy()
+
+    def asList(self):
+        return self.lst
+
+    def getCell(self, index, col, default=""):
+        obj = self.lst[index]
+        if len(obj) <= col:
+            return default
+        return obj[col]
+
+    def setCell(self, index, col, value):
+        obj = self.lst[index]
+        while (len(obj) <= col):
+            obj.append("")
+        obj[col] = value
+
+    def insertColumn(self, col, default=""):
+        for i in self.lst:
+            i.insert(col, default)
+
+    def deleteColumn(self, col):
+        for i in self.lst:
+            del i[col]
+
+    def createEmpty(self):
+        return ListRowStore()
+
+    def deleteIndexes(self, indexes):
+        if isinstance(indexes, range):
+            del self.lst[indexes.start:indexes.stop]
+            return
+        # 呼び出し元がリストを保持している場合があるため、同じリストの中身を置き換える
+        self.lst[:] = compact(self.lst, indexes, [])
+
+    def getColumnValues(self, col, default=""):
+        return [i[col] if len(i) > col else default for i in self.lst]
+
+    def permute(self, order):
+        lst = self.lst
+        self.lst[:] = [lst[i] for i in order]
+
+
+class ColumnarRowStore(RowStore):
+    """
+    列ごとに1つの配列で値を保持するストア
+    typecodesには列ごとにarrayモジュールの型コード("l", "q", "d"など)を指定する。Noneを指定した列は文字列などを格納するPythonのリストになる
+    行は取り出すたびにリストとして生成されるため、取り出した行を書き換えてもストアには反映されない。変更にはsetCellを使用する
+    """
+
+    def __init__(self, typecodes, rows=None):
+        self.typecodes = list(typecodes)
+        self.columns = [self._makeColumn(tc) for tc in self.typecodes]
+        self._len = 0
+        if rows is not None:
+            self.extend(rows)
+
+    def _makeColumn(self, typecode, values=()):
+        if typecode is None:
+            return list(values)
+        return array.array(typecode, values)
+
+    def _default(self, col):
+        if self.typecodes[col] is None:
+            return ""
+        return 0
+
+    def _row(self, index):
+        return [c[index] for c in self.columns]
+
+    def _normalizeRow(self, value):
+        if len(value) > len(self.columns):
+            raise ValueError("row has %d columns, but this store has only %d columns" % (len(value), len(self.columns)))
+        if len(value) == len(self.columns):
+            return value
+        return list(value) + [self._default(i) for i in range(len(value), len(self.columns))]
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self._row(i) for i in range(*key.indices(self._len))]
+        if key < 0:
+            key += self._len
+        if key < 0 or key >= self._len:
+            raise IndexError("list index out of range")
+        return self._row(key)
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            rows = list(value)
+            start, stop, step = key.indices(self._len)
+            if step != 1:
+                raise NotImplementedError
+            del self[start:stop]
+            for i, row in enumerate(rows):
+                self.insert(start + i, row)
+            return
+        if key < 0:
+            key += self._len
+        if key < 0 or key >= self._len:
+            raise IndexError("list assignment index out of range")
+        value = self._normalizeRow(value)
+        for c, v in zip(self.columns, value):
+            c[key] = v
+
+    def __delitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._len)
+            removed = len(range(start, stop, step))
+            for c in self.columns:
+                del c[key]
+            self._len -= removed
+            return
+        if key < 0:
+            key += self._len
+        if key < 0 or key >= self._len:
+            raise IndexError("list assignment index out of range")
+        for c in self.columns:
+            del c[key]
+        self._len -= 1
+
+    def __iter__(self):
+        if not self.columns:
+            return ([] for i in range(self._len))
+        return (list(row) for row in zip(*self.columns))
+
+    def insert(self, index, value):
+        value = self._normalizeRow(value)
+        if index < 0:
+            index = max(0, index + self._len)
+        index = min(index, self._len)
+        for c, v in zip(self.columns, value):
+            c.insert(index, v)
+        self._len += 1
+
+    def append(self, value):
+        value = self._normalizeRow(value)
+        for c, v in zip(self.columns, value):
+            c.append(v)
+        self._len += 1
+
+    def extend(self, values):
+        if values is self:
+            values = self.copy()
+        for value in values:
+            self.append(value)
+
+    def clear(self):
+        self.columns = [self._makeColumn(tc) for tc in self.typecodes]
+        self._len = 0
+
+    def reverse(self):
+        for c in self.columns:
+            c.reverse()
+
+    def sort(self, key=None, reverse=False):
+        if key is None:
+            order = sorted(range(self._len), key=self._row, reverse=reverse)
+        else:
+            order = sorted(range(self._len), key=lambda i: key(self._row(i)), reverse=reverse)
+        self.columns = [self._makeColumn(tc, (c[i] for i in order)) for tc, c in zip(self.typecodes, self.columns)]
+
+    def getCell(self, index, col, default=""):
+        if col >= len(self.columns):
+            return default
+        return self.columns[col][index]
+
+    def setCell(self, index, col, value):
+        while (len(self.columns) <= col):
+            self.insertColumn(len(self.columns))
+        typecode = self.typecodes[col]
+        if typecode is not None and typecode in INT_TYPECODES + FLOAT_TYPECODES and isinstance(value, str):
+            # ラベルの編集などで文字列が渡された場合は、列の型に変換する
+            value = value.strip()
+            try:
+                value = float(value) if typecode in FLOAT_TYPECODES else int(value)
+            except ValueError:
+                raise ValueError("%r cannot be stored in column %d of type '%s'" % (value, col, typecode)) from None
+        try:
+            self.columns[col][index] = value
+        except (TypeError, OverflowError) as e:
+            raise ValueError("%r cannot be stored in column %d of type '%s': %s" % (value, col, typecode, e)) from e
+
+    def insertColumn(self, col, default="", typecode=None):
+        if typecode is not None and default == "":
+            default = 0
+        self.typecodes.insert(col, typecode)
+        self.columns.insert(col, self._makeColumn(typecode, [default]) * self._len)
+
+    def deleteColumn(self, col):
+        del self.typecodes[col]
+        del self.columns[col]
+
+    def createEmpty(self):
+        return ColumnarRowStore(self.typecodes)
+
+    def deleteIndexes(self, indexes):
+        if isinstance(indexes, range):
+            del self[indexes.start:indexes.stop]
+            return
+        self.columns = [compact(c, indexes, c[0:0]) for c in self.columns]
+        self._len -= len(indexes)
+
+    def getColumnValues(self, col, default=""):
+        if col >= len(self.columns):
+            return [default] * self._len
+        return list(self.columns[col])
+
+    def permute(self, order):
+        self.columns = [self._makeColumn(tc, [c[i] for i in order]) for tc, c in zip(self.typecodes, self.columns)]
+
+
+def makeRecordClass(fields):
+    """fieldsを__slots__に持つ行レコードのクラスを生成する。レコードは添字でも各フィールドにアクセスできる"""
+    fields = tuple(fields)
+
+    class Record:
+        __slots__ = fields
+
+        def __init__(self, *values):
+            if len(values) > len(fields):
+                raise ValueError("record has only %d fields" % len(fields))
+            for name, value in zip(fields, values):
+                setattr(self, name, value)
+            for name in fields[len(values):]:
+                setattr(self, name, "")
+
+        def __len__(self):
+            return len(fields)
+
+        def __getitem__(self, index):
+            if isinstance(index, slice):
+                return [getattr(self, name) for name in fields[index]]
+            return getattr(self, fields[index])
+
+        def __setitem__(self, index, value):
+            setattr(self, fields[index], value)
+
+        def __iter__(self):
+            return (getattr(self, name) for name in fields)
+
+        def __eq__(self, other):
+            try:
+                return tuple(self) == tuple(other)
+            except TypeError:
+                return NotImplemented
+
+        __hash__ = None
+
+        def __repr__(self):
+            return "Record(%s)" % ", ".join("%s=%r" % (name, getattr(self, name)) for name in fields)
+
+    Record.fields = fields
+    return Record
+
+
+class RecordRowStore(ListRowStore):
+    """
+    行を__slots__を持つレコードオブジェクトとして保持するストア
+    追加された行はレコードに変換される。取り出した行はストア内のレコードそのものなので、添字で書き換えることもできる
+    """
+
+    def __init__(self, fields, rows=None):
+        super().__init__()
+        self.recordClass = makeRecordClass(fields)
+        if rows is not None:
+            self.extend(rows)
+
+    def _toRecord(self, value):
+        if isinstance(value, self.recordClass):
+            return value
+        return self.recordClass(*value)
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            value = [self._toRecord(i) for i in value]
+        else:
+            value = self._toRecord(value)
+        self.lst[key] = value
+
+    def insert(self, index, value):
+        self.lst.insert(index, self._toRecord(value))
+
+    def append(self, value):
+        self.lst.append(self._toRecord(value))
+
+    def extend(self, values):
+        self.lst.extend([self._toRecord(i) for i in values])
+
+    def getCell(self, index, col, default=""):
+        if col >= len(self.recordClass.fields):
+            return default
+        return getattr(self.lst[index], self.recordClass.fields[col])
+
+    def setCell(self, index, col, value):
+        self.lst[index][col] = value
+
+    def _rebuild(self, fields, convert):
+        # フィールドが変わるため、全レコードを作り直す
+        records = self.lst
+        self.recordClass = makeRecordClass(fields)
+        self.lst = [self.recordClass(*convert(list(r))) for r in records]
+
+    def insertColumn(self, col, default=""):
+        fields = list(self.recordClass.fields)
+        n = len(fields)
+        while "f%d" % n in fields:
+            n += 1
+        fields.insert(col, "f%d" % n)
+
+        def convert(values):
+            values.insert(col, default)
+            return values
+        self._rebuild(fields, convert)
+
+    def deleteColumn(self, col):
+        fields = list(self.recordClass.fields)
+        del fields[col]
+
+        def convert(values):
+            del values[col]
+            return values
+        self._rebuild(fields, convert)
+
+    def createEmpty(self):
+        return RecordRowStore(self.recordClass.fields)
+
+
+def createRowStore(obj):
+    """リストなどからRowStoreを作成する。RowStoreはそのまま返す"""
+    if isinstance(obj, RowStore):
+        return obj
+    if obj is None:
+        return ListRowStore()
+    if isinstance(obj, list):
+        return ListRowStore(obj)
+    return ListRowStore(list(obj))
+
+
+def normalizeIndexes(indexes, length):
+    """
+    削除対象などの行の指定(int, slice, range, インデックスの列)を正規化する
+    連続した範囲は昇順のrangeで、それ以外は重複のない昇順のリストで返す
+    """
+    if isinstance(indexes, int):
+        indexes = [indexes]
+    elif isinstance(indexes, slice):
+        indexes = range(*indexes.indices(length))
+    if isinstance(indexes, range):
+        if indexes.step < 0:
+            indexes = indexes[::-1]
+        if indexes.step == 1 or len(indexes) <= 1:
+            if len(indexes) == 0:
+                return range(0)
+            if indexes.start < 0 or indexes[-1] >= length:
+                raise IndexError("list index out of range")
+            return range(indexes.start, indexes[-1] + 1)
+    ret = sorted({i + length if i < 0 else i for i in indexes})
+    if ret and (ret[0] < 0 or ret[-1] >= length):
+        raise IndexError("list index out of range")
+    return ret
+
+
+def remapIndex(index, deleted):
+    """
+    normalizeIndexesで正規化した行を削除した後の、index行目の新しい位置を返す
+    戻り値は (新しい位置, index自体が削除されたか)。削除された場合は、その位置に繰り上がった行の位置を返す
+    """
+    if isinstance(deleted, range):
+        if index < deleted.start:
+            return index, False
+        if index < deleted.stop:
+            return deleted.start, True
+        return index - len(deleted), False
+    pos = bisect.bisect_left(deleted, index)
+    return index - pos, pos < len(deleted) and deleted[pos] == index
+
+
+def compact(seq, indexes, result):
+    """seqからindexesの位置を除いた要素をresultに追加して返す。削除されない区間ごとにまとめてコピーする"""
+    prev = 0
+    for i in indexes:
+        if i > prev:
+            result += seq[prev:i]
+        prev = i + 1
+    result += seq[prev:]
+    return result
@@ -0,0 +1,107 @@
+# streamLoader for virtualListCtrl
+# イテレータから読み出した行を、ワーカースレッドからUIスレッドへ少しずつ渡す
+
+import threading
+import time
+
+import wx
+
+DEFAULT_CHUNK_SIZE = 5000  # 1回に渡す最大行数
+DEFAULT_INTERVAL = 0.1  # 行数に達しなくても、この秒数が経過したら渡す
+FIRST_INTERVAL = 0.016  # 最初の行は1フレーム以内に表示されるよう早めに渡す
+MAX_PENDING_CHUNKS = 4  # UIスレッドで未処理の塊がこれ以上あれば、読み出しを待つ
+
+
+class StreamLoader:
+    """
+    iterableをワーカースレッドで読み出し、一定の行数か時間ごとにまとめてonChunk(行のリスト)をUIスレッドで呼ぶ
+    onProgress(読み込み済み行数, 全体の行数またはNone)、onFinished(loader)もUIスレッドで呼ばれる
+    読み出し中に発生した例外はerrorに格納され、onFinishedで確認できる
+    """
+
+    def __init__(self, iterable, onChunk, onProgress=None, onFinished=None, total=None,
+                 chunkSize=DEFAULT_CHUNK_SIZE, interval=DEFAULT_INTERVAL, post=None):
+        self._iterable = iterable
+        self._onChunk = onChunk
+        self._onProgress = onProgress
+        self._onFinished = onFinished
+        if total is None and hasattr(iterable, "__len__"):
+            total = len(iterable)
+        self.total = total
+        self.chunkSize = chunkSize
+        self.interval = interval
+        self._post = post if post is not None else wx.CallAfter
+        self._cancelEvent = threading.Event()
+        self._slots = threading.Semaphore(MAX_PENDING_CHUNKS)
+        self._thread = None
+        self.loaded = 0
+        self.error = None
+        self.finished = False
+
+    @property
+    def cancelled(self):
+        return self._cancelEvent.is_set()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """読み出しを中止する。既に送られたがまだ反映されていない行も破棄する"""
+        self._cancelEvent.set()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            chunk = []
+            interval = FIRST_INTERVAL
+            last = time.monotonic()
+            for row in self._iterable:
+                if self.cancelled:
+                    return
+                chunk.append(row)
+                if len(chunk) >= self.chunkSize or time.monotonic() - last >= interval:
+                    if not self._send(chunk):
+                        return
+                    chunk = []
+                    interval = self.interval
+                    last = time.monotonic()
+            if chunk:
+                self._send(chunk)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._post(self._finish)
+
+    def _send(self, chunk):
+        """UIスレッドにchunkを送る。中止された場合はFalse"""
+        while not self._slots.acquire(timeout=0.1):
+            if self.cancelled:
+                return False
+        self._post(self._deliver, chunk)
+        return True
+
+    def _deliver(self, chunk):
+        self._slots.release()
+        if self.cancelled:
+            return
+        try:
+            self._onChunk(chunk)
+            self.loaded += len(chunk)
+            if self._onProgress is not None:
+                self._onProgress(self.loaded, self.total)
+        except RuntimeError:
+            # 反映先のコントロールが破棄された
+            self.cancel()
+
+    def _finish(self):
+        self.finished = True
+        if self._onFinished is not None:
+            try:
+                self._onFinished(self)
+            except RuntimeError:
+                pass
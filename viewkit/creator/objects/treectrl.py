@@ -3,11 +3,164 @@
 # Copyright (C) 2021 yamahubuki <itiro.ishino@gmail.com>
 
 import json
+import threading
 import wx
-from . import control, listctrl, util
+from logging import getLogger
+from . import control, lazy_tree, util
 
 
 class treeCtrl(control.controlBase, wx.TreeCtrl):
     def __init__(self, *pArg, **kArg):
         self.focusFromKbd = util.popArg(kArg, "enable_tab_focus", True)  # キーボードフォーカスの初期値
+        self._provider = None  # 遅延読み込みモードでは、値から子の値の列を返す関数
+        self._hasChildren = None
+        self._getText = str
+        self._loadInBackground = False
+        self._loadingText = ""
+        self._budget = lazy_tree.NodeBudget()
+        self._lazyVersion = 0  # ツリーを作り直すたびに増える。古い読み込み結果を捨てるために使う
+        self.log = getLogger(__name__)
         return super().__init__(*pArg, **kArg)
+
+    #
+    # 遅延読み込みモード
+    # 項目は開かれたときに初めて作成し、閉じられた項目の子は上限を超えたら破棄する
+    #
+
+    def setChildrenProvider(self, provider, hasChildren=None, getText=str, background=False,
+                            maxNodes=lazy_tree.DEFAULT_MAX_NODES, loadingText="..."):
+        """
+        遅延読み込みモードにする。provider(値)は子の値の列を返す関数。ルートはsetRootValueで設定する
+        hasChildren(値)は子を持つかを返す関数。Noneの場合は開くまで子があるものとして扱う。getText(値)は表示文字列を返す
+        backgroundがTrueなら、provider・hasChildren・getTextをワーカースレッドで呼び、読み込み中はloadingTextの項目を表示する
+        作成済みの項目数がmaxNodesを超えると、閉じられた順に子を破棄し、再度開かれたときに読み込み直す
+        """
+        if self._provider is None:
+            super().Bind(wx.EVT_TREE_ITEM_EXPANDING, self._onItemExpanding)
+            super().Bind(wx.EVT_TREE_ITEM_COLLAPSED, self._onItemCollapsed)
+        self._provider = provider
+        self._hasChildren = hasChildren
+        self._getText = getText
+        self._loadInBackground = background
+        self._budget.maxNodes = maxNodes
+        self._loadingText = loadingText
+
+    def setRootValue(self, value):
+        """ツリーを作り直し、valueをルートにする。TR_HIDE_ROOTの場合はルートの子をすぐに読み込む"""
+        self.DeleteAllItems()
+        node = lazy_tree.LazyNode(value)
+        node.item = self.AddRoot(self._getText(value), data=node)
+        self.SetItemHasChildren(node.item, self._nodeHasChildren(value))
+        if self.HasFlag(wx.TR_HIDE_ROOT):
+            self._loadNode(node)
+        return node.item
+
+    def getItemValue(self, item):
+        """遅延読み込みモードで、itemの値を返す"""
+        node = self.GetItemData(item)
+        return node.value if isinstance(node, lazy_tree.LazyNode) else None
+
+    def reloadItem(self, item):
+        """itemの子を破棄し、開いていた場合はすぐに、そうでなければ次に開かれたときに読み込み直す"""
+        node = self.GetItemData(item)
+        if not isinstance(node, lazy_tree.LazyNode) or node.loading:
+            return
+        expanded = self.IsExpanded(item)
+        self._budget.removed(node)
+        self.DeleteChildren(item)
+        self.SetItemHasChildren(item, self._nodeHasChildren(node.value))
+        if expanded or (item == self.GetRootItem() and self.HasFlag(wx.TR_HIDE_ROOT)):
+            self._loadNode(node)
+
+    def getLoadedNodeCount(self):
+        """作成済みの項目数(ルートを除く)"""
+        return self._budget.count
+
+    def DeleteAllItems(self):
+        self._lazyVersion += 1
+        self._budget.clear()
+        return super().DeleteAllItems()
+
+    def _nodeHasChildren(self, value):
+        return True if self._hasChildren is None else bool(self._hasChildren(value))
+
+    def _fetchChildren(self, value):
+        """子の (値, 表示文字列, 子を持つか) のリストを返す。ワーカースレッドからも呼ばれる"""
+        return [(i, self._getText(i), self._nodeHasChildren(i)) for i in self._provider(value)]
+
+    def _loadNode(self, node):
+        if not self._loadInBackground:
+            self._setChildren(node, self._fetchChildren(node.value))
+            return
+        node.loading = True
+        self.AppendItem(node.item, self._loadingText)
+        threading.Thread(target=self._loadWorker, args=(node, self._lazyVersion), daemon=True).start()
+
+    def _loadWorker(self, node, version):
+        try:
+            children = self._fetchChildren(node.value)
+        except Exception as e:
+            wx.CallAfter(self._onChildrenLoaded, node, version, None, e)
+            return
+        wx.CallAfter(self._onChildrenLoaded, node, version, children, None)
+
+    def _onChildrenLoaded(self, node, version, children, error):
+        if version != self._lazyVersion:
+            # 読み込み中にツリーが作り直された
+            return
+        node.loading = False
+        if not self._isItemOf(node):
+            # 読み込み中に親の子が破棄された
+            return
+        self.DeleteChildren(node.item)  # 読み込み中の表示を消す
+        if error is not None:
+            self.log.error("failed to load children of %r: %s" % (node.value, error))
+            self.Collapse(node.item)
+            self.SetItemHasChildren(node.item, True)
+            return
+        self._setChildren(node, children)
+
+    def _isItemOf(self, node):
+        """node.itemがまだツリーに存在し、nodeの項目であるか"""
+        return node.item is not None and node.item.IsOk() and self.GetItemData(node.item) is node
+
+    def _setChildren(self, node, children):
+        nodes = node.setChildren([i[0] for i in children])
+        if not nodes:
+            self.SetItemHasChildren(node.item, False)
+            return
+        self.Freeze()
+        try:
+            for child, (value, text, hasChildren) in zip(nodes, children):
+                child.item = self.AppendItem(node.item, text, data=child)
+                if hasChildren:
+                    self.SetItemHasChildren(child.item)
+        finally:
+            self.Thaw()
+        self._budget.added(len(nodes))
+
+    def _onItemExpanding(self, event):
+        event.Skip()
+        node = self.GetItemData(event.GetItem())
+        if not isinstance(node, lazy_tree.LazyNode):
+            return
+        self._budget.expanded(node)
+        if not node.loaded and not node.loading:
+            self._loadNode(node)
+
+    def _onItemCollapsed(self, event):
+        event.Skip()
+        node = self.GetItemData(event.GetItem())
+        if not isinstance(node, lazy_tree.LazyNode):
+            return
+        self._budget.collapsed(node)
+        if self._budget.isOver():
+            # 閉じる処理の途中で項目を削除しないよう、後で行う
+            wx.CallAfter(self._prune, self._lazyVersion)
+
+    def _prune(self, version):
+        if version != self._lazyVersion:
+            return
+        for node in self._budget.prune():
+            self.DeleteChildren(node.item)
+            self.SetItemHasChildren(node.item, True)
@@ -0,0 +1,125 @@
+# virtualListBoxBase for ViewCreator
+# 項目数と、項目番号から文字列を返す関数だけを持つリストボックス
+# スクリーンリーダーから読めるよう、wx.VListBox(オーナードロー)ではなく、ヘッダーのない1列の仮想リストビューで実装する
+# wx.ListBoxと同じく、ユーザーの操作で選択が変わるとEVT_LISTBOX(wx.CommandEvent)を発生させる
+
+import wx
+from . import listctrl, util
+
+
+class virtualListBox(listctrl.listCtrl):
+    def __init__(self, *pArg, **kArg):
+        self.focusFromKbd = util.popArg(kArg, "enable_tab_focus", True)  # キーボードフォーカスの初期値
+        self._itemText = util.popArg(kArg, "item_text", str)  # 項目番号から表示文字列を返す関数
+        count = util.popArg(kArg, "count", 0)
+        self._selecting = 0  # プログラムから選択を変更中か。wx.ListBoxと同じく、その間はEVT_LISTBOXを発生させない
+        style = kArg.get("style", 0)
+        listStyle = wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_NO_HEADER
+        if not style & (wx.LB_MULTIPLE | wx.LB_EXTENDED):
+            listStyle |= wx.LC_SINGLE_SEL
+        kArg["style"] = listStyle | (style & ~(wx.LB_SINGLE | wx.LB_MULTIPLE | wx.LB_EXTENDED))
+        super().__init__(*pArg, **kArg)
+        super().AppendColumn("")
+        super().Bind(wx.EVT_SIZE, self._onSize)
+        self.Bind(wx.EVT_LIST_ITEM_SELECTED, self._onListSelectionChanged)
+        self.Bind(wx.EVT_LIST_ITEM_DESELECTED, self._onListSelectionChanged)
+        self.SetItemCount(count)
+
+    def OnGetItemText(self, item, column):
+        return self._itemText(item)
+
+    def _onListSelectionChanged(self, event):
+        """選択関係のイベントを、wx.ListBoxと同じEVT_LISTBOXのイベントとして送る"""
+        event.Skip()
+        index = event.GetIndex()
+        selected = event.GetEventType() == wx.wxEVT_LIST_ITEM_SELECTED
+        if self._selecting or index < 0 or (not selected and self.HasFlag(wx.LC_SINGLE_SEL)):
+            return
+        command = wx.CommandEvent(wx.wxEVT_LISTBOX, self.GetId())
+        command.SetEventObject(self)
+        command.SetInt(index)
+        command.SetString(self._itemText(index))
+        command.SetExtraLong(1 if selected else 0)  # IsSelection()の値
+        self.GetEventHandler().ProcessEvent(command)
+
+    def _onSize(self, event):
+        # 1列で幅いっぱいに表示する
+        super().SetColumnWidth(0, self.GetClientSize().width)
+        event.Skip()
+
+    def setItemText(self, func):
+        """項目番号から表示文字列を返す関数を設定し、表示し直す"""
+        self._itemText = func
+        self.RefreshAll()
+
+    def SetCount(self, count):
+        """項目数を変更する。選択中の項目のうち、count以上のものは選択が解除される"""
+        self.SetItemCount(count)
+        self.RefreshAll()
+
+    def RefreshAll(self):
+        if self.GetItemCount() > 0:
+            self.RefreshItems(0, self.GetItemCount() - 1)
+
+    #
+    # wx.ListBox互換
+    #
+
+    def GetCount(self):
+        return self.GetItemCount()
+
+    def IsEmpty(self):
+        return self.GetItemCount() == 0
+
+    def GetString(self, n):
+        return self._itemText(n)
+
+    def GetSelection(self):
+        return self.GetFirstSelected()
+
+    def GetSelections(self):
+        return self.getItemSelections()
+
+    def GetStringSelection(self):
+        n = self.GetSelection()
+        return self._itemText(n) if n >= 0 else ""
+
+    def Select(self, idx, on=1):
+        self._selecting += 1
+        try:
+            return super().Select(idx, on)
+        finally:
+            self._selecting -= 1
+
+    def selectRange(self, first, last):
+        self._selecting += 1
+        try:
+            super().selectRange(first, last)
+        finally:
+            self._selecting -= 1
+
+    def SetSelection(self, n, select=True):
+        if n == wx.NOT_FOUND:
+            self.Select(-1, 0)
+            return
+        if select and self.HasFlag(wx.LC_SINGLE_SEL):
+            current = self.GetFirstSelected()
+            if current >= 0 and current != n:
+                self.Select(current, 0)
+        self.Select(n, 1 if select else 0)
+        if select:
+            self.Focus(n)
+
+    def Deselect(self, n):
+        self.Select(n, 0)
+
+    def SetFirstItem(self, n):
+        self.EnsureVisible(n)
+
+    # 右クリック時に呼ぶと、その時のマウス座標位置を強制的にクリックする
+    def setCursorOnMouse(self, event):
+        item, flags = self.HitTest(self.ScreenToClient(wx.GetMousePosition()))
+        if item != wx.NOT_FOUND and (not self.IsSelected(item)):
+            self.SetSelection(wx.NOT_FOUND)
+            self.SetSelection(item)
+        event.Skip()  # コンテキストメニュー表示の為Skip必須
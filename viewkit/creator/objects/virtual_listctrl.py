@@ -2,14 +2,37 @@
 # Copyright (C) 2019-2020 Hiroki Fujii <hfujii@hisystron.com>
 # Copyright (C) 2020-2021 yamahubuki <itiro.ishino@gmail.com>
 
+import contextlib
+import functools
+import threading
+import time
 import wx
 
 
-from . import listctrl, util
+from . import data_source, dirty_ranges, filter_view, key_index, listctrl, prefix_index, range_set, render_cache, row_attr, row_store, stream_loader, util
+
+
+# これ以上の行数の場合、並べ替えのキー抽出をバックグラウンドで行う
+BACKGROUND_SORT_THRESHOLD = 200000
+
+# インクリメンタルサーチで、この秒数以内に入力された文字は続けて入力されたものとみなす
+TYPE_AHEAD_TIMEOUT = 1.0
+
+# setListの差分反映で、変更された行がこの割合以下なら1行ずつ反映する
+RECONCILE_PATCH_RATIO = 0.125
+
+# 表示用文字列のキャッシュに、行のスタイル名を格納する際のキー
+_ATTR_CELL = -1
 
 
 class virtualListCtrl(listctrl.listCtrl):
-    # listの機能を組み込み
+    """
+    listの機能を組み込んだ仮想リストコントロール
+    field_mappingは、カラムの挿入・削除で行データを書き換えるかを指定する(setFieldMappingを参照)
+    既定(None)では、list of lists形式のストアでは全行を書き換え(行数に比例)、列指向・レコード形式のストアでは
+    行データを書き換えずにカラムとフィールドの対応だけを更新する(カラム数に比例)
+    """
+
     def __init__(self, *pArg, **kArg):
         lPArg = list(pArg)
         if "style" in kArg:
@@ -18,59 +41,724 @@ class virtualListCtrl(listctrl.listCtrl):
             lPArg[4] = lPArg[4] | wx.LC_REPORT | wx.LC_VIRTUAL
         else:
             kArg["style"] = wx.LC_REPORT | wx.LC_VIRTUAL
-        self.lst = []
+        self._store = row_store.createRowStore(util.popArg(kArg, "row_store"))
+        self._keyIndex = None
+        keyFunc = util.popArg(kArg, "key_func")
+        if keyFunc is not None:
+            self._keyIndex = key_index.KeyIndex(keyFunc)
         self.focusFromKbd = util.popArg(kArg, "enable_tab_focus", True)
         self.columns = []
+        self._fieldCount = 0  # 割り当て済みのフィールド番号の数。新しいカラムには次の番号を割り当てる
+        self._fieldMapping = util.popArg(kArg, "field_mapping", None)  # カラムの挿入・削除で行データを書き換えないか。Noneでストアに応じて決める
+        self._wxColumns = []  # wxのカラム番号→Column の変換表
+        self._columnsByCol = {}  # 論理カラム番号→Column の変換表
+        self._renderCache = render_cache.RenderCache(util.popArg(kArg, "render_cache_size", render_cache.DEFAULT_MAX_ROWS))
+        self._batchDepth = 0  # batch()のネスト数
+        self._dirtyRanges = dirty_ranges.DirtyRanges()  # 反映待ちの再描画範囲
+        self._countChanged = False  # 反映待ちの行数変更があるか
+        self._autoBatch = util.popArg(kArg, "auto_batch", False)  # 変更をアイドル時にまとめて反映するか
+        self._flushScheduled = False
+        self._rowsVersion = 0  # 行データが変更されるたびに増える。バックグラウンド処理の結果が古くないかの確認に使う
+        self._sortColumns = []  # 現在の並び順 [(Column, 昇順か), ...]
+        self._sortKeyCache = {}  # Column→現在の行順に並んだ並べ替えキーのリスト
+        self._sortOnColumnClick = util.popArg(kArg, "sort_on_column_click", False)
+        self._sortThread = None  # バックグラウンドで並べ替え中のスレッド
+        self._filter = None  # 絞り込み中はFilterView
+        self._filterText = None  # setFilterTextで絞り込み中は (文字列, Columnのタプル)
+        self._loader = None  # loadAsyncで読み込み中のStreamLoader
+        self._prefixIndex = None  # 前方一致検索用の索引。最初の検索で作成する
+        self._typeAhead = util.popArg(kArg, "type_ahead", False)  # 文字入力で行を探すか
+        self._typeAheadCol = None  # 検索対象のColumn。Noneで先頭に表示されているカラム
+        self._typeAheadText = ""
+        self._typeAheadTime = 0
+        self._attrProvider = None  # 行からスタイル名を求める関数
+        self._attrCache = row_attr.ItemAttrCache()
         self.bindFunctions = {}  # カラム関係のイベントのバインドを保存する辞書
         self.printColumn = True
         super().__init__(*lPArg, **kArg)
         super().Bind(wx.EVT_LIST_END_LABEL_EDIT, self.onLabelEditEnd)
         super().Bind(wx.EVT_LIST_COL_END_DRAG, self.onColumnDragEnd)
+        super().Bind(wx.EVT_LIST_COL_CLICK, self.onColumnClick)
+        super().Bind(wx.EVT_LIST_CACHE_HINT, self.onCacheHint)
+        super().Bind(wx.EVT_CHAR, self.onChar)
+
+    def RefreshItem(self, item):
+        if 0 <= item < self._nativeCount():
+            self._renderCache.invalidateRow(self.viewToModel(item))
+        super().RefreshItem(item)
 
     def RefreshItems(self, first, end):
+        last = min(end, self._nativeCount() - 1)
+        if 0 <= first <= last:
+            self._renderCache.invalidateRange(self.viewToModel(first), self.viewToModel(last))
         super().RefreshItems(first, end)
-        wx.YieldIfNeeded()
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        withブロック内での変更をまとめ、ブロックを抜けた時に行数の更新と再描画を1回ずつ行う
+        ブロック内ではGetItemCount()などコントロール側の状態は更新されない
+        """
+        self._batchDepth += 1
+        try:
+            yield self
+        finally:
+            self._batchDepth -= 1
+            if self._batchDepth == 0:
+                self.flush()
+
+    def isBatching(self):
+        return self._batchDepth > 0 or self._autoBatch
+
+    def setAutoBatch(self, v):
+        """Trueにすると、変更をその場で反映せず、アイドル時にまとめて反映する"""
+        assert type(v) == bool
+        self._autoBatch = v
+        if not v:
+            self.flush()
+
+    def flush(self):
+        """反映待ちの行数変更と再描画をコントロールに反映する"""
+        self._flushScheduled = False
+        if self._batchDepth > 0:
+            return
+        count = self._nativeCount()
+        if self._countChanged:
+            self._countChanged = False
+            super().SetItemCount(count)
+        for first, last in self._dirtyRanges.pop(count):
+            super().RefreshItems(first, last)
+
+    def _onIdleFlush(self):
+        try:
+            self.flush()
+        except RuntimeError:
+            # 反映前にコントロールが破棄された
+            pass
+
+    def _scheduleFlush(self):
+        if self._batchDepth == 0 and not self._flushScheduled:
+            self._flushScheduled = True
+            wx.CallAfter(self._onIdleFlush)
+
+    def _updateItemCount(self):
+        """ストアの行数をコントロールに反映する。バッチ中は反映を遅らせる"""
+        if self.isBatching():
+            self._countChanged = True
+            self._scheduleFlush()
+            return
+        super().SetItemCount(self._nativeCount())
+
+    def _refreshRows(self, first, last):
+        """
+        元データのfirst行目からlast行目までを再描画する
+        バッチ中は範囲を記録して後でまとめて反映する
+        """
+        self._renderCache.invalidateRange(first, last)
+        if self._filter is not None:
+            first = self._filter.lowerBound(first)
+            last = self._filter.lowerBound(last + 1) - 1
+        if self.isBatching():
+            self._dirtyRanges.add(first, last)
+            self._scheduleFlush()
+            return
+        if first == last:
+            self.RefreshItem(first)
+        elif first < last:
+            self.RefreshItems(first, last)
+
+    def _deleteNativeItem(self, index):
+        """元データのindex行目に対応する項目をコントロールから削除する。行を削除する前に呼ぶ"""
+        index = self.modelToView(index)
+        # バッチ中はコントロールにまだ存在しない行の場合がある
+        if 0 <= index < super().GetItemCount():
+            super().DeleteItem(index)
+
+    def setRenderCacheSize(self, rows):
+        """表示用文字列をキャッシュする行数を設定する。0でキャッシュしない"""
+        self._renderCache.setMaxRows(rows)
+
+    @property
+    def lst(self):
+        return self._store
+
+    @lst.setter
+    def lst(self, value):
+        self.setList(value)
 
     def getList(self):
         return self.copy()
 
-    def setList(self, lst):
-        lstLen = len(lst)
-        self.lst = lst
-        super().SetItemCount(lstLen)
-        if lstLen > 0:
-            self.RefreshItems(0, lstLen)
+    def getStore(self):
+        return self._store
+
+    def setStore(self, store):
+        """行データの格納方式(row_store.RowStore)を差し替える"""
+        self.cancelLoading()
+        self._store = row_store.createRowStore(store)
+        self._refreshAll()
+
+    def setList(self, lst, key=None):
+        """
+        lstの内容を表示する
+        keyに行からキー(IDなど)を求める関数を指定すると、現在の内容との差分だけを反映し、変わった行だけを再描画する
+        その場合、フォーカス・選択・表示位置は同じキーの行に保たれる
+        """
+        self.cancelLoading()
+        if key is not None and len(self._store) > 0 and not self._isCurrentList(lst) and not self.isDataSource():
+            self._reconcile(self._createStoreFor(lst), key)
+            return
+        self._store = self._createStoreFor(lst)
+        self._refreshAll()
+
+    def _createStoreFor(self, lst):
+        if isinstance(lst, row_store.RowStore) or isinstance(self._store, row_store.ListRowStore):
+            return row_store.createRowStore(lst)
+        # 列指向などのストアを使用中の場合は、同じ形式のストアに読み込む
+        store = self._store.createEmpty()
+        store.extend(lst)
+        return store
+
+    def _isCurrentList(self, lst):
+        """lstが表示中のリストそのものか。その場合は変更前の内容がわからないため、差分を求められない"""
+        return lst is self._store or (isinstance(self._store, row_store.ListRowStore) and lst is self._store.lst)
+
+    def _reconcile(self, newStore, key):
+        old = self._store
+        oldKeys = [key(i) for i in old]
+        newKeys = [key(i) for i in newStore]
+        newLen = len(newStore)
+        # 前後関係を保ったまま残る行以外は、削除して挿入し直したものとみなす
+        mapping, kept = key_index.matchKeys(oldKeys, newKeys)
+        keptNew = bytearray(newLen)
+        for i in kept:
+            keptNew[mapping[i]] = 1
+        removed = row_store.normalizeIndexes(sorted(set(range(len(old))).difference(kept)), len(old))
+        inserted = [i for i in range(newLen) if not keptNew[i]]
+        changed = [(i, mapping[i]) for i in kept if old[i] != newStore[mapping[i]]]
+        if len(removed) + len(inserted) + len(changed) > newLen * RECONCILE_PATCH_RATIO:
+            self._resetWithMapping(newStore, mapping)
+            return
+
+        tokens = [self._beforeRowChanged(i) for i, _ in changed]
+        if not removed and not inserted:
+            # 行の構成が同じであれば、内容の変わった行だけを1行ずつ反映する
+            self._store = newStore
+            with self.batch():
+                for (_, i), token in zip(changed, tokens):
+                    self._onRowChanged(i, token)
+            return
+        state = self._saveViewState(mapping)
+        with self.batch():
+            if removed:
+                self._beforeRowsRemoved(removed)
+                self._onRowsRemoved(removed)
+            # 前から順に挿入すると、挿入する位置より前の行は新しい内容と一致する
+            self._store = newStore
+            for i in inserted:
+                self._onRowsInserted(i)
+            for (_, i), token in zip(changed, tokens):
+                self._onRowChanged(i, token)
+            first = min(removed[0] if removed else newLen, inserted[0] if inserted else newLen)
+            self._refreshRows(first, newLen - 1)
+            self._restoreViewState(state)
+
+    def _resetWithMapping(self, newStore, mapping):
+        """全体をnewStoreに入れ替え、mapping(元の位置→新しい位置)に従ってフォーカス・選択・表示位置を付け替える"""
+        state = self._saveViewState(mapping)
+        self._store = newStore
+        self._onRowsReset()
+        with self.batch():
+            self._refreshRows(0, len(newStore) - 1)
+            self._restoreViewState(state)
+
+    def _saveViewState(self, mapping):
+        """選択・フォーカス・表示位置にある行の、mappingによる新しい位置を返す。行を入れ替える前に呼ぶ"""
+        count = self._nativeCount()
+
+        def newIndex(item):
+            return mapping[self.viewToModel(item)] if 0 <= item < count else -1
+        selected = [newIndex(i) for start, stop in self._selection.ranges() for i in range(start, min(stop, count))]
+        return selected, newIndex(self.GetFocusedItem()), newIndex(self.GetTopItem())
+
+    def _restoreViewState(self, state):
+        """_saveViewStateで覚えた行に、選択・フォーカス・表示位置を付け替える"""
+        selected, focus, top = state
+        count = self._nativeCount()
+        # 選択状態を付け替えるため、行数はバッチ中でもその場で反映する
+        self._countChanged = False
+        super().SetItemCount(count)
+        selection = range_set.RangeSet()
+        for i in selected:
+            item = self.modelToView(i) if i >= 0 else -1
+            if item >= 0:
+                selection.add(item)
+        self._replaceSelection(selection.ranges())
+        if focus >= 0 and self.modelToView(focus) >= 0:
+            # Focus()は表示位置を動かすため、状態だけを設定する
+            self.SetItemState(self.modelToView(focus), wx.LIST_STATE_FOCUSED, wx.LIST_STATE_FOCUSED)
+        if top >= 0 and self.modelToView(top) >= 0:
+            self._scrollToTop(self.modelToView(top))
+
+    def _scrollToTop(self, item):
+        """itemがいちばん上に表示されるようにスクロールする"""
+        top = self.GetTopItem()
+        if item == top:
+            return
+        height = self.GetItemRect(top).height
+        if height > 0:
+            self.ScrollList(0, (item - top) * height)
+
+    def loadAsync(self, iterable, clear=True, onProgress=None, onFinished=None, total=None,
+                  chunkSize=stream_loader.DEFAULT_CHUNK_SIZE, interval=stream_loader.DEFAULT_INTERVAL):
+        """
+        iterable(ジェネレータなど)をワーカースレッドで読み出し、読み出した行を少しずつ末尾に追加する
+        追加はchunkSize行かinterval秒ごとにまとめて行い、行数の更新もその単位で1回ずつ行う
+        onProgress(読み込み済み行数, 全体の行数またはNone)とonFinished(loader)はUIスレッドで呼ばれる
+        読み込み中に再度呼んだ場合や、setListなどでデータを差し替えた場合は、前の読み込みを中止する
+        データソースを表示中の場合、clearがTrueならデータソースの表示をやめて読み込む
+        """
+        if not clear:
+            self._checkWritable()
+        self.cancelLoading()
+        if clear:
+            self.clear()
+
+        def finished(loader):
+            if self._loader is loader:
+                self._loader = None
+            if onFinished is not None:
+                onFinished(loader)
+        self._loader = stream_loader.StreamLoader(iterable, self.extend, onProgress, finished, total, chunkSize, interval)
+        return self._loader.start()
+
+    def cancelLoading(self):
+        """loadAsyncによる読み込みを中止する。読み込み済みの行は残る"""
+        if self._loader is not None:
+            self._loader.cancel()
+            self._loader = None
+
+    def isLoading(self):
+        return self._loader is not None
+
+    def setDataSource(self, source, pageSize=data_source.DEFAULT_PAGE_SIZE, maxPages=data_source.DEFAULT_MAX_PAGES):
+        """
+        data_source.DataSourceを表示する。全件は読み込まず、表示に必要な行をページ単位で読み込む
+        保持するページ数はmaxPagesまで。データソースを表示中は、行の追加・変更・削除と、
+        全行を読む必要のある並べ替え・絞り込み・インクリメンタルサーチはできない。絞り込みと並び順は解除する
+        """
+        self._filter = None
+        self._filterText = None
+        self._sortColumns = []
+        self._showSortIndicator()
+        self.setStore(data_source.PagedRowStore(source, pageSize, maxPages))
+        self._prefetchVisible()
+
+    def isDataSource(self):
+        """データソースを表示中か"""
+        return isinstance(self._store, data_source.PagedRowStore)
+
+    def _checkWritable(self):
+        """行データを変更・走査する操作の前に呼ぶ。データソースを表示中ならRuntimeErrorを送出する"""
+        if self.isDataSource():
+            raise RuntimeError("this operation is not supported while a data source is set")
+
+    def reloadDataSource(self):
+        """表示中のデータソースの内容が変わった場合に呼ぶ"""
+        if not self.isDataSource():
+            raise RuntimeError("data source is not set")
+        self._store.reload()
+        self._refreshAll()
+        self._prefetchVisible()
+
+    def onCacheHint(self, event):
+        self._prefetchVisible(event.GetCacheFrom(), event.GetCacheTo())
+        event.Skip()
+
+    def _prefetchVisible(self, first=None, last=None):
+        """表示中の行と、その前後1ページ分を先読みするようストアに通知する"""
+        count = self._nativeCount()
+        if count == 0:
+            return
+        top = self.GetTopItem()
+        perPage = max(self.GetCountPerPage(), 1)
+        start = max(top - perPage, 0)
+        end = top + perPage * 2
+        if first is not None:
+            start = min(start, max(first, 0))
+            end = max(end, last)
+        end = min(end, count - 1)
+        self._store.prefetch(self.viewToModel(start), self.viewToModel(end))
+
+    def _refreshAll(self):
+        self._onRowsReset()
+        self._updateItemCount()
+        self._refreshRows(0, len(self._store) - 1)
+
+    #
+    # 行データの変更通知。mutationの前後で呼び、キャッシュや索引を更新する
+    #
+
+    def _onRowsAppended(self, oldLen):
+        self._rowsVersion += 1
+        self._sortKeyCache = {}
+        if self._keyIndex is not None:
+            self._keyIndex.appended(self._store, oldLen)
+        if self._filter is not None:
+            self._filter.appended(self._store, oldLen)
+        if self._isPrefixIndexValid():
+            column = self._getTypeAheadColumn()
+            self._prefixIndex.appended(oldLen, [self._getCellText(column, i) for i in range(oldLen, len(self._store))])
+
+    def _onRowsInserted(self, index):
+        self._rowsVersion += 1
+        self._sortKeyCache = {}
+        self._renderCache.invalidateFrom(index)
+        if self._keyIndex is not None:
+            self._keyIndex.invalidateFrom(index)
+        if self._filter is not None:
+            self._filter.inserted(self._store, index)
+        if self._isPrefixIndexValid():
+            self._prefixIndex.inserted(index, self._getCellText(self._getTypeAheadColumn(), index))
+
+    def _beforeRowsRemoved(self, indexes):
+        """indexesはnormalizeIndexesで正規化したもの"""
+        if self._keyIndex is not None:
+            if len(indexes) > len(self._store) // 2:
+                self._keyIndex.clear()
+            else:
+                for i in indexes:
+                    self._keyIndex.discard(self._store[i])
+
+    def _onRowsRemoved(self, indexes):
+        self._rowsVersion += 1
+        self._sortKeyCache = {}
+        self._renderCache.invalidateFrom(indexes[0])
+        if self._keyIndex is not None:
+            self._keyIndex.invalidateFrom(indexes[0])
+        if self._filter is not None:
+            self._filter.removed(indexes)
+        if self._isPrefixIndexValid():
+            self._prefixIndex.removed(indexes)
+
+    def _beforeRowChanged(self, index):
+        """行の内容を変更する前に呼び、戻り値を_onRowChangedに渡す"""
+        if self._keyIndex is not None:
+            return self._keyIndex.keyFunc(self._store[index])
+        return None
+
+    def _onRowChanged(self, index, token):
+        """行の内容を変更した後に呼ぶ。絞り込み中は表示位置がずれる場合があるため、再描画もここで行う"""
+        self._rowsVersion += 1
+        self._sortKeyCache = {}
+        self._renderCache.invalidateRow(index)
+        if self._keyIndex is not None:
+            self._keyIndex.replaced(index, token, self._store[index])
+        if self._isPrefixIndexValid():
+            self._prefixIndex.changed(index, self._getCellText(self._getTypeAheadColumn(), index))
+        if self._filter is not None:
+            oldCount = len(self._filter)
+            self._filter.changed(self._store, index)
+            if len(self._filter) != oldCount:
+                # 絞り込みの条件に合う・合わないが変わり、以降の行の表示位置がずれた
+                self._updateItemCount()
+                self._refreshRows(index, len(self._store) - 1)
+                return
+        self._refreshRows(index, index)
+
+    def _onRowsReset(self):
+        """全体が入れ替わった場合や、並び順が変わった場合に呼ぶ"""
+        self._rowsVersion += 1
+        self._sortKeyCache = {}
+        self._renderCache.clear()
+        if self._keyIndex is not None:
+            self._keyIndex.clear()
+        if self._filter is not None:
+            self._filter.build(self._store)
+        if self._prefixIndex is not None:
+            self._prefixIndex.clear()
+
+    def _onRowsReordered(self, order):
+        """行がorderの順に並べ替えられた後に呼ぶ。行の内容は変わっていない"""
+        self._rowsVersion += 1
+        self._sortKeyCache = {col: [keys[i] for i in order] for col, keys in self._sortKeyCache.items()}
+        self._renderCache.clear()
+        if self._keyIndex is not None:
+            self._keyIndex.clear()
+        if self._filter is not None:
+            self._filter.reordered(order)
+        if self._prefixIndex is not None:
+            self._prefixIndex.clear()
+
+    #
+    # 絞り込み
+    #
+
+    def _nativeCount(self):
+        """コントロールに表示する行数"""
+        return len(self._filter) if self._filter is not None else len(self._store)
+
+    def _nativeLowerBound(self, index):
+        """元データでindex行目以降にある最初の表示行の、コントロール上の行番号"""
+        return self._filter.lowerBound(index) if self._filter is not None else index
+
+    def viewToModel(self, item):
+        """コントロール上の行番号を、元データでの位置に変換する"""
+        if self._filter is None or item < 0:
+            return item
+        return self._filter[item]
+
+    def modelToView(self, index):
+        """元データでの位置を、コントロール上の行番号に変換する。表示されていない場合は-1"""
+        if self._filter is None:
+            return index
+        return self._filter.find(index)
+
+    def isFiltered(self):
+        return self._filter is not None
+
+    def getFilter(self):
+        return self._filter.predicate if self._filter is not None else None
+
+    def setFilter(self, predicate, narrow=False):
+        """
+        predicate(行)がTrueとなる行だけを表示する。Noneで解除
+        narrowをTrueにすると、現在表示している行だけを対象に絞り込む。新しい条件に合う行が、必ず現在の条件にも合う場合に使う
+        行データはコピーしない。フォーカスと選択は、表示され続ける行について維持する
+        データソースを表示中は、全行を読む必要があるため絞り込めない
+        """
+        if predicate is not None:
+            self._checkWritable()
+        self._filterText = None
+        selections = [self.viewToModel(i) for i in self.getItemSelections()]
+        focus = self.viewToModel(self.GetFocusedItem())
+        if predicate is None:
+            self._filter = None
+        elif narrow and self._filter is not None:
+            self._filter.narrow(self._store, predicate)
+        else:
+            view = filter_view.FilterView(predicate)
+            view.build(self._store)
+            self._filter = view
+        count = self._nativeCount()
+        # 選択状態を付け替えるため、行数はバッチ中でもその場で反映する
+        self._countChanged = False
+        super().SetItemCount(count)
+        if selections:
+            self.Select(-1, 0)
+            for i in selections:
+                item = self.modelToView(i)
+                if item >= 0:
+                    self.Select(item)
+        if focus >= 0 and count > 0:
+            self.Focus(min(self._nativeLowerBound(focus), count - 1))
+        self._refreshRows(0, len(self._store) - 1)
+
+    def setFilterText(self, text, columns=None):
+        """
+        columns(論理カラム番号のリスト。Noneで表示中の全カラム)の表示文字列に、textを含む行だけを表示する。大文字と小文字は区別しない
+        直前に指定した文字列を含む文字列に変わった場合は、現在表示している行だけを絞り込む
+        """
+        if not text:
+            self.setFilter(None)
+            return
+        text = text.casefold()
+        if columns is None:
+            columns = tuple(i for i in self.columns if i.wx_col >= 0)
+        else:
+            columns = tuple(self.getCol(col) for col in columns if self.getCol(col) is not None)
+        narrow = self._filterText is not None and self._filterText[1] == columns and self._filterText[0] in text
+        formatters = [(i, str if i.formatter is None else i.formatter) for i in columns]
+
+        def predicate(row):
+            # カラムの挿入・削除でフィールド番号が変わる場合があるため、その都度Columnから読む
+            for column, formatter in formatters:
+                field = column.field
+                value = row[field] if len(row) > field else ""
+                if text in formatter(value).casefold():
+                    return True
+            return False
+        self.setFilter(predicate, narrow=narrow)
+        self._filterText = (text, columns)
+
+    #
+    # インクリメンタルサーチ
+    #
+
+    def setTypeAhead(self, enable, col=None):
+        """
+        Trueにすると、文字の入力で表示文字列が前方一致する行に移動する。索引を使うため、行数が多くても遅くならない
+        colは検索対象の論理カラム番号。Noneで先頭に表示されているカラム
+        """
+        assert type(enable) == bool
+        self._typeAhead = enable
+        self._typeAheadCol = self.getCol(col) if col is not None else None
+        self._typeAheadText = ""
+        if self._prefixIndex is not None:
+            self._prefixIndex.clear()
+
+    def _getTypeAheadColumn(self):
+        if self._typeAheadCol is not None:
+            return self._typeAheadCol
+        return self._wxColumns[0] if self._wxColumns else None
+
+    def _isPrefixIndexValid(self):
+        return self._prefixIndex is not None and self._prefixIndex.valid
+
+    def _getCellText(self, column, index):
+        value = self._store.getCell(index, column.field)
+        return str(value) if column.formatter is None else column.formatter(value)
+
+    def OnFindItem(self, start, text):
+        """
+        表示文字列がtextで始まる行を、コントロール上のstart行目から探してコントロール上の行番号を返す
+        末尾まで見つからなければ先頭から探す。見つからない場合は-1。大文字と小文字は区別しない
+        """
+        column = self._getTypeAheadColumn()
+        count = self._nativeCount()
+        if column is None or count == 0 or self.isDataSource():
+            # データソースの場合は、索引の作成に全行の読み込みが必要になるため検索しない
+            return -1
+        if self._prefixIndex is None:
+            self._prefixIndex = prefix_index.PrefixIndex()
+        if not self._prefixIndex.valid:
+            formatter = str if column.formatter is None else column.formatter
+            self._prefixIndex.build(map(formatter, self._store.getColumnValues(column.field)))
+        start = self.viewToModel(start) if 0 <= start < count else 0
+        visible = None if self._filter is None else (lambda i: self._filter.find(i) >= 0)
+        index = self._prefixIndex.find(text, start, visible)
+        return self.modelToView(index) if index >= 0 else -1
+
+    def onChar(self, event):
+        key = event.GetUnicodeKey()
+        if not self._typeAhead or self.isDataSource() or key == wx.WXK_NONE or key < 32 or event.HasModifiers():
+            event.Skip()
+            return
+        now = time.monotonic()
+        if now - self._typeAheadTime > TYPE_AHEAD_TIMEOUT:
+            self._typeAheadText = ""
+        ch = chr(key)
+        if ch == " " and not self._typeAheadText:
+            # 入力の途中でなければ、スペースキーは通常の動作に任せる
+            event.Skip()
+            return
+        self._typeAheadTime = now
+        self._typeAheadText += ch
+        focus = self.GetFocusedItem()
+        if len(set(self._typeAheadText.casefold())) == 1:
+            # 同じ文字の繰り返しは、その文字で始まる次の行に移動する
+            item = self.OnFindItem(focus + 1, ch)
+        else:
+            item = self.OnFindItem(max(focus, 0), self._typeAheadText)
+        if item >= 0 and item != focus:
+            self.Select(-1, 0)
+            self.Select(item)
+            self.Focus(item)
+
+    #
+    # キーによる行の特定
+    #
+
+    def setKeyFunction(self, keyFunc):
+        """
+        行からキー(IDなど)を求める関数を設定する。キーは行ごとに一意である必要がある
+        設定すると、キーによる検索や、変更後の選択・フォーカスの復元が索引を使って行われる。Noneで解除
+        """
+        self._keyIndex = key_index.KeyIndex(keyFunc) if keyFunc is not None else None
+
+    def getKeyFunction(self):
+        return self._keyIndex.keyFunc if self._keyIndex is not None else None
+
+    def rebuildKeyIndex(self):
+        """lst を直接書き換えた場合などに、キーの索引を作り直す"""
+        if self._keyIndex is not None:
+            self._keyIndex.clear()
+
+    def indexOfKey(self, key):
+        """keyを持つ行の位置を返す。見つからない場合は-1"""
+        if self._keyIndex is None:
+            raise RuntimeError("key function is not set")
+        return self._keyIndex.find(self._store, key)
+
+    def getByKey(self, key, default=None):
+        index = self.indexOfKey(key)
+        if index < 0:
+            return default
+        return self._store[index]
+
+    def updateByKey(self, key, value):
+        """keyを持つ行をvalueに置き換える"""
+        index = self.indexOfKey(key)
+        if index < 0:
+            raise KeyError(key)
+        self[index] = value
+        return index
+
+    def removeByKey(self, key):
+        """keyを持つ行を削除して返す"""
+        index = self.indexOfKey(key)
+        if index < 0:
+            raise KeyError(key)
+        return self.pop(index)
+
+    def _findRow(self, row):
+        """
+        rowと等しい行の位置を返す。見つからない場合は-1
+        キーが設定されていれば、索引で見つけた行がrowと等しい場合にその位置を返す。等しくなければ先頭から探す
+        """
+        if self._keyIndex is not None:
+            index = self._keyIndex.find(self._store, self._keyIndex.keyFunc(row))
+            if index >= 0 and self._store[index] == row:
+                return index
+        try:
+            return self._store.index(row)
+        except ValueError:
+            return -1
 
     #
     #    listCtrl互換
     #
+    # 行番号はコントロール上のもの。絞り込み中は元データでの位置とは異なる
+
     def Append(self, object):
         self.append(object)
-        return self.GetItemCount() - 1
+        return self.modelToView(len(self._store) - 1)
 
     def InsertItem(self, index, label=None):
         if label is None or type(label) != str:
             raise NotImplementedError
-        return self.insert(index, [label])
+        if 0 <= index < self._nativeCount():
+            index = self.viewToModel(index)
+        elif index >= self._nativeCount():
+            index = len(self._store)
+        column = self.getCol(0)
+        field = column.field if column is not None else 0
+        row = [""] * (field + 1)
+        row[field] = label
+        return self.modelToView(self.insert(index, row))
 
     def SetItem(self, index, column=0, label=None, imageId=-1):
         if type(index) != int or label is None or type(label) != str or imageId != -1:
             raise NotImplementedError
-        if column < 0:
+        if column < 0 or self.getCol(column) is None:
             raise ValueError
-        obj = self.lst[index]
-        while (len(obj) <= column):
-            obj.append("")
-        obj[column] = label
-        self.RefreshItem(index)
+        self._checkWritable()
+        index = self.viewToModel(index)
+        token = self._beforeRowChanged(index)
+        self._store.setCell(index, self.getCol(column).field, label)
+        self._onRowChanged(index, token)
         return True
 
     def DeleteAllItems(self):
-        self.lst = []
+        self.cancelLoading()
+        self._store = self._store.createEmpty()
+        self._onRowsReset()
+        self._dirtyRanges.clear()
+        self._countChanged = False
         return super().DeleteAllItems()
 
     def DeleteItem(self, index):
-        self.pop(index)
+        self.pop(self.viewToModel(index))
         return True
 
     def GetItemBackgroundColour(self, index, colour):
@@ -87,15 +775,55 @@ class virtualListCtrl(listctrl.listCtrl):
     #
 
     def OnGetItemText(self, item, column):
-        tmp = self.getColFromWx(column)
-        column = tmp.col
-        obj = self.lst[item]
-        if len(obj) <= column:
-            return ""
-        return str(obj[column])  # イテレーション可能なオブジェクト
+        # 描画のたびに呼ばれるため、変換表とキャッシュで処理を最小限にする
+        col = self._wxColumns[column]
+        if self._filter is not None:
+            item = self._filter[item]
+        cells = self._renderCache.row(item)
+        text = cells.get(col)
+        if text is None:
+            value = self._store.getCell(item, col.field)
+            text = str(value) if col.formatter is None else col.formatter(value)
+            cells[col] = text
+        return text
 
     def OnGetItemAttr(self, item):
-        return None
+        if self._attrProvider is None:
+            return None
+        if self._filter is not None:
+            item = self._filter[item]
+        cells = self._renderCache.row(item)
+        if _ATTR_CELL in cells:
+            key = cells[_ATTR_CELL]
+        else:
+            key = cells[_ATTR_CELL] = self._attrProvider(self._store[item])
+        return self._attrCache.get(key)
+
+    def setAttrProvider(self, provider):
+        """
+        provider(行)が返すスタイル名で行を装飾する。Noneを返した行と、provider自体がNoneの場合は装飾しない
+        スタイルはdefineRowStyleで定義する。"error", "warning", "disabled", "highlight" は定義済み
+        """
+        self._attrProvider = provider
+        self._renderCache.clear()
+        self._refreshRows(0, len(self._store) - 1)
+
+    def getAttrProvider(self):
+        return self._attrProvider
+
+    def defineRowStyle(self, key, white, dark=None):
+        """
+        スタイルkeyを定義する。white,darkはそれぞれホワイト・ダークモードでの (文字色, 背景色)
+        色は"#rrggbb"などwx.Colourで解釈できる文字列で、Noneは既定の色。darkを省略するとwhiteと同じ
+        """
+        self._attrCache.defineStyle(key, white, dark)
+        self._refreshRows(0, len(self._store) - 1)
+
+    def setDarkMode(self, dark):
+        """行のスタイルに使う色を、ダークモード用に切り替える"""
+        assert type(dark) == bool
+        self._attrCache.setDark(dark)
+        self._refreshRows(0, len(self._store) - 1)
 
     def OnGetItemImage(self, item):
         return -1
@@ -103,8 +831,16 @@ class virtualListCtrl(listctrl.listCtrl):
     def onLabelEditEnd(self, event):
         if wx.wxEVT_LIST_END_LABEL_EDIT in self.bindFunctions:
             self.bindFunctions[wx.wxEVT_LIST_END_LABEL_EDIT](event)
-        if (not event.IsEditCancelled()) and event.IsAllowed():
-            self.lst[self.GetFocusedItem()][self.getColFromWx(0).col] = self.GetEditControl().GetLineText(0)
+        if (not event.IsEditCancelled()) and event.IsAllowed() and not self.isDataSource():
+            index = self.viewToModel(self.GetFocusedItem())
+            token = self._beforeRowChanged(index)
+            try:
+                self._store.setCell(index, self.getColFromWx(0).field, self.GetEditControl().GetLineText(0))
+            except ValueError:
+                # 数値の列に数値でない文字列が入力された場合など
+                event.Veto()
+                return
+            self._onRowChanged(index, token)
 
     def onColumnDragEnd(self, event):
         event.SetColumn(self.getColFromWx(event.GetColumn()).col)
@@ -114,93 +850,353 @@ class virtualListCtrl(listctrl.listCtrl):
             self.getCol(event.GetColumn()).width = super().GetColumnWidth(self.getCol(event.GetColumn()).wx_col)
 
     #
-    # 非対応関数
+    # 並べ替え
     #
+
     def SortItems(self, fnSortCallBack):
-        raise NotImplementedError
+        """fnSortCallBack(行1, 行2)の比較結果で並べ替える。wx標準と異なり、アイテムデータではなく行が渡される"""
+        self.sort(key=functools.cmp_to_key(fnSortCallBack))
+        return True
+
+    def setSortOnColumnClick(self, v):
+        """Trueにすると、カラムのクリックで並べ替える。Shiftを押しながらのクリックで第2キー以降を追加する"""
+        assert type(v) == bool
+        self._sortOnColumnClick = v
+
+    def setColumnSortKey(self, col, func):
+        """colの値から並べ替えキーを求める関数を設定する。Noneを指定すると値そのものを使う"""
+        column = self.getCol(col)
+        column.sortKey = func
+        self._sortKeyCache.pop(column, None)
+
+    def getSortColumns(self):
+        """現在の並び順を [(論理カラム番号, 昇順か), ...] で返す"""
+        return [(column.col, ascending) for column, ascending in self._sortColumns]
+
+    def isSorting(self):
+        """バックグラウンドでの並べ替え中か"""
+        return self._sortThread is not None
+
+    def sortByColumns(self, columns, background=None):
+        """
+        columns [(論理カラム番号, 昇順か), ...] の順に優先して、安定な並べ替えを行う
+        backgroundがNoneの場合、BACKGROUND_SORT_THRESHOLD行以上ならキーの抽出と並べ替えをバックグラウンドで行い、完了後に反映する
+        """
+        if any(self.getCol(col) is None for col, ascending in columns):
+            raise ValueError
+        self._checkWritable()
+        columns = [(self.getCol(col), bool(ascending)) for col, ascending in columns]
+        if background is None:
+            background = len(self._store) >= BACKGROUND_SORT_THRESHOLD
+        if not background:
+            # 並べ替えキーの抽出に失敗した場合は、並び順の表示を変えない
+            order, keys = self._computeSortOrder(columns, self._sortKeyCache)
+            self._sortThread = None  # バックグラウンドで並べ替え中の結果は使わない
+            self._sortColumns = columns
+            self._showSortIndicator()
+            self._applySortOrder(order, keys)
+            return
+        self._sortColumns = columns
+        self._showSortIndicator()
+        version = self._rowsVersion
+        self._sortThread = threading.Thread(target=self._sortWorker, args=(columns, version, self._sortKeyCache), daemon=True)
+        self._sortThread.start()
+
+    def _sortWorker(self, columns, version, keyCache):
+        thread = threading.current_thread()
+        order = keys = error = None
+        try:
+            order, keys = self._computeSortOrder(columns, keyCache)
+        except Exception as e:
+            error = e
+        finally:
+            # 失敗した場合も、UIスレッドで並べ替え中の状態を解除して例外を伝える
+            wx.CallAfter(self._onSortFinished, thread, columns, version, order, keys, error)
+
+    def _onSortFinished(self, thread, columns, version, order, keys, error=None):
+        if self._sortThread is not thread:
+            # 後から別の並べ替えが行われた
+            return
+        self._sortThread = None
+        if columns != self._sortColumns:
+            # 並び順が解除・変更された
+            return
+        if error is not None:
+            self._sortColumns = []
+            self._showSortIndicator()
+            raise error
+        if version != self._rowsVersion:
+            # 並べ替え中に行が変更されたので、やり直す
+            self.sortByColumns(self.getSortColumns(), background=True)
+            return
+        self._applySortOrder(order, keys)
+
+    def _computeSortOrder(self, columns, keyCache):
+        """並べ替え後の順序と、使用した並べ替えキーを返す。UIスレッド以外からも呼ばれる"""
+        keys = {}
+        for column, ascending in columns:
+            if column in keyCache:
+                keys[column] = keyCache[column]
+                continue
+            values = self._store.getColumnValues(column.field)
+            func = column.sortKey
+            keys[column] = values if func is None else [func(v) for v in values]
+        order = list(range(len(self._store)))
+        # 優先度の低いカラムから順に安定ソートを重ねる
+        for column, ascending in reversed(columns):
+            try:
+                order.sort(key=keys[column].__getitem__, reverse=not ascending)
+            except TypeError:
+                # 型の混在した値は文字列として比較する
+                keys[column] = [str(v) for v in keys[column]]
+                order.sort(key=keys[column].__getitem__, reverse=not ascending)
+        return order, keys
+
+    def _applySortOrder(self, order, keys=None):
+        """行をorderの順に並べ替え、フォーカスと選択を同じ行に保つ"""
+        if len(order) != len(self._store):
+            return
+        selections = [self.viewToModel(i) for i in self.getItemSelections()]
+        focus = self.viewToModel(self.GetFocusedItem())
+        self._sortKeyCache = keys if keys is not None else {}
+        self._store.permute(order)
+        self._onRowsReordered(order)
+
+        wanted = selections + [focus] if focus >= 0 else selections
+        if len(wanted) > 0:
+            if len(wanted) <= 8:
+                newPos = {i: order.index(i) for i in wanted}
+            else:
+                newPos = [0] * len(order)
+                for p, old in enumerate(order):
+                    newPos[old] = p
+            # 並べ替えで表示・非表示は変わらない
+            if selections:
+                self.Select(-1, 0)
+                for i in selections:
+                    self.Select(self.modelToView(newPos[i]))
+            if focus >= 0:
+                self.Focus(self.modelToView(newPos[focus]))
+        self._refreshRows(0, len(self._store) - 1)
+
+    def _showSortIndicator(self):
+        if not self._sortColumns:
+            super().RemoveSortIndicator()
+            return
+        column, ascending = self._sortColumns[0]
+        if column.wx_col >= 0:
+            super().ShowSortIndicator(column.wx_col, ascending)
+
+    def onColumnClick(self, event):
+        column = self.getColFromWx(event.GetColumn())
+        if column is None:
+            # 最後のカラムより右側の、カラムのない部分がクリックされた
+            event.Skip()
+            return
+        event.SetColumn(column.col)
+        if wx.wxEVT_LIST_COL_CLICK in self.bindFunctions:
+            self.bindFunctions[wx.wxEVT_LIST_COL_CLICK](event)
+        if not self._sortOnColumnClick or not event.IsAllowed() or self.isDataSource():
+            # 並べ替えない場合は、wx標準の処理に任せる
+            event.Skip()
+            return
+        col = event.GetColumn()
+        columns = self.getSortColumns()
+        cols = [c for c, ascending in columns]
+        if wx.GetKeyState(wx.WXK_SHIFT) and columns:
+            # 第2キー以降として追加、または昇順・降順を切り替える
+            if col in cols:
+                i = cols.index(col)
+                columns[i] = (col, not columns[i][1])
+            else:
+                columns.append((col, True))
+        elif cols and cols[0] == col:
+            columns[0] = (col, not columns[0][1])
+        else:
+            columns = [(col, True)]
+        self.sortByColumns(columns)
 
     #
     # リスト部分
     #
 
     def append(self, object):
-        self.lst.append(object)
-        super().SetItemCount(len(self.lst))
-        self.RefreshItem(len(self.lst) - 1)
+        self._checkWritable()
+        self._store.append(object)
+        self._onRowsAppended(len(self._store) - 1)
+        self._updateItemCount()
+        self._refreshRows(len(self._store) - 1, len(self._store) - 1)
 
     def clear(self):
-        self.lst.clear()
-        super().SetItemCount(0)
+        if self.isDataSource():
+            # データソースの行は削除できないため、表示をやめて空のリストにする
+            self._store = self._store.createEmpty()
+        else:
+            self._store.clear()
+        self._onRowsReset()
+        self._updateItemCount()
 
     def copy(self):
-        return self.lst.copy()
+        return self._store.copy()
 
     def count(self, value):
-        return self.lst.count(value)
+        return self._store.count(value)
 
     def extend(self, iterable):
-        self.lst.extend(iterable)
-        newLen = len(self.lst)
-        super().SetItemCount(newLen)
-        if len(iterable) > 0:
-            self.RefreshItems(newLen - len(iterable), newLen - 1)
+        self._checkWritable()
+        oldLen = len(self._store)
+        self._store.extend(iterable)
+        newLen = len(self._store)
+        if oldLen < newLen:
+            self._onRowsAppended(oldLen)
+            self._updateItemCount()
+            self._refreshRows(oldLen, newLen - 1)
 
     def index(self, *pArg, **kArg):
-        return self.lst.index(*pArg, *kArg)
+        if self._keyIndex is not None and len(pArg) == 1 and not kArg:
+            index = self._findRow(pArg[0])
+            if index < 0:
+                raise ValueError("%r is not in list" % (pArg[0],))
+            return index
+        return self._store.index(*pArg, **kArg)
 
     def insert(self, index, object):
-        self.lst.insert(index, object)
-        super().SetItemCount(len(self.lst))
-        self.RefreshItems(index, len(self.lst) - 1)
+        self._checkWritable()
+        if index < 0:
+            index = max(0, index + len(self._store))
+        index = min(index, len(self._store))
+        self._store.insert(index, object)
+        self._onRowsInserted(index)
+        self._updateItemCount()
+        self._refreshRows(index, len(self._store) - 1)
         return index
 
-    def pop(self, index):
-        l = self.GetSelectedItems()
-        super().DeleteItem(index)
-        ret = self.lst.pop(index)
-        self.RefreshItems(index, len(self.lst) - 1)
+    def pop(self, index=-1):
+        self._checkWritable()
+        if index < 0:
+            index += len(self._store)
+        self._beforeRowsRemoved([index])
+        self._deleteNativeItem(index)
+        ret = self._store.pop(index)
+        self._onRowsRemoved([index])
+        self._refreshRows(index, len(self._store) - 1)
         return ret
 
     def remove(self, value):
-        index = self.lst.index(value)
+        self._checkWritable()
+        index = self.index(value)
         l = self.GetSelectedItems()
-        self.lst.remove(value)
-        super().DeleteItem(index)
-        self.RefreshItems(index, len(self.lst) - 1)
+        self._beforeRowsRemoved([index])
+        self._deleteNativeItem(index)
+        self._store.pop(index)
+        self._onRowsRemoved([index])
+        self._refreshRows(index, len(self._store) - 1)
         self.__setSelectionFromList(l)
 
-    def reverse(self):
-        self.lst.reverse()
-        self.RefreshItems(0, len(self.lst) - 1)
+    def deleteItems(self, indexes):
+        """
+        indexes(int, slice, range, インデックスの列)で指定した行をまとめて削除する
+        フォーカス・選択・表示位置は、削除されなかった行に追従させる
+        """
+        self._checkWritable()
+        deleted = row_store.normalizeIndexes(indexes, len(self._store))
+        if len(deleted) == 0:
+            return
+        first = deleted[0]
+        nativeFirst = self._nativeLowerBound(first)
+        if self._filter is None:
+            deletedItems = deleted
+        else:
+            # 表示されている行だけが、コントロール上の行を詰める
+            deletedItems = [i for i in map(self._filter.find, deleted) if i >= 0]
+        # 選択範囲ごとに、前と内側で削除される行の数だけ詰める
+        selections = []
+        for start, stop in self._selection.ranges():
+            start, stop = row_store.remapIndex(start, deletedItems)[0], row_store.remapIndex(stop, deletedItems)[0]
+            if selections and selections[-1][1] >= start:
+                start = selections.pop()[0]
+            if start < stop:
+                selections.append((start, stop))
+        focus = self.GetFocusedItem()
+        focus = self.viewToModel(focus) if focus >= nativeFirst else -1
+        top = self.GetTopItem()
+        top = self.viewToModel(top) if top >= nativeFirst else -1
+
+        self._beforeRowsRemoved(deleted)
+        self._store.deleteIndexes(deleted)
+        self._onRowsRemoved(deleted)
+        newCount = self._nativeCount()
+        # 選択状態を付け替えるため、行数はバッチ中でもその場で反映する
+        self._countChanged = False
+        super().SetItemCount(newCount)
+
+        # ネイティブのコントロールは同じ行番号の選択を保っているため、変わる項目だけを選択・解除する
+        self._replaceSelection(selections)
+        if newCount > 0:
+            if focus >= 0:
+                # Focus()は表示位置を動かすため、状態だけを設定する
+                item = min(self._nativeLowerBound(row_store.remapIndex(focus, deleted)[0]), newCount - 1)
+                self.SetItemState(item, wx.LIST_STATE_FOCUSED, wx.LIST_STATE_FOCUSED)
+            if top >= 0:
+                self._scrollToTop(min(self._nativeLowerBound(row_store.remapIndex(top, deleted)[0]), newCount - 1))
+        self._refreshRows(first, len(self._store) - 1)
+
+    def _replaceSelection(self, ranges):
+        """選択状態をranges [(start, stop), ...] にする。現在の選択状態と異なる項目だけをコントロールに反映する"""
+        current = self._selection.ranges()
+        if current == ranges:
+            return
+        if not ranges:
+            self.Select(-1, 0)
+            return
+        if ranges == [(0, self._nativeCount())]:
+            self.Select(-1)
+            return
+        for start, stop in range_set.subtractRanges(current, ranges):
+            for i in range(start, stop):
+                self.Select(i, 0)
+        for start, stop in range_set.subtractRanges(ranges, current):
+            self.selectRange(start, stop - 1)
 
-    def sort(self):
-        self.lst.sort()
-        self.RefreshItems(0, len(self.lst) - 1)
+    def reverse(self):
+        self._checkWritable()
+        self._store.reverse()
+        self._onRowsReset()
+        self._refreshRows(0, len(self._store) - 1)
+
+    def sort(self, key=None, reverse=False):
+        self._checkWritable()
+        rows = self._store.asList()
+        keys = rows if key is None else [key(i) for i in rows]
+        order = sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse)
+        self._sortColumns = []
+        self._showSortIndicator()
+        self._applySortOrder(order)
 
     #
     # 拡張比較
     #
 
     def __lt__(self, other):
-        return self.lst.__lt__(other)
+        return self._store.asList().__lt__(other)
 
     def __le__(self, other):
-        return self.lst.__le__(other)
+        return self._store.asList().__le__(other)
 
     def __eq__(self, other):
-        return self.lst.__eq__(other)
+        return self._store.asList().__eq__(other)
 
     def __ne__(self, other):
-        return self.lst.__ne__(other)
+        return self._store.asList().__ne__(other)
 
     def __gt__(self, other):
-        return self.lst.__gt__(other)
+        return self._store.asList().__gt__(other)
 
     def __ge__(self, other):
-        return self.lst.__ge__(other)
+        return self._store.asList().__ge__(other)
 
     def __hash__(self):
-        return self.lst.__hash__()
+        return self._store.asList().__hash__()
 
     # to do
     # def __init_subclass(cls):
@@ -208,151 +1204,156 @@ class virtualListCtrl(listctrl.listCtrl):
     #
 
     def __len__(self):
-        return self.lst.__len__()
+        return self._store.__len__()
 
     def __mul__(self, other):
-        return self.lst.__mul__(other)
+        return self._store.asList().__mul__(other)
 
     def __getitem__(self, key):
-        return self.lst.__getitem__(key)
+        return self._store.__getitem__(key)
 
     def __setitem__(self, key, value):
-        self.lst.__setitem__(key, value)
-        self.RefreshItem(key)
+        self._checkWritable()
+        oldLen = len(self._store)
+        if type(key) == slice:
+            self._store.__setitem__(key, value)
+            # 行数が変わる場合がある
+            if len(self._store) != oldLen:
+                self._updateItemCount()
+            self._onRowsReset()
+            self._refreshRows(key.indices(oldLen)[0], len(self._store) - 1)
+        else:
+            if key < 0:
+                key += oldLen
+            token = self._beforeRowChanged(key)
+            self._store.__setitem__(key, value)
+            self._onRowChanged(key, token)
 
     def __delitem__(self, key):
-        if len(self.lst[key]) >= 500:  # 大量処理の高速化
-            self.Show(False)
-            l = self.GetSelectedItems()
-            previousL = self.lst[0:self.GetFirstSelected() + 1]
-            fId = self.GetFocusedItem()
-            if self.GetFocusedItem() >= 0:
-                f = self.lst[self.GetFocusedItem()]
-            else:
-                f = None
-            top = self.GetTopItem()
-            self.Focus(0)
-            self.lst.__delitem__(key)
-            super().SetItemCount(len(self.lst))
-            self.RefreshItems(0, len(self.lst) - 1)
-            self.__setFocus(f, fId, top, l, previousL)
-            self.__setSelectionFromList(l)
-            self.Show()
-            self.SetFocus()
-        elif type(key) == int:
-            super().DeleteItem(key)
-            self.lst.pop(key)
-            self.RefreshItems(0, len(self.lst) - 1)
+        if type(key) == int:
+            self.pop(key)
         else:
-            l = self.GetSelectedItems()
-            previousL = self.lst[0:self.GetFirstSelected() + 1]
-            fId = self.GetFocusedItem()
-            if self.GetFocusedItem() >= 0:
-                f = self.lst[self.GetFocusedItem()]
-            else:
-                f = None
-            top = self.GetTopItem()
-            self.Focus(0)
-            for o in reversed(self.lst[key]):
-                i = self.lst.index(o)
-                super().DeleteItem(i)
-                self.lst.pop(i)
-            self.RefreshItems(0, len(self.lst) - 1)
-            self.__setFocus(f, fId, top, l, previousL)
-            self.__setSelectionFromList(l)
+            self.deleteItems(key)
 
     def __iter__(self):
-        return self.lst.__iter__()
+        return self._store.__iter__()
 
     def __reversed__(self):
-        return self.lst.__reversed__()
+        return self._store.__reversed__()
 
     def __contains__(self, item):
-        return self.lst.__contains__(item)
+        return self._store.__contains__(item)
 
     # 数値型エミュレート
 
     def __add__(self, value):
-        self.lst.__add__(value)
+        self._store.asList().__add__(value)
         return self
 
     def __rmul__(self, other):
-        self.lst.__rmul__(other)
+        self._store.asList().__rmul__(other)
         return self
 
     def __iadd__(self, other):
-        oldLen = len(self.lst)
-        self.lst.__iadd__(other)
-        newLen = len(self.lst)
-        super().SetItemCount(newLen)
+        self._checkWritable()
+        oldLen = len(self._store)
+        self._store.__iadd__(other)
+        newLen = len(self._store)
+        self._onRowsAppended(oldLen)
+        self._updateItemCount()
         if oldLen < newLen:
-            self.RefreshItems(oldLen, newLen - 1)
+            self._refreshRows(oldLen, newLen - 1)
         return self
 
     def __imul__(self, other):
-        oldLen = len(self.lst)
-        self.lst.__imul__(other)
-        newLen = len(self.lst)
-        super().SetItemCount(newLen)
+        self._checkWritable()
+        oldLen = len(self._store)
+        if other <= 0:
+            self._store.clear()
+            self._onRowsReset()
+        else:
+            self._store.extend(self._store.copy() * (other - 1))
+            self._onRowsAppended(oldLen)
+        newLen = len(self._store)
+        self._updateItemCount()
         if oldLen < newLen:
-            self.RefreshItems(oldLen, newLen - 1)
+            self._refreshRows(oldLen, newLen - 1)
         return self
 
     def GetSelectedItems(self):
-        s = self.GetFirstSelected()
-        if s < 0:
+        if not self._selection:
             return None
-        else:
-            ret = [self.lst[s]]
-            while True:
-                s = self.GetNextSelected(s)
-                if s < 0:
-                    break
-                else:
-                    ret.append(self.lst[s])
-            return ret
+        if self._filter is None:
+            return [self._store[i] for i in self._selection]
+        return [self._store[self._filter[i]] for i in self._selection]
 
     def __setSelectionFromList(self, lst):
+        if lst is None:
+            # 変更前に何も選択されていなかった
+            return
         self.Select(-1, 0)
         for t in lst:
-            if t in self.lst:
-                self.Select(self.lst.index(t))
+            index = self._findRow(t)
+            if index >= 0:
+                index = self.modelToView(index)
+            if index >= 0:
+                self.Select(index)
         if self.GetSelectedItemCount() == 0:
             self.Select(0)
 
-    def __setFocus(self, obj, fId, topItem, selection, previousL):
-        """ フォーカス更新（オブジェクト, フォーカスID, トップID, 選択リスト、選択領域直前までのリスト）"""
-        self.Focus(0)
-        if obj in self.lst:
-            self.Focus(self.lst.index(obj))
-        else:
-            for o in reversed(previousL):
-                if o in self.lst:
-                    self.Focus(self.lst.index(o))
-                    break
-        if self.GetFocusedItem() == len(self.lst) - 1:
-            newFocus = self.GetFocusedItem()
-        else:
-            newFocus = self.GetFocusedItem() + 1
-        newTop = topItem - (fId - newFocus) + self.GetCountPerPage() - 1
-        if newTop >= len(self.lst):
-            self.Focus(len(self.lst) - 1)
-        else:
-            self.Focus(newTop)
-        self.Focus(newFocus)
+    #
+    #    書き出し
+    #
+
+    def _getExportColumns(self):
+        return [self.getCol(i) for i in self.GetColumnsOrder()]
+
+    def _getExportHeader(self, columns):
+        return [i.heading for i in columns]
+
+    def _iterExportRows(self, columns, items):
+        # 行はワーカースレッドから読み出されるため、コントロールには触れず、ストアから直接読んで表示文字列に変換する
+        cells = [(i.field, str if i.formatter is None else i.formatter) for i in columns]
+        store = self._store
+        filter = self._filter
+        version = self._rowsVersion
+
+        def rows():
+            for item in items:
+                if self._rowsVersion != version:
+                    raise RuntimeError("rows were changed during export")
+                index = item if filter is None else filter[item]
+                yield [formatter(store.getCell(index, field)) for field, formatter in cells]
+        return rows()
+
+    def _canExportInThread(self):
+        # データソースのページの読み込みはUIスレッドで行う
+        return not self.isDataSource()
 
     #
     #    カラムの操作
     #
     def DeleteAllColumns(self):
+        for i in self.columns:
+            self._forgetColumn(i)
         self.columns = []
+        self._fieldCount = 0
+        self._updateColumnTable()
         super().DeleteAllColumns()
 
+    def _updateColumnTable(self):
+        """カラム番号の変換表を作り直す。カラムの構成を変更したら必ず呼ぶ"""
+        table = [None] * (max([i.wx_col for i in self.columns], default=-1) + 1)
+        for i in self.columns:
+            if i.wx_col >= 0:
+                table[i.wx_col] = i
+        self._wxColumns = table
+        self._columnsByCol = {i.col: i for i in self.columns}
+        if self._prefixIndex is not None:
+            self._prefixIndex.clear()
+
     def getCol(self, col):
-        tmp = [i for i in self.columns if i.col == col]
-        if len(tmp) == 0:
-            return
-        return tmp[0]
+        return self._columnsByCol.get(col)
 
     # 表示・非表示に関わらず、追加されているカラム数を返す
     def GetColumnCount(self):
@@ -367,10 +1368,20 @@ class virtualListCtrl(listctrl.listCtrl):
         return ret
 
     def getColFromWx(self, wx_col):
-        tmp = [i for i in self.columns if i.wx_col == wx_col]
-        if len(tmp) == 0:
-            return
-        return tmp[0]
+        if 0 <= wx_col < len(self._wxColumns):
+            return self._wxColumns[wx_col]
+        return None
+
+    def setColumnFormatter(self, col, formatter):
+        """colの値を表示用文字列に変換する関数を設定する。Noneを指定するとstr()で変換する"""
+        self.getCol(col).formatter = formatter
+        if self._prefixIndex is not None:
+            self._prefixIndex.clear()
+        self._renderCache.clear()
+        self._refreshRows(0, len(self._store) - 1)
+
+    def getColumnFormatter(self, col):
+        return self.getCol(col).formatter
 
     def isPrintColumn(self):
         return self.printColumn
@@ -381,27 +1392,93 @@ class virtualListCtrl(listctrl.listCtrl):
 
     # todo: loadColumnInfo and saveColumnInfo
 
-    def AppendColumn(self, heading, format=wx.LIST_FORMAT_LEFT, width=-1):
+    def setFieldMapping(self, v):
+        """
+        Trueにすると、カラムの挿入・削除で行データを書き換えない。各カラムは割り当てられたフィールドを表示し続けるため、カラム数に比例する時間で済む
+        Falseにすると、カラムの挿入・削除に合わせて全行のフィールドを挿入・削除する。行数に比例する時間がかかる
+        None(既定)の場合は、呼び出し元が行のリストを直接扱うlist of lists形式のストアならFalse、それ以外のストアならTrueとして扱う
+        """
+        assert v is None or type(v) == bool
+        self._fieldMapping = v
+
+    def isFieldMapping(self):
+        """カラムの挿入・削除で行データを書き換えないか。setFieldMapping(None)の場合は、現在のストアに応じた値を返す"""
+        if self._fieldMapping is None:
+            return type(self._store) is not row_store.ListRowStore
+        return self._fieldMapping
+
+    def _rewritesRows(self):
+        """カラムの挿入・削除で行データを書き換えるか。データソースの行は書き換えられない"""
+        return not self.isFieldMapping() and not self.isDataSource()
+
+    def _allocateField(self, field):
+        """新しいカラムのフィールド番号を返す。Noneなら、まだどのカラムにも割り当てていない番号を割り当てる"""
+        if field is None:
+            field = self._fieldCount
+        self._fieldCount = max(self._fieldCount, field + 1)
+        return field
+
+    def _insertField(self, field):
+        """全行のfield番目に空のフィールドを挿入し、以降のフィールドを表示するカラムをずらす"""
+        self._store.insertColumn(field, "")
+        for i in self.columns:
+            if i.field >= field:
+                i.field += 1
+        self._fieldCount = max(self._fieldCount, field) + 1
+        self._onFieldsChanged()
+
+    def _deleteField(self, field):
+        """全行からfield番目のフィールドを削除し、以降のフィールドを表示するカラムをずらす"""
+        self._store.deleteColumn(field)
+        for i in self.columns:
+            if i.field > field:
+                i.field -= 1
+        self._fieldCount = max(self._fieldCount - 1, 0)
+        self._onFieldsChanged()
+
+    def _onFieldsChanged(self):
+        self._rowsVersion += 1
+        self._renderCache.clear()
+        if self._keyIndex is not None:
+            self._keyIndex.clear()
+
+    def getColumnField(self, col):
+        """colが表示する、行データ内の位置(フィールド番号)を返す"""
+        return self.getCol(col).field
+
+    # fieldを指定すると、既存のフィールドを表示するカラムを作成できる。その場合、行データは書き換えない
+    # 指定しない場合、list of lists形式のストアではカラムの位置に空のフィールドを挿入し、削除時はそのフィールドも削除する
+    # それ以外のストアやsetFieldMapping(True)の場合は、まだどのカラムにも割り当てていないフィールドを割り当て、行データを書き換えない
+    # 行にカラムのフィールドがなければ空文字列を表示する
+
+    def AppendColumn(self, heading, format=wx.LIST_FORMAT_LEFT, width=-1, field=None):
         if self.isPrintColumn():
             result = super().AppendColumn(heading, format, width)
         else:
             result = super().AppendColumn("", format, width)
-        ret = Column(len(self.columns), result, super().GetColumnOrder(result), format, width, heading)
+        ret = Column(len(self.columns), result, super().GetColumnOrder(result), format, width, heading, field=self._allocateField(field))
         self.columns.append(ret)
+        self._updateColumnTable()
         return ret.col
 
-    def InsertColumn(self, col, heading, format=wx.LIST_FORMAT_LEFT, width=wx.LIST_AUTOSIZE):
+    def InsertColumn(self, col, heading, format=wx.LIST_FORMAT_LEFT, width=wx.LIST_AUTOSIZE, field=None):
+        if field is None and self._rewritesRows():
+            # 挿入位置のカラムが表示していたフィールドの位置に、新しいフィールドを挿入する
+            next = self.getCol(col) if col < self.GetColumnCount() else None
+            field = next.field if next is not None else self._fieldCount
+            self._insertField(field)
+        field = self._allocateField(field)
         if col == 0:
             next = self.getCol(col)
             if next is not None:
-                insertedColumn = Column(col, next.wx_col - 1, next.disp_col - 1, format, width, heading)
+                insertedColumn = Column(col, next.wx_col, next.disp_col, format, width, heading, field=field)
             else:
-                insertedColumn = Column(0, 0, 0, format, width, heading)
+                insertedColumn = Column(0, 0, 0, format, width, heading, field=field)
         elif col <= self.GetColumnCount():
             prev = self.getCol(col - 1)
-            insertedColumn = Column(col, prev.wx_col + 1, prev.disp_col + 1, format, width, heading)
+            insertedColumn = Column(col, prev.wx_col + 1, prev.disp_col + 1, format, width, heading, field=field)
         else:
-            insertedColumn = Column(self.GetColumnCount(), GetShowingColumnCount(), GetShowingColumnCount(), format, width, heading)
+            insertedColumn = Column(self.GetColumnCount(), self.GetShowingColumnCount(), self.GetShowingColumnCount(), format, width, heading, field=field)
         for i in [j for j in self.columns if j.col >= insertedColumn.col]:
             i.col += 1
         for i in [j for j in self.columns if j.wx_col >= insertedColumn.wx_col]:
@@ -413,8 +1490,7 @@ class virtualListCtrl(listctrl.listCtrl):
         else:
             super().InsertColumn(insertedColumn.wx_col, "", format, width)
         self.columns.append(insertedColumn)
-        for i in self.lst:
-            i.insert(insertedColumn.col, "")
+        self._updateColumnTable()
         return insertedColumn.col
 
     def DeleteColumn(self, col):
@@ -425,12 +1501,23 @@ class virtualListCtrl(listctrl.listCtrl):
             i.wx_col -= 1
         for i in [j for j in self.columns if j.disp_col > removedColumn.disp_col]:
             i.disp_col -= 1
-        for i in self.lst:
-            del i[col]
         result = super().DeleteColumn(removedColumn.wx_col)
         self.columns.remove(removedColumn)
+        if self._rewritesRows() and not any(i.field == removedColumn.field for i in self.columns):
+            self._deleteField(removedColumn.field)
+        self._updateColumnTable()
+        self._forgetColumn(removedColumn)
         return result
 
+    def _forgetColumn(self, column):
+        """削除したカラムへの参照を、並べ替え・検索の設定から取り除く"""
+        self._sortKeyCache.pop(column, None)
+        if any(c is column for c, ascending in self._sortColumns):
+            self._sortColumns = [(c, ascending) for c, ascending in self._sortColumns if c is not column]
+            self._showSortIndicator()
+        if self._typeAheadCol is column:
+            self._typeAheadCol = None
+
     def GetColumn(self, col):
         info = wx.ListItem()
         info.SetText(self.getCol(col).heading)
@@ -455,6 +1542,7 @@ class virtualListCtrl(listctrl.listCtrl):
             data.wx_col = -1
             data.disp_col = -1
             data.display = False
+        self._updateColumnTable()
         self.RefreshItems(0, self.GetItemCount())
 
         # カラム名の表示・非表示を切替
@@ -492,10 +1580,10 @@ class virtualListCtrl(listctrl.listCtrl):
     def Bind(self, event, handler, source=None, id=wx.ID_ANY, id2=wx.ID_ANY):
         if type(event) != wx.PyEventBinder or source is not None or id != wx.ID_ANY or id2 != wx.ID_ANY:
             raise NotImplementedError
-        if event in (wx.EVT_LIST_COL_CLICK, wx.EVT_LIST_COL_RIGHT_CLICK, wx.EVT_LIST_COL_BEGIN_DRAG, wx.EVT_LIST_COL_DRAGGING):
+        if event in (wx.EVT_LIST_COL_RIGHT_CLICK, wx.EVT_LIST_COL_BEGIN_DRAG, wx.EVT_LIST_COL_DRAGGING):
             self.bindFunctions[event.typeId] = handler
             return super().Bind(event, self.columnEvent, source=source, id=id, id2=id2)
-        if event in (wx.EVT_LIST_END_LABEL_EDIT, wx.EVT_LIST_COL_END_DRAG):
+        if event in (wx.EVT_LIST_END_LABEL_EDIT, wx.EVT_LIST_COL_END_DRAG, wx.EVT_LIST_COL_CLICK):
             self.bindFunctions[event.typeId] = handler
             # 別途self内の関数をBind済み
             return  # wx標準でも戻り値はNoneである
@@ -509,7 +1597,7 @@ class virtualListCtrl(listctrl.listCtrl):
             event.Skip()
 
     def GetItemText(self, item, col):
-        return self.lst[item][col]
+        return self._store.getCell(self.viewToModel(item), self.getCol(col).field)
 
 
 if __name__ == "__main__":
@@ -530,14 +1618,17 @@ if __name__ == "__main__":
 
 
 class Column:
-    def __init__(self, col, wx_col, disp_col, format, width, heading):
+    def __init__(self, col, wx_col, disp_col, format, width, heading, formatter=None, field=None):
         self.col = col
+        self.field = col if field is None else field  # 表示する値の、行データ内の位置
         self.wx_col = wx_col
         self.disp_col = disp_col
         self.format = format
         self.width = width
         self.heading = heading
         self.display = disp_col >= 0
+        self.formatter = formatter  # 値を表示用文字列に変換する関数。Noneならstr()
+        self.sortKey = None  # 値から並べ替えキーを求める関数。Noneなら値そのもの
 
     def __repr__(self):
         """デバッグ用"""
@@ -18,7 +18,9 @@ from .objects import checkbox
 from .objects import radiobox
 from .objects import radiobutton
 from .objects import listbox
+from .objects import virtual_listbox
 from .objects import treectrl
+from .objects import lazy_tree
 from .objects import normal_listctrl
 from .objects import virtual_listctrl
 from .objects import notebook
@@ -71,6 +73,7 @@ class ViewCreator():
             "radioBox": radiobox.radioBox,
             "radioButton": radiobutton.radioButton,
             "listBox": listbox.listBox,
+            "virtualListBox": virtual_listbox.virtualListBox,
             "treeCtrl": treectrl.treeCtrl,
             "listCtrl": normal_listctrl.listCtrl,
             "virtualListCtrl": virtual_listctrl.virtualListCtrl,
@@ -482,11 +485,19 @@ class ViewCreator():
         else:
             raise ValueError("ViewCreatorはRadioの作成に際し不正な型ののtextパラメータを受け取りました。")
 
+    # item_textを指定すると、choicesの代わりに項目数countと、項目番号から文字列を返すitem_textで表示する仮想リストボックスを作成する
+    # eventには、どちらの場合もEVT_LISTBOXのwx.CommandEventが渡され、GetSelection()とGetString()で選択された項目を取得できる
     def listbox(self, text, choices=[], event=None, state=-1, style=0, size=(-1, -1),
-                sizer_flag=wx.ALL, proportion=0, margin=5, text_layout=wx.DEFAULT, enable_tab_focus=True):
+                sizer_flag=wx.ALL, proportion=0, margin=5, text_layout=wx.DEFAULT, enable_tab_focus=True,
+                count=0, item_text=None):
         hStaticText, sizer, parent = self._addDescriptionText(text, text_layout, sizer_flag, proportion, margin)
 
-        hListBox = self.winObject["listBox"](parent, wx.ID_ANY, name=text, choices=choices, size=size, style=style, enable_tab_focus=enable_tab_focus)
+        if item_text is not None:
+            hListBox = self.winObject["virtualListBox"](parent, wx.ID_ANY, name=text, size=size, style=style,
+                                                        enable_tab_focus=enable_tab_focus, count=count, item_text=item_text)
+            self._setFace(hListBox.GetMainWindow())
+        else:
+            hListBox = self.winObject["listBox"](parent, wx.ID_ANY, name=text, choices=choices, size=size, style=style, enable_tab_focus=enable_tab_focus)
         hListBox.Bind(wx.EVT_LISTBOX, event)
         hListBox.SetSelection(state)
         self._setFace(hListBox)
@@ -494,12 +505,18 @@ class ViewCreator():
         self.AddSpace()
         return hListBox, hStaticText
 
+    # children_providerを指定すると遅延読み込みモードになり、rootの子は開かれたときに初めて作成される
     def treeCtrl(self, text, event=None, style=wx.TR_FULL_ROW_HIGHLIGHT | wx.TR_NO_BUTTONS, size=(200, 200),
-                 sizer_flag=wx.ALL, proportion=0, margin=5, text_layout=wx.DEFAULT, enable_tab_focus=True):
+                 sizer_flag=wx.ALL, proportion=0, margin=5, text_layout=wx.DEFAULT, enable_tab_focus=True,
+                 children_provider=None, root=None, has_children=None, get_text=str, load_in_background=False,
+                 max_nodes=lazy_tree.DEFAULT_MAX_NODES):
         hStaticText, sizer, parent = self._addDescriptionText(text, text_layout, sizer_flag, proportion, margin)
 
         hTreeCtrl = self.winObject["treeCtrl"](parent, wx.ID_ANY, style=style | wx.BORDER_RAISED, size=size, enable_tab_focus=enable_tab_focus)
         hTreeCtrl.Bind(wx.EVT_TREE_SEL_CHANGED, event)
+        if children_provider is not None:
+            hTreeCtrl.setChildrenProvider(children_provider, has_children, get_text, load_in_background, max_nodes)
+            hTreeCtrl.setRootValue(root)
         self._setFace(hTreeCtrl)
         Add(sizer, hTreeCtrl, proportion, sizer_flag, margin)
         self.AddSpace()
@@ -532,6 +549,8 @@ class ViewCreator():
         self.AddSpace()
         return hListCtrl, hStaticText
 
+    # field_mappingは、カラムの挿入・削除で行データを書き換えずにカラムとフィールドの対応だけを更新するか
+    # 既定(None)では、list of lists形式では行データを書き換え、列指向などのストアでは書き換えない。virtualListCtrl.setFieldMappingを参照
     def virtualListCtrl(
             self,
             text,
@@ -544,11 +563,14 @@ class ViewCreator():
             proportion=0,
             margin=5,
             text_layout=wx.DEFAULT,
-            enable_tab_focus=True):
+            enable_tab_focus=True,
+            field_mapping=None):
         hStaticText, sizer, parent = self._addDescriptionText(text, text_layout, sizer_flag, proportion, margin)
 
-        hListCtrl = self.winObject["virtualListCtrl"](parent, wx.ID_ANY, style=style | wx.BORDER_RAISED, size=size, enable_tab_focus=enable_tab_focus)
+        hListCtrl = self.winObject["virtualListCtrl"](parent, wx.ID_ANY, style=style | wx.BORDER_RAISED, size=size, enable_tab_focus=enable_tab_focus,
+                                                      field_mapping=field_mapping)
         hListCtrl.Bind(wx.EVT_LIST_ITEM_FOCUSED, event)
+        hListCtrl.setDarkMode(self.mode & MODE_DARK == MODE_DARK)
         self._setFace(hListCtrl)
         self._setFace(hListCtrl.GetMainWindow())
         _winxptheme.SetWindowTheme(win32api.SendMessage(hListCtrl.GetHandle(), 0x101F, 0, 0), "", "")  # ヘッダーのウィンドウテーマを引っぺがす
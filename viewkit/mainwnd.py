@@ -224,10 +224,10 @@ class MainWindow(wx.Frame):
 
     def _windowMove(self, event):
         # wx.EVT_MOVE_END→wx.MoveEvent
-        # 設定ファイルに位置を保存
+        # 設定ファイルに位置を保存。移動中は何度も呼ばれるため、まとめて後で書き込む
         self.app_ctx.settings.changeSetting('main_window.x', self.GetPosition().x)
         self.app_ctx.settings.changeSetting('main_window.y', self.GetPosition().y)
-        self.app_ctx.settings.save()
+        self.app_ctx.settings.saveLater()
         event.Skip()
 
     def _windowResize(self, event):
@@ -241,6 +241,6 @@ class MainWindow(wx.Frame):
         if not self.IsMaximized():
             self.app_ctx.settings.changeSetting('main_window.size_x', event.GetSize().x)
             self.app_ctx.settings.changeSetting('main_window.size_y', event.GetSize().y)
-        self.app_ctx.settings.save()
+        self.app_ctx.settings.saveLater()
         # sizerを正しく機能させるため、Skipの呼出が必須
         event.Skip()
@@ -1,3 +1,4 @@
 from .settingsManager import SettingsManager, CustomSettingField
+from .storage import SettingsStorage, SqliteStorage
 
 __all__ = ['SettingsManager']
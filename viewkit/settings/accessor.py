@@ -0,0 +1,69 @@
+from typing import Any, Tuple
+
+MISSING = object()  # 設定値が存在しないことを表す
+
+
+class SettingAccessor:
+    """
+    1つの設定値を読み書きするためのオブジェクト。SettingsManager.accessorで取得する
+    パスは作成時に分割済みで、値は設定が変更されるまでキャッシュされる
+    """
+
+    __slots__ = ('_manager', 'keys', 'path', '_version', '_value')
+
+    def __init__(self, manager, path: str, keys: Tuple[str, ...]):
+        self._manager = manager
+        self.path = path
+        self.keys = keys
+        self._version = -1
+        self._value = MISSING
+
+    def __repr__(self):
+        return "SettingAccessor(%r)" % self.path
+
+    def get(self, default: Any = None) -> Any:
+        """設定値を返す。存在しない場合はdefaultを返す"""
+        manager = self._manager
+        if self._version != manager._version:
+            # 親の辞書が置き換えられた場合も含め、何かが変更されたらたどり直す
+            self._value = manager._lookup(self.keys)
+            self._version = manager._version
+        return default if self._value is MISSING else self._value
+
+    def set(self, value: Any):
+        """設定値を変更する。SettingsManager.changeSettingと同じ検証が行われる"""
+        self._manager._changeKeys(list(self.keys), value)
+
+
+class SettingsView:
+    """
+    設定を属性としてたどるためのビュー。SettingsManager.valuesで取得する
+    スキーマで辞書として定義されている部分はビューを、それ以外は値を返す。スキーマにない名前はAttributeErrorになる
+    """
+
+    __slots__ = ('_manager', '_keys')
+
+    def __init__(self, manager, keys: Tuple[str, ...] = ()):
+        object.__setattr__(self, '_manager', manager)
+        object.__setattr__(self, '_keys', keys)
+
+    def __repr__(self):
+        return "SettingsView(%r)" % self._manager.SETTING_SEPARATOR.join(self._keys)
+
+    def __getattr__(self, name: str) -> Any:
+        keys = self._keys + (name,)
+        kind = self._manager._schemaKind(keys)
+        if kind is None:
+            raise AttributeError(f"Setting '{self._manager.SETTING_SEPARATOR.join(keys)}' is not defined in the schema")
+        if kind == 'dict':
+            return SettingsView(self._manager, keys)
+        return self._manager.accessor(self._manager.SETTING_SEPARATOR.join(keys)).get()
+
+    def __setattr__(self, name: str, value: Any):
+        keys = self._keys + (name,)
+        if self._manager._schemaKind(keys) is None:
+            raise AttributeError(f"Setting '{self._manager.SETTING_SEPARATOR.join(keys)}' is not defined in the schema")
+        self._manager._changeKeys(list(keys), value)
+
+    def __dir__(self):
+        return self._manager._schemaChildren(self._keys)
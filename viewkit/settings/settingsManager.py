@@ -1,8 +1,17 @@
+import contextlib
+import hashlib
 import json
+import logging
 import os
-from typing import Dict, Any, Optional
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Any, Iterable, List, Optional, Set, Tuple
 from cerberus import Validator
 from viewkit.version import getVersion
+from .accessor import MISSING, SettingAccessor, SettingsView
+from .storage import SettingsStorage
+from .subscription import SubscriptionTrie
 
 
 class CustomSettingField:
@@ -13,9 +22,21 @@ class CustomSettingField:
 
 class SettingsManager:
     SETTING_SEPARATOR = '.'
-
-    def __init__(self, filename: str):
+    DEFAULT_SAVE_DELAY = 1.0  # saveLaterで、最後の変更からファイルに書き込むまでの秒数
+    DEFAULT_JOURNAL_THRESHOLD = 256 * 1024  # ジャーナルがこのバイト数を超えたら、設定ファイルに統合する
+
+    def __init__(self, filename: str, journal: bool = False, journal_threshold: int = DEFAULT_JOURNAL_THRESHOLD,
+                 storage: Optional[SettingsStorage] = None):
+        """
+        journalがTrueの場合、保存時には変更された部分だけをジャーナル(ファイル名+.journal)に追記する
+        ジャーナルは読み込み時に設定ファイルの後に適用され、journal_thresholdバイトを超えたらバックグラウンドで設定ファイルに統合される
+        storageを指定した場合は、JSONファイルの代わりにstorageに行単位で保存する。各行は初めて参照されたときに読み込んで検証し、保存時には変更された行だけを書き込む
+        """
+        if journal and storage is not None:
+            raise ValueError("journal cannot be used with storage")
         self.filename = os.path.abspath(filename)
+        # 最後に検証済みとした設定ファイルの内容のハッシュと、その時のスキーマのフィンガープリントを記録するファイル
+        self.stamp_filename = self.filename + '.validated'
         self.custom_fields = {}
         self.schema = {
             # 'test_str': {'type': 'string', 'default': ''},
@@ -46,11 +67,97 @@ class SettingsManager:
             },
             'custom': {'type': 'dict', 'default': {}}
         }
+        self.journal_filename = self.filename + '.journal' if journal else None
+        self.journal_threshold = journal_threshold
+        if journal:
+            # 設定ファイルに統合済みの、最後の変更の番号
+            self.schema['journal_seq'] = {'type': 'integer', 'min': 0, 'default': 0}
         self.data = {}
+        self._custom_validators = {}
+        self.logger = logging.getLogger(__name__)
+        # 遅延書き込み用。dataの変更とファイルに書く内容の作成は_lockを取って行う
+        # Validatorは検証結果を自身に保持し、書き込みスレッドの行の読み込みでも使われるため、検証も_lockを取って行う
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()  # ファイルへの書き込みを1つずつ行うためのロック
+        self._dirty = False
+        self._deadline = 0.0
+        self._writer: Optional[threading.Thread] = None
+        # ジャーナル用
+        self._journal_seq = 0  # 最後に記録した変更の番号
+        self._journal_pending: List[str] = []  # ジャーナルに追記していない変更
+        self._journal_size = 0
+        self._full_write_needed = False  # ジャーナルでなく、設定ファイル全体を書き込む必要があるか
+        self._replaying = False
+        self._compactor: Optional[threading.Thread] = None
+        # 変更通知用
+        self._subscriptions = SubscriptionTrie()
+        self._pending_notifications: Dict[Tuple[Tuple[str, ...], Callable], None] = {}  # 順序付きの集合として使う
+        self._batch_depth = 0
+        self._loading = False
+        self._notify_post: Optional[Callable] = None
+        self._notify_posted = False
+        # アクセサ用。_versionはdataが変更されるたびに増え、アクセサのキャッシュを無効にする
+        self._version = 0
+        self._accessors: Dict[str, SettingAccessor] = {}
+        # ストレージ用
+        self._storage = storage
+        self._stored_rows: Set[str] = set()  # ストレージにある行
+        self._loaded_rows: Set[str] = set()  # dataに読み込み済みの行
+        self._dirty_rows: Set[str] = set()  # 変更されて書き込んでいない行
+        self._compileValidators()
+
+    def _compileValidators(self):
+        """スキーマから、全体用とパスごとのバリデータを作成する。スキーマを変更したら呼び出す"""
+        self._validator = Validator(self.schema)
+        self._path_validators: Dict[Tuple[str, ...], Validator] = {}
+
+        def compile(schema, prefix):
+            for key, rule in schema.items():
+                path = prefix + (key,)
+                self._path_validators[path] = Validator({key: rule})
+                if rule.get('type') == 'dict' and 'schema' in rule:
+                    compile(rule['schema'], path)
+        compile(self.schema, ())
 
     def registerCustomField(self, field: CustomSettingField):
         """カスタムフィールドを登録する"""
         self.custom_fields[field.name] = field.schema
+        # スキーマが空の場合は検証しない。ルール形式の場合は {フィールド名: 値} として検証する
+        if not field.schema:
+            validator = None
+        elif self._isRuleSchema(field.schema):
+            validator = Validator({field.name: field.schema})
+        else:
+            validator = Validator(field.schema, allow_unknown=True)
+        self._custom_validators[field.name] = validator
+
+    @staticmethod
+    def _isRuleSchema(schema: Dict[str, Any]) -> bool:
+        """
+        カスタムフィールドのスキーマが、{"type": "string", "default": ...} のように値そのもののルールか
+        最上位のtypeの値が文字列(またはその列)ならルール、子の定義(辞書)なら子を持つ辞書のスキーマとみなす
+        """
+        kind = schema.get('type')
+        return isinstance(kind, str) or (isinstance(kind, list) and all(isinstance(i, str) for i in kind))
+
+    def _customFieldRule(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        """カスタムフィールドのスキーマを、custom以下に置くためのルールに変換する"""
+        if not schema:
+            return {'default': {}}
+        if self._isRuleSchema(schema):
+            return schema
+        return {'type': 'dict', 'default': {}, 'allow_unknown': True, 'schema': schema}
+
+    def _customFieldDefault(self, field_name: str) -> Any:
+        """カスタムフィールドのデフォルト値を、登録時に作成したバリデータで求める"""
+        validator = self._custom_validators.get(field_name)
+        if validator is None:
+            return {}
+        with self._lock:
+            if self._isRuleSchema(self.custom_fields[field_name]):
+                return validator.normalized({}).get(field_name)
+            return validator.normalized({})
 
     def getShortcutSettings(self):
         """ショートカット設定を取得する"""
@@ -58,149 +165,661 @@ class SettingsManager:
 
     def loadOrCreateDefault(self):
         """ファイルがなければデフォルトの設定でファイルを書き込む"""
-        if not os.path.exists(self.filename):
-            self._createDefaultSettings()
-        else:
-            self._loadSettings()
+        old = self.data
+        with self.batch():
+            # 読み込み中の個々の変更ではなく、読み込み前後の差分を通知する
+            self._loading = True
+            try:
+                if self._storage is not None:
+                    self._loadFromStorage()
+                elif not os.path.exists(self.filename):
+                    self._createDefaultSettings()
+                else:
+                    self._loadSettings()
+            finally:
+                self._loading = False
+                self._version += 1
+            if self._storage is not None:
+                # 読み込み前にあった行は、差分を求めるために読み込む
+                self._loadRows([row for row, _ in self._iterRows(old)])
+            self._collectNotifications((), old, self.data)
 
     def _createDefaultSettings(self):
         """デフォルト設定を作成"""
         # カスタムフィールドも含めてデフォルト設定を埋めたいので、カスタムフィールドと通常のスキーマを一時的にマージする
+        # self.schemaはパスごとのバリデータの元になっているため変更しない
         merged_schema = {**self.schema}
         if self.custom_fields:
-            merged_schema["custom"]["schema"] = self.custom_fields
+            custom_schema = {name: self._customFieldRule(schema) for name, schema in self.custom_fields.items()}
+            merged_schema["custom"] = {**self.schema["custom"], "schema": custom_schema}
         validator = Validator(merged_schema)
         self.data = validator.normalized({})
+        self._loaded_rows = {row for row, _ in self._iterRows(self.data)}
         self._saveSettings()
 
     def _loadSettings(self):
         """設定ファイルを読み込む"""
         try:
-            with open(self.filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            # バリデーション
-            validator = Validator(self.schema)
-            if validator.validate(data):
-                self.data = validator.normalized(data)
+            with open(self.filename, 'rb') as f:
+                raw = f.read()
+            content_hash = hashlib.sha256(raw).hexdigest()
+            data = json.loads(raw.decode('utf-8'))
+            if self.journal_filename is None and isinstance(data, dict):
+                # ジャーナルを使っていた時の設定ファイルも読めるようにする
+                data.pop('journal_seq', None)
+
+            trusted = isinstance(data, dict) and self._isValidated(content_hash)
+            if trusted:
+                # 前回検証した時からファイルもスキーマも変わっていないので、検証を省略する
+                self.data = data
             else:
-                raise ValueError(f"Settings file validation failed: {validator.errors}")
-
-            # カスタムフィールドのバリデーション
-            if 'custom' in self.data:
-                for field_name, field_data in self.data['custom'].items():
-                    if field_name in self.custom_fields and self.custom_fields[field_name]:
-                        # カスタムフィールドのスキーマをCerberus形式に変換
-                        field_schema = {field_name: self.custom_fields[field_name]}
-                        field_validator = Validator(field_schema, allow_unknown=True)
-                        if not field_validator.validate({field_name: field_data}):
-                            raise ValueError(f"Custom field '{field_name}' validation failed: {field_validator.errors}")
+                self._validateLoadedData(data)
+                if self.data == data:
+                    # 正規化で変わらなかった場合のみ、次回から検証を省略できる
+                    self._writeStamp(content_hash)
 
         except (json.JSONDecodeError, FileNotFoundError, ValueError) as e:
             print(f"設定ファイルの読み込みエラー: {e}")
             self._createDefaultSettings()
+            return
+        if self.journal_filename is not None:
+            self._replayJournal(trusted)
+
+    #
+    # ストレージ
+    #
+
+    def _loadFromStorage(self):
+        """ストレージにある行のキーだけを読み込む。値は参照されたときに読み込む"""
+        with self._lock:
+            self._stored_rows = self._storage.keys()
+            self._loaded_rows = set()
+            self._dirty_rows = set()
+            self.data = {'custom': {}}
+        if not self._stored_rows:
+            self._createDefaultSettings()
 
-    def getSetting(self, key: str, default: Any = None) -> Any:
-        """設定値にアクセスする（ネストパス対応）"""
-        if self.SETTING_SEPARATOR in key:
-            keys = key.split(self.SETTING_SEPARATOR)
-            current = self.data
-
-            for k in keys:
-                if isinstance(current, dict) and k in current:
-                    current = current[k]
-                else:
-                    return default
-
-            return current
+    def _rowKey(self, keys) -> Optional[str]:
+        """パスが含まれる行のキーを返す。custom自体のように、行に含まれないパスならNone"""
+        if not keys:
+            return None
+        if keys[0] == 'custom':
+            return 'custom' + self.SETTING_SEPARATOR + keys[1] if len(keys) > 1 else None
+        return keys[0]
+
+    def _iterRows(self, data: Dict[str, Any]) -> Iterable[Tuple[str, Any]]:
+        for k, v in data.items():
+            if k == 'custom':
+                for name, field_value in v.items():
+                    yield 'custom' + self.SETTING_SEPARATOR + name, field_value
+            else:
+                yield k, v
+
+    def _rowValue(self, row: str) -> Any:
+        if row.startswith('custom' + self.SETTING_SEPARATOR):
+            return self.data.get('custom', {}).get(row[len('custom') + 1:], MISSING)
+        return self.data.get(row, MISSING)
+
+    def _materialize(self, keys):
+        """ストレージを使う場合、keysの値の参照に必要な行を読み込む"""
+        if self._storage is None:
+            return
+        row = self._rowKey(keys)
+        if row is not None:
+            if row not in self._loaded_rows:
+                self._loadRows([row])
+            return
+        # 設定全体かcustom全体
+        custom_rows = {r for r in self._stored_rows if r.startswith('custom' + self.SETTING_SEPARATOR)}
+        custom_rows.update('custom' + self.SETTING_SEPARATOR + name for name in self.custom_fields)
+        if keys:
+            self._loadRows(custom_rows)
         else:
-            return self.data.get(key, default)
-
-    def changeSetting(self, key: str, value: Any):
-        """設定値を変更する（ネストパス・カスタム設定対応）"""
-        if self.SETTING_SEPARATOR in key:
-            keys = key.split(self.SETTING_SEPARATOR)
-
-            # カスタム設定の場合は専用のバリデーションロジック
-            if keys[0] == 'custom' and len(keys) >= 2:
-                field_name = keys[1]
-                if field_name not in self.custom_fields:
-                    raise ValueError(f"Custom field '{field_name}' is not registered")
-
-                # カスタムフィールドの値全体を設定する場合
-                if len(keys) == 2:
-                    # バリデーション（スキーマが空でない場合のみ）
-                    if self.custom_fields[field_name]:
-                        field_validator = Validator(self.custom_fields[field_name], allow_unknown=True)
-                        if not field_validator.validate(value):
-                            raise ValueError(f"Custom field '{field_name}' validation failed: {field_validator.errors}")
-
-                    if 'custom' not in self.data:
-                        self.data['custom'] = {}
-                    self.data['custom'][field_name] = value
+            self._loadRows(custom_rows | {k for k in self.schema if k != 'custom'})
+
+    def _loadRows(self, rows: Iterable[str]):
+        with self._lock:
+            for row in rows:
+                if row not in self._loaded_rows:
+                    self._loadRow(row)
+
+    def _loadRow(self, row: str):
+        """行を読み込んで検証し、dataに入れる。不正な値の場合はデフォルト値にする"""
+        self._loaded_rows.add(row)
+        text = self._storage.read(row) if row in self._stored_rows else None
+        if row.startswith('custom' + self.SETTING_SEPARATOR):
+            name = row[len('custom') + 1:]
+            value = MISSING
+            if text is not None:
+                try:
+                    value = json.loads(text)
+                    if name in self.custom_fields:
+                        self._validateCustomField(name, value)
+                except ValueError as e:
+                    self.logger.warning("invalid settings row %s: %s" % (row, e))
+                    value = MISSING
+            if value is MISSING:
+                if name not in self.custom_fields:
+                    return
+                value = self._customFieldDefault(name)
+            self.data.setdefault('custom', {})[name] = value
+        else:
+            validator = self._path_validators.get((row,))
+            if validator is None:
+                self.logger.warning("settings row %s is not defined in the schema" % row)
+                return
+            document = {}
+            if text is not None:
+                try:
+                    document = {row: json.loads(text)}
+                except ValueError as e:
+                    self.logger.warning("invalid settings row %s: %s" % (row, e))
+            if not validator.validate(document):
+                self.logger.warning("invalid settings row %s: %s" % (row, validator.errors))
+                validator.validate({})
+            self.data[row] = validator.document[row]
+        self._version += 1
+
+    def _writeRows(self):
+        """変更された行をストレージに書き込む。全体の書き込みが必要な場合は、すべての行を書き込み、不要な行を削除する"""
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
                     return
+                full = self._full_write_needed
+                if full:
+                    self._materialize(())
+                    rows = {row: json.dumps(value, ensure_ascii=False) for row, value in self._iterRows(self.data)}
+                    rows.update({row: None for row in self._stored_rows - rows.keys()})
+                else:
+                    rows = {}
+                    for row in self._dirty_rows:
+                        value = self._rowValue(row)
+                        rows[row] = None if value is MISSING else json.dumps(value, ensure_ascii=False)
+                dirty_rows = self._dirty_rows
+                self._dirty_rows = set()
+                self._dirty = False
+                self._full_write_needed = False
+            try:
+                self._storage.write(rows)
+            except Exception:
+                with self._lock:
+                    self._dirty = True
+                    self._full_write_needed = self._full_write_needed or full
+                    self._dirty_rows |= dirty_rows
+                raise
+            with self._lock:
+                self._stored_rows |= {row for row, text in rows.items() if text is not None}
+                self._stored_rows -= {row for row, text in rows.items() if text is None}
+
+    def _validateLoadedData(self, data: Any):
+        # バリデーション
+        validator = self._validator
+        with self._lock:
+            if validator.validate(data):
+                self.data = validator.document
+            else:
+                raise ValueError(f"Settings file validation failed: {validator.errors}")
 
-            # 通常のネストパス処理
-            # バリデーション用に一時的にデータを作成
-            temp_data = self.data.copy()
-            current = temp_data
-
-            # パスをたどって設定値を変更
-            for i, k in enumerate(keys[:-1]):
-                if k not in current:
-                    current[k] = {}
-                elif not isinstance(current[k], dict):
-                    raise ValueError(f"Path '{self.SETTING_SEPARATOR.join(keys[:i + 1])}' is not a dictionary")
-                current = current[k]
-
-            # 最終キーに値を設定
-            final_key = keys[-1]
-            current[final_key] = value
-
-            # バリデーション実行
-            validator = Validator(self.schema)
-            if not validator.validate(temp_data):
-                raise ValueError(f"Setting validation failed: {validator.errors}")
+        # カスタムフィールドのバリデーション
+        if 'custom' in self.data:
+            for field_name, field_data in self.data['custom'].items():
+                if field_name in self.custom_fields:
+                    self._validateCustomField(field_name, field_data)
 
-            # バリデーション成功時のみ実際のデータを更新
-            self.data = validator.normalized(temp_data)
-        else:
-            if key == 'custom':
-                raise ValueError("Use custom.field_name format for custom settings")
+    def _schemaFingerprint(self) -> str:
+        """スキーマとカスタムフィールドのスキーマから作るハッシュ。関数などJSONにできない値はreprで代用する"""
+        text = json.dumps({'schema': self.schema, 'custom': self.custom_fields}, sort_keys=True, default=repr)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
 
-            # バリデーション
-            temp_data = self.data.copy()
-            temp_data[key] = value
-            validator = Validator(self.schema)
+    def _isValidated(self, content_hash: str) -> bool:
+        try:
+            with open(self.stamp_filename, 'r', encoding='utf-8') as f:
+                stamp = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return isinstance(stamp, dict) and stamp.get('content') == content_hash and stamp.get('schema') == self._schemaFingerprint()
+
+    def _writeStamp(self, content_hash: str):
+        # 記録に失敗しても、次回の読み込みで検証されるだけなので無視する
+        try:
+            with open(self.stamp_filename, 'w', encoding='utf-8') as f:
+                json.dump({'content': content_hash, 'schema': self._schemaFingerprint()}, f)
+        except OSError as e:
+            self.logger.warning("failed to write %s: %s" % (self.stamp_filename, e))
+
+    def _replayJournal(self, trusted: bool):
+        """
+        ジャーナルの変更のうち、設定ファイルに統合されていないものを適用する
+        ジャーナルには検証・正規化済みの値が記録されているため、trustedなら検証せずにその位置に適用する
+        trustedでない場合(スキーマが変わった場合など)は1件ずつ検証し、適用後に設定ファイルに統合する
+        """
+        self._journal_seq = self.data.get('journal_seq', 0)
+        if not os.path.exists(self.journal_filename):
+            self._journal_size = 0
+            return
+        broken = False
+        replayed = False
+        self._replaying = True
+        try:
+            with open(self.journal_filename, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        seq, keys, value = record['seq'], record['path'], record['value']
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        # 書き込み途中で終了した場合など。以降は読まない
+                        broken = True
+                        break
+                    if seq <= self._journal_seq:
+                        continue
+                    if trusted:
+                        self._setPath(keys, value)
+                    else:
+                        try:
+                            self._changeKeys(keys, value)
+                        except ValueError as e:
+                            self.logger.warning("skipped invalid journal record %d: %s" % (seq, e))
+                    replayed = True
+                    self._journal_seq = seq
+        finally:
+            self._replaying = False
+        self._journal_size = os.path.getsize(self.journal_filename)
+        if broken or (replayed and not trusted):
+            # 壊れた行の後に追記しないよう、また検証済みの記録だけが残るよう、設定ファイルに統合する
+            self._saveSettings()
 
-            if validator.validate(temp_data):
-                self.data[key] = value
+    def getSetting(self, key: str, default: Any = None) -> Any:
+        """設定値にアクセスする（ネストパス対応）。accessorで作成済みのkeyは、そのキャッシュを使う"""
+        accessor = self._accessors.get(key)
+        if accessor is not None:
+            return accessor.get(default)
+        # 任意のkeyで呼ばれてもアクセサが増え続けないよう、作成せずにたどる
+        value = self._lookup(tuple(key.split(self.SETTING_SEPARATOR)))
+        return default if value is MISSING else value
+
+    def accessor(self, key: str) -> SettingAccessor:
+        """keyの設定値を読み書きするアクセサを返す。同じkeyには同じアクセサを返す"""
+        accessor = self._accessors.get(key)
+        if accessor is None:
+            accessor = SettingAccessor(self, key, tuple(key.split(self.SETTING_SEPARATOR)))
+            self._accessors[key] = accessor
+        return accessor
+
+    @property
+    def values(self) -> SettingsView:
+        """設定を settings.values.view.is_dark のように属性としてたどるビュー"""
+        return SettingsView(self)
+
+    def _lookup(self, keys: Tuple[str, ...]) -> Any:
+        if self._storage is not None:
+            self._materialize(keys)
+        current = self.data
+        for k in keys:
+            if not isinstance(current, dict) or k not in current:
+                return MISSING
+            current = current[k]
+        return current
+
+    def _schemaRule(self, keys: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+        """keysのスキーマ上のルールを返す。カスタムフィールドのスキーマもたどる。定義されていなければNone"""
+        schema = self.schema
+        rule = None
+        for i, k in enumerate(keys):
+            if i == 1 and keys[0] == 'custom':
+                if k not in self.custom_fields:
+                    return None
+                rule = self._customFieldRule(self.custom_fields[k])
+            elif schema is None or k not in schema:
+                return None
             else:
-                raise ValueError(f"Setting validation failed: {validator.errors}")
+                rule = schema[k]
+            schema = rule.get('schema') if rule.get('type') == 'dict' else None
+        return rule
+
+    def _schemaKind(self, keys: Tuple[str, ...]) -> Optional[str]:
+        """keysがスキーマで子を持つ辞書として定義されていれば'dict'、それ以外の値なら'value'、定義されていなければNone"""
+        rule = self._schemaRule(keys)
+        if rule is None:
+            return None
+        if keys == ('custom',) or (rule.get('type') == 'dict' and 'schema' in rule):
+            return 'dict'
+        return 'value'
+
+    def _schemaChildren(self, keys: Tuple[str, ...]) -> List[str]:
+        if keys == ('custom',):
+            return sorted(self.custom_fields)
+        rule = self._schemaRule(keys) if keys else {'schema': self.schema}
+        return sorted(rule.get('schema', {})) if rule else []
 
-    def setCustomSetting(self, field_name: str, value: Any):
-        """カスタム設定値を変更する"""
+    def changeSetting(self, key: str, value: Any):
+        """設定値を変更する（ネストパス・カスタム設定対応）"""
+        self._changeKeys(key.split(self.SETTING_SEPARATOR), value)
+
+    def _changeKeys(self, keys: List[str], value: Any):
+        # カスタム設定の場合は専用のバリデーションロジック
+        if keys[0] == 'custom':
+            if len(keys) == 1:
+                raise ValueError("Use custom.field_name format for custom settings")
+            self._changeCustomSetting(keys[1], keys[2:], value)
+            return
+
+        # スキーマが定義されている最も深いパスを探し、その部分だけを検証する
+        depth = len(keys)
+        while depth > 0 and tuple(keys[:depth]) not in self._path_validators:
+            depth -= 1
+        if depth == 0:
+            # スキーマにないキーはエラーになる
+            with self._lock:
+                if not self._validator.validate({keys[0]: value}):
+                    raise ValueError(f"Setting validation failed: {self._validator.errors}")
+            return
+        base = keys[:depth]
+        subtree = self._replaced(self._getPath(base), keys[depth:], value, base)
+        validator = self._path_validators[tuple(base)]
+        with self._lock:
+            if not validator.validate({base[-1]: subtree}):
+                raise ValueError(f"Setting validation failed: {validator.errors}")
+            normalized = validator.document[base[-1]]
+
+        # バリデーション成功時のみ実際のデータを更新。正規化もこの部分だけに行われている
+        self._setPath(base, normalized)
+
+    def _getPath(self, keys: List[str]) -> Any:
+        self._materialize(keys)
+        current = self.data
+        for k in keys:
+            if not isinstance(current, dict) or k not in current:
+                return None
+            current = current[k]
+        return current
+
+    def _setPath(self, keys: List[str], value: Any):
+        with self._lock:
+            current = self.data
+            for k in keys[:-1]:
+                current = current.setdefault(k, {})
+            old = current.get(keys[-1])
+            current[keys[-1]] = value
+            self._version += 1
+            if self._storage is not None:
+                self._dirty_rows.add(self._rowKey(keys))
+            if self.journal_filename is not None and not self._replaying:
+                self._journal_seq += 1
+                self._journal_pending.append(json.dumps({'seq': self._journal_seq, 'path': keys, 'value': value}, ensure_ascii=False))
+            if not self._loading:
+                self._collectNotifications(tuple(keys), old, value)
+        self._scheduleNotifications()
+
+    def _replaced(self, current: Any, keys: List[str], value: Any, path: List[str]) -> Any:
+        """currentのkeysの位置をvalueにした値を返す。経路上の辞書だけを複製し、currentは変更しない"""
+        if not keys:
+            return value
+        if current is None:
+            current = {}
+        elif not isinstance(current, dict):
+            raise ValueError(f"Path '{self.SETTING_SEPARATOR.join(path)}' is not a dictionary")
+        ret = dict(current)
+        ret[keys[0]] = self._replaced(current.get(keys[0]), keys[1:], value, path + [keys[0]])
+        return ret
+
+    def _validateCustomField(self, field_name: str, value: Any) -> Any:
+        """カスタムフィールドの値を検証し、正規化した値を返す"""
+        validator = self._custom_validators.get(field_name)
+        if validator is None:
+            return value
+        with self._lock:
+            if self._isRuleSchema(self.custom_fields[field_name]):
+                if not validator.validate({field_name: value}):
+                    raise ValueError(f"Custom field '{field_name}' validation failed: {validator.errors}")
+                return validator.document[field_name]
+            if not validator.validate(value):
+                raise ValueError(f"Custom field '{field_name}' validation failed: {validator.errors}")
+            return validator.document
+
+    def _changeCustomSetting(self, field_name: str, keys: List[str], value: Any):
+        """カスタムフィールドfield_name内のkeysの位置を変更する。keysが空ならフィールドの値全体を変更する"""
         if field_name not in self.custom_fields:
             raise ValueError(f"Custom field '{field_name}' is not registered")
+        self._materialize(['custom', field_name])
+        custom = self.data.get('custom', {})
+        current = custom.get(field_name)
+        new_value = self._validateCustomField(field_name, self._replaced(current, keys, value, ['custom', field_name]))
+
+        # フィールド全体ではなく、変更した位置だけを反映する。途中の辞書がなければ、作成される辞書ごと反映する
+        depth = 0
+        while depth < len(keys) and isinstance(current, dict) and isinstance(new_value, dict):
+            current = current.get(keys[depth])
+            new_value = new_value.get(keys[depth])
+            depth += 1
+            if not isinstance(current, dict):
+                break
+        self._setPath(['custom', field_name] + keys[:depth], new_value)
 
-        # バリデーション（スキーマが空でない場合のみ）
-        if self.custom_fields[field_name]:
-            field_validator = Validator(self.custom_fields[field_name], allow_unknown=True)
-            if not field_validator.validate(value):
-                raise ValueError(f"Custom field '{field_name}' validation failed: {field_validator.errors}")
-
-        if 'custom' not in self.data:
-            self.data['custom'] = {}
-
-        self.data['custom'][field_name] = value
+    def setCustomSetting(self, field_name: str, value: Any):
+        """カスタム設定値を変更する"""
+        self._changeCustomSetting(field_name, [], value)
+
+    #
+    # 変更通知
+    #
+
+    def subscribe(self, path_prefix: str, callback: Callable[[Any], None]):
+        """
+        path_prefix以下の設定値が変わったときに、callback(path_prefixの値)を呼ぶようにする。空文字列なら設定全体を購読する
+        バッチ中や、setNotifierで通知を遅らせている間の変更は、購読者ごとに1回の通知にまとめられる
+        """
+        self._subscriptions.add(self._subscriptionKeys(path_prefix), callback)
+
+    def unsubscribe(self, path_prefix: str, callback: Callable[[Any], None]) -> bool:
+        """購読を解除する。解除できたかを返す"""
+        return self._subscriptions.remove(self._subscriptionKeys(path_prefix), callback)
+
+    def setNotifier(self, post: Optional[Callable[[Callable], None]]):
+        """
+        変更通知をpost(関数)で後から行うようにする(wx.CallAfterなど)。その間の変更はまとめて通知される
+        Noneの場合は、変更のたびにすぐ通知する
+        """
+        self._notify_post = post
+
+    @contextlib.contextmanager
+    def batch(self):
+        """with文の中での変更を、終了時にまとめて通知する"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            self._scheduleNotifications()
+
+    def _subscriptionKeys(self, path_prefix: str) -> Tuple[str, ...]:
+        return tuple(path_prefix.split(self.SETTING_SEPARATOR)) if path_prefix else ()
+
+    def _collectNotifications(self, keys: Tuple[str, ...], old: Any, new: Any):
+        with self._lock:
+            for i in self._subscriptions.collect(keys, old, new):
+                self._pending_notifications[i] = None
+
+    def _scheduleNotifications(self):
+        if self._batch_depth > 0 or not self._pending_notifications:
+            return
+        if self._notify_post is None:
+            self._deliverNotifications()
+        elif not self._notify_posted:
+            self._notify_posted = True
+            self._notify_post(self._deliverNotifications)
+
+    def _deliverNotifications(self):
+        with self._lock:
+            pending = self._pending_notifications
+            self._pending_notifications = {}
+            self._notify_posted = False
+        if any(not keys for keys, _ in pending):
+            self._materialize(())
+        for keys, callback in pending:
+            try:
+                callback(self._getPath(list(keys)) if keys else self.data)
+            except Exception:
+                self.logger.exception("settings change callback %r for '%s' failed" % (callback, self.SETTING_SEPARATOR.join(keys)))
 
     def save(self):
-        """ファイルを保存する"""
+        """ファイルを保存する。遅延書き込みを待っている変更も含めて、すぐに書き込む"""
         self.changeSetting("app_version", getVersion())
-        self._saveSettings()
+        with self._lock:
+            self._dirty = True
+        self._writePending()
+
+    def saveLater(self, delay: Optional[float] = None):
+        """
+        delay秒(省略時はDEFAULT_SAVE_DELAY)後に、バックグラウンドでファイルを保存する
+        その間に再度呼ばれた場合は待ち時間を延長するため、連続した変更は1回の書き込みにまとめられる
+        """
+        self.changeSetting("app_version", getVersion())
+        with self._lock:
+            self._dirty = True
+            self._deadline = time.monotonic() + (self.DEFAULT_SAVE_DELAY if delay is None else delay)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._writerLoop, name="SettingsWriter", daemon=True)
+                self._writer.start()
+            self._changed.notify()
+
+    def flush(self):
+        """書き込みを待っている変更があれば、すぐにファイルに書き込む"""
+        self._writePending()
+
+    def isDirty(self) -> bool:
+        """ファイルに書き込まれていない変更があるか"""
+        return self._dirty
+
+    def _writerLoop(self):
+        try:
+            while True:
+                with self._lock:
+                    while True:
+                        remaining = self._deadline - time.monotonic()
+                        if self._dirty and remaining <= 0:
+                            break
+                        self._changed.wait(remaining if self._dirty else None)
+                try:
+                    self._writePending()
+                except OSError as e:
+                    self.logger.error("failed to save settings to %s: %s" % (self.filename, e))
+                    self._retryLater()
+                except Exception:
+                    self.logger.exception("unexpected error while saving settings to %s" % self.filename)
+                    self._retryLater()
+        finally:
+            # 予期しない理由で終了した場合も、次のsaveLaterでスレッドを作り直せるようにする
+            with self._lock:
+                self._writer = None
+
+    def _retryLater(self):
+        """書き込みに失敗した場合は、しばらく待ってから再試行する"""
+        with self._lock:
+            self._deadline = time.monotonic() + self.DEFAULT_SAVE_DELAY
+
+    def _writePending(self):
+        if self._storage is not None:
+            self._writeRows()
+            return
+        # 書き込む内容の作成から書き込みまでを_write_lock内で行い、古い内容で上書きしないようにする
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                full = self.journal_filename is None or self._full_write_needed
+                if full:
+                    text = self._dumpData()
+                else:
+                    records = self._journal_pending
+                    self._journal_pending = []
+                self._dirty = False
+                self._full_write_needed = False
+            try:
+                if full:
+                    self._writeBase(text)
+                else:
+                    self._appendJournal(records)
+            except Exception:
+                with self._lock:
+                    self._dirty = True
+                    if full:
+                        self._full_write_needed = True
+                    else:
+                        self._journal_pending[:0] = records
+                raise
+        if self.journal_filename is not None and self._journal_size > self.journal_threshold:
+            self._startCompaction()
 
     def _saveSettings(self):
-        """設定をファイルに保存"""
-        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
-        with open(self.filename, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        """設定ファイル全体を保存"""
+        with self._lock:
+            self._dirty = True
+            self._full_write_needed = True
+        self._writePending()
+
+    def _dumpData(self) -> str:
+        if self.journal_filename is not None:
+            # ここまでの変更はすべて設定ファイルに含まれる
+            if self.data.get('journal_seq') != self._journal_seq:
+                self.data['journal_seq'] = self._journal_seq
+                self._version += 1
+        return json.dumps(self.data, ensure_ascii=False, indent=2)
+
+    def _writeBase(self, text: str):
+        """設定ファイル全体を書き込み、不要になったジャーナルを空にする"""
+        self._writeFile(text)
+        # 書き込む内容は検証済みなので、次回の読み込みでは検証を省略できる
+        self._writeStamp(hashlib.sha256(text.encode('utf-8')).hexdigest())
+        if self.journal_filename is not None and os.path.exists(self.journal_filename):
+            # ここで中断しても、統合済みの変更はjournal_seqで読み飛ばされる
+            os.remove(self.journal_filename)
+        self._journal_size = 0
+
+    def _appendJournal(self, records: List[str]):
+        if not records:
+            return
+        text = ''.join(i + '\n' for i in records)
+        with open(self.journal_filename, 'a', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_size += len(text.encode('utf-8'))
+
+    def _startCompaction(self):
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(target=self._compactInBackground, name="SettingsCompactor", daemon=True)
+            self._compactor.start()
+
+    def _compactInBackground(self):
+        try:
+            self.compact()
+        except OSError as e:
+            self.logger.error("failed to compact settings journal %s: %s" % (self.journal_filename, e))
+
+    def compact(self):
+        """ジャーナルを設定ファイルに統合する。ジャーナルを使わない場合は何もしない"""
+        if self.journal_filename is None:
+            return
+        with self._write_lock:
+            with self._lock:
+                text = self._dumpData()
+            self._writeBase(text)
+
+    def _writeFile(self, text: str):
+        """一時ファイルに書き込んでから置き換えることで、書き込み途中のファイルが残らないようにする"""
+        directory = os.path.dirname(self.filename)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.filename) + ".", suffix=".tmp")
+        try:
+            # 内容のハッシュが書き込んだ文字列と一致するよう、改行を変換しない
+            with open(fd, 'w', encoding='utf-8', newline='\n') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp, self.filename)
+        except BaseException:
+            os.remove(temp)
+            raise
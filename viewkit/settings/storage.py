@@ -0,0 +1,80 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, Optional, Set
+
+
+class SettingsStorage:
+    """
+    設定を行単位で保存するストレージの基底クラス。SettingsManagerのstorageに渡すと、JSONファイルの代わりに使われる
+    行のキーは、custom以外の最上位のキーと、"custom.フィールド名"。値はJSON文字列
+    書き込みに失敗した場合はOSErrorを送出する
+    """
+
+    def keys(self) -> Set[str]:
+        """保存されているすべての行のキーを返す"""
+        raise NotImplementedError()
+
+    def read(self, key: str) -> Optional[str]:
+        """keyの行の値を返す。存在しない場合はNone"""
+        raise NotImplementedError()
+
+    def write(self, rows: Dict[str, Optional[str]]):
+        """rowsの行をまとめて書き込む。値がNoneの行は削除する"""
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+
+class SqliteStorage(SettingsStorage):
+    """sqlite3のデータベースに、1行ずつ設定を保存するストレージ。WALモードで使用する"""
+
+    TABLE = 'settings'
+
+    def __init__(self, filename: str):
+        self.filename = os.path.abspath(filename)
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()  # 遅延書き込みのスレッドからも使われるため
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+            connection = sqlite3.connect(self.filename, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(f"CREATE TABLE IF NOT EXISTS {self.TABLE} (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def keys(self) -> Set[str]:
+        with self._lock:
+            return {row[0] for row in self._connect().execute(f"SELECT key FROM {self.TABLE}")}
+
+    def read(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connect().execute(f"SELECT value FROM {self.TABLE} WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def write(self, rows: Dict[str, Optional[str]]):
+        if not rows:
+            return
+        with self._lock:
+            try:
+                connection = self._connect()
+                with connection:
+                    connection.executemany(
+                        f"INSERT OR REPLACE INTO {self.TABLE} (key, value) VALUES (?, ?)",
+                        [(k, v) for k, v in rows.items() if v is not None])
+                    connection.executemany(
+                        f"DELETE FROM {self.TABLE} WHERE key = ?",
+                        [(k,) for k, v in rows.items() if v is None])
+            except sqlite3.Error as e:
+                raise OSError(f"failed to write settings to {self.filename}: {e}") from e
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,71 @@
+from typing import Any, Callable, Dict, List, Tuple
+
+_MISSING = object()
+
+
+class _Node:
+    __slots__ = ('children', 'callbacks')
+
+    def __init__(self):
+        self.children: Dict[str, '_Node'] = {}
+        self.callbacks: List[Callable] = []
+
+
+class SubscriptionTrie:
+    """設定のパスごとの購読者を、パスの要素をキーとするトライ木で管理する"""
+
+    def __init__(self):
+        self.root = _Node()
+
+    def add(self, keys: Tuple[str, ...], callback: Callable):
+        node = self.root
+        for k in keys:
+            node = node.children.setdefault(k, _Node())
+        node.callbacks.append(callback)
+
+    def remove(self, keys: Tuple[str, ...], callback: Callable) -> bool:
+        """購読を解除する。解除できたかを返す"""
+        path = [self.root]
+        for k in keys:
+            node = path[-1].children.get(k)
+            if node is None:
+                return False
+            path.append(node)
+        if callback not in path[-1].callbacks:
+            return False
+        path[-1].callbacks.remove(callback)
+        # 不要になった節を削除する
+        for i in range(len(keys), 0, -1):
+            node = path[i]
+            if node.callbacks or node.children:
+                break
+            del path[i - 1].children[keys[i - 1]]
+        return True
+
+    def collect(self, keys: Tuple[str, ...], old: Any, new: Any) -> List[Tuple[Tuple[str, ...], Callable]]:
+        """
+        keysの値がoldからnewに変わったときに、通知すべき (購読したパス, コールバック) のリストを返す
+        keysとその親を購読している場合と、keys以下で値が変わった部分を購読している場合が対象になる
+        """
+        if old == new:
+            return []
+        ret = []
+        node = self.root
+        ret.extend((keys[:0], i) for i in node.callbacks)
+        for depth, k in enumerate(keys, 1):
+            node = node.children.get(k)
+            if node is None:
+                return ret
+            ret.extend((keys[:depth], i) for i in node.callbacks)
+        self._collectChildren(node, keys, old, new, ret)
+        return ret
+
+    def _collectChildren(self, node: _Node, keys: Tuple[str, ...], old: Any, new: Any, ret: list):
+        for k, child in node.children.items():
+            child_old = old.get(k, _MISSING) if isinstance(old, dict) else _MISSING
+            child_new = new.get(k, _MISSING) if isinstance(new, dict) else _MISSING
+            if child_old == child_new:
+                continue
+            path = keys + (k,)
+            ret.extend((path, i) for i in child.callbacks)
+            self._collectChildren(child, path, child_old, child_new, ret)